@@ -3,11 +3,13 @@
 高级移动端抓取器 - 检查JavaScript动态内容和CSS媒体查询
 """
 
+import argparse
 import requests
 from pathlib import Path
-from bs4 import BeautifulSoup
+from css_index import parse_stylesheet
+from html_parser import make_soup
+from scrape_log import add_log_arguments, configure_from_args, log
 import json
-import re
 
 def analyze_mobile_specific_content():
     """分析移动端特有的内容和样式"""
@@ -22,14 +24,14 @@ def analyze_mobile_specific_content():
     
     url = "https://68tt.co/cn/"
     
-    print("🔍 高级移动端内容分析...")
+    log.info("🔍 高级移动端内容分析...")
     
     try:
         # 获取HTML内容
         response = requests.get(url, headers=mobile_headers, timeout=30)
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = make_soup(response.text)
         
-        print("✅ 页面获取成功")
+        log.info("✅ 页面获取成功")
         
         analysis = {
             'mobile_content_areas': [],
@@ -45,7 +47,7 @@ def analyze_mobile_specific_content():
             keyword in ' '.join(x).lower() for keyword in ['phone', 'mobile', 'h5', 'inner', 'content', 'feature', 'intro']
         ))
         
-        print(f"\n📱 找到 {len(mobile_areas)} 个潜在的移动端内容区域:")
+        log.info(f"📱 找到 {len(mobile_areas)} 个潜在的移动端内容区域:")
         
         for area in mobile_areas:
             area_info = {
@@ -75,9 +77,9 @@ def analyze_mobile_specific_content():
                 })
             
             analysis['mobile_content_areas'].append(area_info)
-            print(f"  📍 {area_info['tag']}.{'.'.join(area_info['classes'])} - {area_info['text_content'][:50]}...")
+            log.debug(f"  📍 {area_info['tag']}.{'.'.join(area_info['classes'])} - {area_info['text_content'][:50]}...")
             if area_info['image_count'] > 0:
-                print(f"    🖼️ 包含 {area_info['image_count']} 个图片")
+                log.debug(f"    🖼️ 包含 {area_info['image_count']} 个图片")
         
         # 2. 检查CSS文件链接
         css_links = soup.find_all('link', rel='stylesheet')
@@ -85,7 +87,7 @@ def analyze_mobile_specific_content():
             href = link.get('href', '')
             if href:
                 analysis['css_links'].append(href)
-                print(f"🎨 CSS文件: {href}")
+                log.debug(f"🎨 CSS文件: {href}")
         
         # 3. 检查JavaScript文件
         js_scripts = soup.find_all('script', src=True)
@@ -93,32 +95,34 @@ def analyze_mobile_specific_content():
             src = script.get('src', '')
             if src:
                 analysis['javascript_files'].append(src)
-                print(f"⚡ JS文件: {src}")
+                log.debug(f"⚡ JS文件: {src}")
         
         # 4. 尝试获取CSS内容分析媒体查询
         try:
             for css_link in analysis['css_links']:
                 if css_link.startswith('../'):
                     css_url = f"https://68tt.co/css/{css_link.replace('../css/', '')}"
-                    print(f"\n🔍 分析CSS文件: {css_url}")
+                    log.info(f"🔍 分析CSS文件: {css_url}")
                     
                     css_response = requests.get(css_url, timeout=15)
                     if css_response.status_code == 200:
-                        css_content = css_response.text
+                        # 解析一次并建立索引，嵌套的 @media/@supports 块也能正确识别
+                        sheet = parse_stylesheet(css_response.text)
                         
                         # 查找媒体查询
-                        media_queries = re.findall(r'@media[^{]+\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', css_content, re.DOTALL)
+                        # 包括嵌套在 @supports 或其他 @media 中的 @media 块
+                        media_queries = [block.text for block in sheet.iter_media() if block.name == 'media']
                         analysis['media_queries'].extend(media_queries)
                         
                         # 查找移动端特有的类
-                        mobile_classes = re.findall(r'\.phone-[^,\s{]+|\.mobile-[^,\s{]+|\.h5-[^,\s{]+', css_content)
+                        mobile_classes = ['.' + name for name in sheet.classes_with_prefix('phone-', 'mobile-', 'h5-')]
                         analysis['mobile_specific_classes'].extend(mobile_classes)
                         
-                        print(f"  📱 找到 {len(media_queries)} 个媒体查询")
-                        print(f"  📱 找到 {len(mobile_classes)} 个移动端类")
+                        log.info(f"  📱 找到 {len(media_queries)} 个媒体查询")
+                        log.info(f"  📱 找到 {len(mobile_classes)} 个移动端类")
                         
         except Exception as e:
-            print(f"⚠️ CSS分析失败: {e}")
+            log.warning(f"⚠️ CSS分析失败: {e}")
         
         # 5. 查找隐藏元素（可能在移动端显示）
         hidden_elements = soup.find_all(style=lambda x: x and 'display:none' in x.replace(' ', ''))
@@ -131,7 +135,7 @@ def analyze_mobile_specific_content():
                 'has_images': len(elem.find_all('img')) > 0
             }
             analysis['hidden_elements'].append(hidden_info)
-            print(f"👻 隐藏元素: {hidden_info['tag']}.{'.'.join(hidden_info['classes'])} - {hidden_info['content'][:30]}...")
+            log.debug(f"👻 隐藏元素: {hidden_info['tag']}.{'.'.join(hidden_info['classes'])} - {hidden_info['content'][:30]}...")
         
         # 保存分析结果
         with open(output_dir / "advanced_analysis.json", 'w', encoding='utf-8') as f:
@@ -140,13 +144,13 @@ def analyze_mobile_specific_content():
         # 生成详细报告
         generate_advanced_report(analysis, output_dir)
         
-        print(f"\n📊 高级分析完成!")
-        print(f"📁 输出目录: {output_dir}")
-        print(f"📋 分析结果: advanced_analysis.json")
-        print(f"📝 详细报告: advanced_mobile_report.md")
+        log.info(f"📊 高级分析完成!")
+        log.info(f"📁 输出目录: {output_dir}")
+        log.info(f"📋 分析结果: advanced_analysis.json")
+        log.info(f"📝 详细报告: advanced_mobile_report.md")
         
     except Exception as e:
-        print(f"❌ 分析失败: {e}")
+        log.error(f"❌ 分析失败: {e}")
 
 def generate_advanced_report(analysis, output_dir):
     """生成高级分析报告"""
@@ -226,4 +230,7 @@ def generate_advanced_report(analysis, output_dir):
         f.write(report)
 
 if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='高级移动端抓取器')
+    add_log_arguments(arg_parser)
+    configure_from_args(arg_parser.parse_args())
     analyze_mobile_specific_content()
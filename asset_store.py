@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+内容寻址资源仓库
+按 SHA-256 存储资源，相同内容只保存一份，各抓取器的输出目录通过硬链接引用
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from pathlib import Path
+
+DEFAULT_STORE_DIR = os.getenv('SCRAPER_ASSET_STORE', '.asset_store')
+
+# 流式下载的分块大小
+CHUNK_SIZE = 64 * 1024
+
+
+class AssetStore:
+    """资源仓库
+
+    objects/ 下按摘要保存资源内容，index.json 记录 URL → 摘要 的映射，
+    多次运行、多个抓取器之间共享
+    """
+
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        self.root = Path(root)
+        self.objects_dir = self.root / 'objects'
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.root / 'index.json'
+        self.index = self.load_index()
+        self.dirty = False
+
+    def load_index(self):
+        """加载 URL → 摘要 索引"""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def save(self):
+        """保存索引（先写临时文件再替换）"""
+        if not self.dirty:
+            return
+        tmp_path = self.index_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.index_path)
+        self.dirty = False
+
+    def object_path(self, digest, ext=''):
+        """摘要对应的对象文件路径"""
+        return self.objects_dir / digest[:2] / f"{digest}{ext}"
+
+    def write_object(self, content, ext=''):
+        """保存内存中的内容（相同内容只保存一份），返回摘要；与流式下载共用 ObjectWriter"""
+        with self.open_object(ext) as writer:
+            writer.write(content)
+            return writer.commit()
+
+    def open_object(self, ext=''):
+        """打开流式写入器，边写边计算摘要，提交时原子改名为对象文件"""
+        return ObjectWriter(self, ext)
+
+    def register(self, url, digest, size, content_type='', ext='', src_ext=None):
+        """登记已写入仓库的对象，返回索引条目
+
+        src_ext 为对象写入时使用的扩展名；与 ext 不同时以硬链接补充一个 ext 对象文件
+        """
+        object_path = self.object_path(digest, ext)
+        if src_ext is not None and src_ext != ext and not object_path.exists():
+            source_path = self.object_path(digest, src_ext)
+            try:
+                os.link(source_path, object_path)
+            except FileExistsError:
+                pass
+            except OSError:
+                shutil.copyfile(source_path, object_path)
+
+        entry = {
+            'digest': digest,
+            'ext': ext,
+            'size': size,
+            'content_type': content_type
+        }
+        if self.index.get(url) != entry:
+            self.index[url] = entry
+            self.dirty = True
+        return entry
+
+    def place(self, entry, path):
+        """让 path 指向条目对应的对象（硬链接，不支持时复制）"""
+        path = Path(path)
+        object_path = self.object_path(entry['digest'], entry['ext'])
+
+        if path.exists():
+            if os.path.samefile(path, object_path):
+                return path
+            path.unlink()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(object_path, path)
+        except OSError:
+            shutil.copyfile(object_path, path)
+        return path
+
+    def place_unique(self, entry, dest_dir, filename):
+        """在目录中以 filename 放置资源
+
+        同名文件内容一致时直接复用；内容不同则在文件名后附加摘要前缀，
+        不再生成 _1、_2 这样的重复副本
+        """
+        dest_dir = Path(dest_dir)
+        path = dest_dir / filename
+
+        if path.exists() and not self.same_content(path, entry):
+            name, ext = os.path.splitext(filename)
+            path = dest_dir / f"{name}_{entry['digest'][:8]}{ext}"
+
+        return self.place(entry, path)
+
+    def same_content(self, path, entry):
+        """判断已有文件是否与条目内容一致"""
+        object_path = self.object_path(entry['digest'], entry['ext'])
+        if os.path.samefile(path, object_path):
+            return True
+        if path.stat().st_size != entry['size']:
+            return False
+        return file_sha256(path) == entry['digest']
+
+
+class ObjectWriter:
+    """资源对象的流式写入器
+
+    内容先写入对象目录中的临时文件并同时计算 SHA-256，commit() 时改名为 objects/<摘要>，
+    中途出错或未提交时删除临时文件，不会留下写了一半的对象
+    """
+
+    def __init__(self, store, ext=''):
+        self.store = store
+        self.ext = ext
+        self.size = 0
+        self.digest = None
+        self._hash = hashlib.sha256()
+        self.tmp_path = store.objects_dir / f"{uuid.uuid4().hex}.tmp"
+        self.file = open(self.tmp_path, 'xb')
+
+    def write(self, chunk):
+        self._hash.update(chunk)
+        self.size += len(chunk)
+        self.file.write(chunk)
+
+    def commit(self):
+        """完成写入，返回摘要；相同内容的对象已存在时丢弃临时文件"""
+        self.file.close()
+        self.digest = self._hash.hexdigest()
+        object_path = self.store.object_path(self.digest, self.ext)
+        if object_path.exists():
+            self.tmp_path.unlink()
+        else:
+            object_path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(self.tmp_path, object_path)
+        return self.digest
+
+    def abort(self):
+        """放弃写入并删除临时文件"""
+        self.file.close()
+        try:
+            self.tmp_path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.digest is None:
+            self.abort()
+
+
+def file_sha256(path):
+    """计算文件的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
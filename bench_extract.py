@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+结构化内容提取基准测试
+对 comprehensive_output/html 中保存的页面，比较 MCPScraper 原来逐类 find_all 的提取
+（每页约 11 次遍历）与单次遍历提取的耗时，并检查两者结果是否一致
+"""
+
+import argparse
+from pathlib import Path
+
+from bench_parsers import best_time
+from html_parser import make_soup
+from mcp_scraper import MCPScraper
+from page_facts import extract_page_facts
+
+
+def legacy_extract(soup):
+    """格式版本 1 的提取：每级标题和每类元素各遍历一次解析树"""
+    content_data = {
+        'title': soup.title.string if soup.title else '',
+        'meta_description': '',
+        'headings': [],
+        'paragraphs': [],
+        'links': [],
+        'images': [],
+        'scripts': [],
+        'stylesheets': []
+    }
+
+    meta_desc = soup.find('meta', attrs={'name': 'description'})
+    if meta_desc:
+        content_data['meta_description'] = meta_desc.get('content', '')
+
+    for i in range(1, 7):
+        for h in soup.find_all(f'h{i}'):
+            content_data['headings'].append({'level': i, 'text': h.get_text().strip(), 'id': h.get('id', '')})
+
+    for p in soup.find_all('p'):
+        text = p.get_text().strip()
+        if text:
+            content_data['paragraphs'].append(text)
+
+    for link in soup.find_all('a', href=True):
+        content_data['links'].append({'href': link['href'], 'text': link.get_text().strip(),
+                                      'title': link.get('title', '')})
+
+    for img in soup.find_all('img', src=True):
+        content_data['images'].append({'src': img['src'], 'alt': img.get('alt', ''), 'title': img.get('title', '')})
+
+    for css in soup.find_all('link', rel='stylesheet'):
+        if css.get('href'):
+            content_data['stylesheets'].append(css['href'])
+
+    for script in soup.find_all('script', src=True):
+        content_data['scripts'].append(script['src'])
+
+    return content_data
+
+
+def differences(legacy, current):
+    """两种提取结果的差异字段（标题顺序和 <title> 空白属于格式版本变化，不计入）"""
+    diffs = []
+    for key, value in legacy.items():
+        other = current[key]
+        if key == 'headings':
+            value = sorted(value, key=lambda h: h['level'])
+            other = sorted(other, key=lambda h: h['level'])
+        elif key == 'title':
+            value = (value or '').strip()
+        if value != other:
+            diffs.append(key)
+    return diffs
+
+
+def run_benchmark(html_dir, parser, repeat):
+    """逐页计时，返回 {页面: (原提取ms, 单次遍历ms, 差异字段)}"""
+    scraper = MCPScraper(parser=parser)
+    results = {}
+
+    for page in sorted(Path(html_dir).glob('*.html')):
+        soup = make_soup(page.read_text(encoding='utf-8'), parser)
+        legacy_ms = best_time(lambda: legacy_extract(soup), repeat)
+        single_ms = best_time(lambda: scraper.content_from_facts(extract_page_facts(soup)), repeat)
+        diffs = differences(legacy_extract(soup), scraper.content_from_facts(extract_page_facts(soup)))
+        results[page.name] = (legacy_ms, single_ms, diffs)
+
+    return results
+
+
+def print_report(results):
+    """打印每页耗时和总体加速比"""
+    name_width = max([len(name) for name in results] + [8])
+    print(f"{'page':<{name_width}}{'find_all ms':>14}{'单次遍历 ms':>14}{'加速':>8}  结果")
+    for name, (legacy_ms, single_ms, diffs) in results.items():
+        status = '一致' if not diffs else '不同: ' + ', '.join(diffs)
+        print(f"{name:<{name_width}}{legacy_ms:>14.3f}{single_ms:>14.3f}{legacy_ms / single_ms:>7.1f}x  {status}")
+
+    if results:
+        legacy_total = sum(legacy_ms for legacy_ms, _, _ in results.values())
+        single_total = sum(single_ms for _, single_ms, _ in results.values())
+        print(f"\n合计: {legacy_total:.3f} ms → {single_total:.3f} ms ({legacy_total / single_total:.1f}x)")
+
+
+def main():
+    """主函数"""
+    arg_parser = argparse.ArgumentParser(description='结构化内容提取基准测试')
+    arg_parser.add_argument('--html-dir', default='comprehensive_output/html')
+    arg_parser.add_argument('--parser', default=None, help='构建解析树使用的 bs4 后端（默认同 make_soup）')
+    arg_parser.add_argument('--repeat', type=int, default=20, help='每项重复次数，取最短耗时')
+    args = arg_parser.parse_args()
+
+    print_report(run_benchmark(args.html_dir, args.parser, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+HTML解析后端基准测试
+对 comprehensive_output/html 中保存的页面，分别统计各后端的解析耗时和解析+提取耗时
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from html_parser import available_parsers, make_soup, parse_page_facts
+
+
+def best_time(func, repeat):
+    """多次运行取最短耗时（毫秒）"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        if best is None or elapsed < best:
+            best = elapsed
+    return best * 1000
+
+
+def parse_only(html, parser):
+    """只构建解析树"""
+    if parser == 'selectolax':
+        from selectolax.lexbor import LexborHTMLParser
+        return lambda: LexborHTMLParser(html)
+    return lambda: make_soup(html, parser)
+
+
+def run_benchmark(html_dir, repeat):
+    """逐页逐后端计时，返回 {页面: {后端: (解析ms, 解析+提取ms)}}"""
+    pages = sorted(Path(html_dir).glob('*.html'))
+    parsers = available_parsers()
+    results = {}
+
+    for page in pages:
+        html = page.read_text(encoding='utf-8')
+        results[page.name] = {}
+        for parser in parsers:
+            parse_ms = best_time(parse_only(html, parser), repeat)
+            facts_ms = best_time(lambda: parse_page_facts(html, parser), repeat)
+            results[page.name][parser] = (parse_ms, facts_ms)
+
+    return parsers, results
+
+
+def print_report(parsers, results):
+    """打印每页耗时和各后端平均耗时"""
+    name_width = max([len(name) for name in results] + [8])
+    print("每页耗时 (ms): 解析 / 解析+提取")
+    print(f"{'page':<{name_width}}" + ''.join(f"{parser:>24}" for parser in parsers))
+
+    for name, timings in results.items():
+        row = f"{name:<{name_width}}"
+        for parser in parsers:
+            parse_ms, facts_ms = timings[parser]
+            row += f"{parse_ms:>13.2f} / {facts_ms:>8.2f}"
+        print(row)
+
+    if not results:
+        return
+
+    print()
+    baseline = sum(timings['html.parser'][1] for timings in results.values()) / len(results)
+    for parser in parsers:
+        average = sum(timings[parser][1] for timings in results.values()) / len(results)
+        print(f"{parser:<12} 平均解析+提取: {average:8.2f} ms/页  (html.parser 的 {baseline / average:.1f}x)")
+
+
+def main():
+    """主函数"""
+    arg_parser = argparse.ArgumentParser(description='HTML解析后端基准测试')
+    arg_parser.add_argument('--html-dir', default='comprehensive_output/html')
+    arg_parser.add_argument('--repeat', type=int, default=5, help='每项重复次数，取最短耗时')
+    args = arg_parser.parse_args()
+
+    parsers, results = run_benchmark(args.html_dir, args.repeat)
+    print_report(parsers, results)
+
+
+if __name__ == "__main__":
+    main()
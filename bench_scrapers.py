@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+抓取器基准测试
+用本地 HTTP 服务器提供 comprehensive_output/html 中保存的页面和 68tt_static 中的静态资源，
+可模拟延迟和带宽，依次运行各抓取器，统计页面/秒、字节/秒、峰值内存和各阶段耗时
+"""
+
+import argparse
+import asyncio
+import contextlib
+import importlib
+import json
+import mimetypes
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from queue import Empty
+from urllib.parse import unquote, urlsplit
+
+from asset_store import CHUNK_SIZE
+from html_parser import add_parser_argument
+
+SCRAPERS = ('website', 'comprehensive', 'mcp', 'firecrawl')
+
+# 各抓取器的计时点: (模块, 函数或 类.方法, 阶段)
+# 阶段耗时不重叠：嵌套调用的时间只计入最内层的阶段，外层只计自身剩余的部分
+STAGE_HOOKS = {
+    'website': [
+        ('site_scraper', 'WebsiteScraper.crawl', 'fetch'),
+        ('site_scraper', 'WebsiteScraper.scrape_page', 'write'),
+        ('site_scraper', 'make_soup', 'parse'),
+        ('site_scraper', 'WebsiteScraper.download_files', 'assets'),
+        ('site_scraper', 'WebsiteScraper.generate_report', 'report'),
+    ],
+    'comprehensive': [
+        ('comprehensive_scraper', 'ComprehensiveScraper.scrape_website', 'fetch'),
+        ('comprehensive_scraper', 'parse_page_facts', 'parse'),
+        ('comprehensive_scraper', 'ComprehensiveScraper.save_html', 'write'),
+        ('comprehensive_scraper', 'ComprehensiveScraper.extract_and_save_markdown', 'markdown'),
+        ('comprehensive_scraper', 'ComprehensiveScraper.download_images', 'assets'),
+        ('comprehensive_scraper', 'ComprehensiveScraper.take_screenshot_simulation', 'preview'),
+        ('comprehensive_scraper', 'ComprehensiveScraper.generate_final_report', 'report'),
+    ],
+    'mcp': [
+        ('mcp_scraper', 'MCPScraper.scrape_main_pages', 'fetch'),
+        ('mcp_scraper', 'MCPScraper.save_page', 'write'),
+        ('mcp_scraper', 'parse_page_facts', 'parse'),
+        ('mcp_scraper', 'MCPScraper.download_assets', 'assets'),
+        ('mcp_scraper', 'MCPScraper.generate_mcp_report', 'report'),
+    ],
+    'firecrawl': [
+        ('firecrawl_scraper', 'FirecrawlMCPClient.scrape_without_api', 'fetch'),
+        ('firecrawl_scraper', 'make_soup', 'parse'),
+        ('firecrawl_scraper', 'FirecrawlMCPClient.generate_simple_report', 'report'),
+    ],
+}
+
+
+class FixtureServer(ThreadingHTTPServer):
+    """本地测试站点
+
+    /cn/about.html 对应 html_dir/cn_about.html.html（与综合抓取器保存的文件名一致），
+    其他路径在 static_dir 中查找；latency 为每个请求的延迟（秒），bandwidth 为每个连接的带宽（字节/秒，0 表示不限）
+    """
+
+    daemon_threads = True
+
+    def __init__(self, html_dir, static_dir, latency=0.0, bandwidth=0, port=0):
+        super().__init__(('127.0.0.1', port), FixtureHandler)
+        self.html_dir = Path(html_dir)
+        self.static_dir = Path(static_dir).resolve()
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.lock = threading.Lock()
+        self.reset_stats()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def reset_stats(self):
+        with self.lock:
+            self.stats = {'requests': 0, 'pages': 0, 'assets': 0, 'not_found': 0, 'bytes': 0}
+
+    def record(self, **counts):
+        with self.lock:
+            for key, value in counts.items():
+                self.stats[key] += value
+
+    def resolve(self, path):
+        """请求路径对应的文件，不存在时返回 None"""
+        path = unquote(path)
+        if path.endswith('/index.html'):
+            path = path[:-len('index.html')]
+        page = self.html_dir / (path.strip('/').replace('/', '_') + '.html')
+        if path.strip('/') and page.is_file():
+            return page
+
+        static = (self.static_dir / path.lstrip('/')).resolve()
+        if static.is_file() and static.is_relative_to(self.static_dir):
+            return static
+        return None
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """按配置的延迟和带宽返回本地文件"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+
+        file_path = server.resolve(urlsplit(self.path).path)
+        if file_path is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            server.record(requests=1, not_found=1)
+            return
+
+        body = file_path.read_bytes()
+        content_type = mimetypes.guess_type(file_path.name)[0] or 'application/octet-stream'
+        if content_type == 'text/html':
+            content_type += '; charset=utf-8'
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+
+        for start in range(0, len(body), CHUNK_SIZE):
+            chunk = body[start:start + CHUNK_SIZE]
+            self.wfile.write(chunk)
+            if server.bandwidth:
+                time.sleep(len(chunk) / server.bandwidth)
+
+        is_page = content_type.startswith('text/html')
+        server.record(requests=1, pages=int(is_page), assets=int(not is_page), bytes=len(body))
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StageTimer:
+    """按阶段累计耗时（按线程维护调用栈，嵌套时只计入最内层阶段）"""
+
+    def __init__(self):
+        self.totals = {}
+        self.local = threading.local()
+
+    def enter(self, stage):
+        stack = self.local.__dict__.setdefault('stack', [])
+        now = time.perf_counter()
+        if stack:
+            outer = stack[-1]
+            self.totals[outer[0]] = self.totals.get(outer[0], 0.0) + now - outer[1]
+        stack.append([stage, now])
+
+    def exit(self):
+        stack = self.local.stack
+        stage, started = stack.pop()
+        now = time.perf_counter()
+        self.totals[stage] = self.totals.get(stage, 0.0) + now - started
+        if stack:
+            stack[-1][1] = now
+
+    def wrap(self, func, stage):
+        if asyncio.iscoroutinefunction(func):
+            async def timed(*args, **kwargs):
+                self.enter(stage)
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self.exit()
+        else:
+            def timed(*args, **kwargs):
+                self.enter(stage)
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.exit()
+        return timed
+
+    def install(self, hooks):
+        for module_name, target, stage in hooks:
+            owner = importlib.import_module(module_name)
+            *owner_path, name = target.split('.')
+            for part in owner_path:
+                owner = getattr(owner, part)
+            setattr(owner, name, self.wrap(getattr(owner, name), stage))
+
+
+def run_website(base_url, work_dir, store, parser, rate):
+    from site_scraper import WebsiteScraper
+    WebsiteScraper(f"{base_url}/cn/", work_dir / 'website', asset_store=store, parser=parser,
+                   rate=rate).scrape_website()
+
+
+def run_comprehensive(base_url, work_dir, store, parser, rate):
+    from comprehensive_scraper import ComprehensiveScraper
+    ComprehensiveScraper(work_dir / 'comprehensive', asset_store=store, parser=parser, rate=rate,
+                         base_url=base_url).scrape_website()
+
+
+def run_mcp(base_url, work_dir, store, parser, rate):
+    from mcp_scraper import MCPScraper
+    scraper = MCPScraper(asset_store=store, parser=parser, rate=rate)
+    scraper.base_url = f"{base_url}/cn/"
+    scraper.output_dir = work_dir / 'mcp'
+    asyncio.run(scraper.run())
+
+
+def run_firecrawl(base_url, work_dir, store, parser, rate):
+    from firecrawl_scraper import FirecrawlMCPClient
+    client = FirecrawlMCPClient(parser=parser, asset_store=store, output_dir=work_dir / 'firecrawl')
+    client.config['scraping_config']['target_url'] = f"{base_url}/cn/"
+    try:
+        client.scrape_without_api()
+    finally:
+        client.close()
+
+
+RUNNERS = {
+    'website': run_website,
+    'comprehensive': run_comprehensive,
+    'mcp': run_mcp,
+    'firecrawl': run_firecrawl,
+}
+
+
+def peak_rss_bytes():
+    """本进程的峰值常驻内存（Linux 上 ru_maxrss 单位为 KB，macOS 上为字节）"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def run_in_child(name, base_url, work_dir, parser, rate, verbose, queue):
+    """在独立进程中运行一个抓取器，使峰值内存互不影响"""
+    import metrics
+    import scrape_log
+    from asset_store import AssetStore
+
+    timer = StageTimer()
+    timer.install(STAGE_HOOKS[name])
+    # 每次运行使用全新的资源仓库，避免缓存让结果失真
+    store = AssetStore(work_dir / 'store')
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(open(os.devnull, 'w'))
+
+    error = None
+    started = time.perf_counter()
+    with output:
+        try:
+            RUNNERS[name](base_url, work_dir, store, parser, rate)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            # 缓冲的日志在恢复标准输出之前写出
+            scrape_log.flush()
+    elapsed = time.perf_counter() - started
+
+    stages = {stage: round(seconds, 4) for stage, seconds in timer.totals.items()}
+    stages['other'] = round(max(elapsed - sum(timer.totals.values()), 0.0), 4)
+    queue.put({'elapsed': elapsed, 'peak_rss': peak_rss_bytes(), 'stages': stages, 'error': error,
+               'metrics': metrics.registry.to_dict()})
+
+
+def run_benchmark(scrapers, html_dir, static_dir, latency, bandwidth, parser=None, rate=None, verbose=False):
+    """依次运行各抓取器，返回 {抓取器: 结果}"""
+    server = FixtureServer(html_dir, static_dir, latency=latency, bandwidth=bandwidth)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    context = multiprocessing.get_context('spawn')
+    results = {}
+
+    try:
+        for name in scrapers:
+            work_dir = Path(tempfile.mkdtemp(prefix=f'bench_{name}_'))
+            server.reset_stats()
+            queue = context.Queue()
+            process = context.Process(target=run_in_child,
+                                      args=(name, server.base_url, work_dir, parser, rate, verbose, queue))
+            process.start()
+            process.join()
+            shutil.rmtree(work_dir, ignore_errors=True)
+            try:
+                result = queue.get(timeout=5)
+            except Empty:
+                result = {'elapsed': 0.0, 'peak_rss': 0, 'stages': {},
+                          'error': f'子进程异常退出 (exit code {process.exitcode})'}
+
+            stats = dict(server.stats)
+            elapsed = result['elapsed']
+            results[name] = {
+                **result,
+                'server': stats,
+                'pages_per_second': stats['pages'] / elapsed if elapsed else 0.0,
+                'bytes_per_second': stats['bytes'] / elapsed if elapsed else 0.0,
+            }
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    return results
+
+
+def print_report(results):
+    """打印吞吐量、内存和各阶段耗时"""
+    print(f"{'scraper':<14}{'time s':>9}{'pages':>7}{'pages/s':>9}{'KB/s':>10}{'requests':>10}{'404':>6}{'peak MB':>9}")
+    for name, result in results.items():
+        stats = result['server']
+        print(f"{name:<14}{result['elapsed']:>9.2f}{stats['pages']:>7}{result['pages_per_second']:>9.2f}"
+              f"{result['bytes_per_second'] / 1024:>10.1f}{stats['requests']:>10}{stats['not_found']:>6}"
+              f"{result['peak_rss'] / 1024 / 1024:>9.1f}")
+
+    print("\n各阶段耗时 (s)")
+    for name, result in results.items():
+        stages = ', '.join(f"{stage} {seconds:.3f}" for stage, seconds in
+                           sorted(result['stages'].items(), key=lambda item: -item[1]))
+        print(f"{name:<14}{stages}")
+        if result['error']:
+            print(f"{'':<14}❌ {result['error']}")
+
+
+def main():
+    """主函数"""
+    arg_parser = argparse.ArgumentParser(description='抓取器基准测试（本地测试站点）')
+    arg_parser.add_argument('--html-dir', default='comprehensive_output/html')
+    arg_parser.add_argument('--static-dir', default='68tt_static')
+    arg_parser.add_argument('--scrapers', default=','.join(SCRAPERS),
+                            help=f"逗号分隔的抓取器（可选: {', '.join(SCRAPERS)}）")
+    arg_parser.add_argument('--latency', type=float, default=0.0, help='每个请求的延迟（毫秒）')
+    arg_parser.add_argument('--bandwidth', type=float, default=0.0, help='每个连接的带宽（KB/s，0 表示不限）')
+    arg_parser.add_argument('--rate', type=float, default=None, help='每个主机每秒最多请求数（默认不限速）')
+    add_parser_argument(arg_parser)
+    arg_parser.add_argument('--json', metavar='PATH', help='同时把结果写入 JSON 文件')
+    arg_parser.add_argument('--verbose', action='store_true', help='显示抓取器自身的输出')
+    args = arg_parser.parse_args()
+
+    scrapers = [name.strip() for name in args.scrapers.split(',') if name.strip()]
+    unknown = set(scrapers) - set(SCRAPERS)
+    if unknown:
+        arg_parser.error(f"未知的抓取器: {', '.join(sorted(unknown))}")
+
+    results = run_benchmark(scrapers, args.html_dir, args.static_dir, args.latency / 1000,
+                            args.bandwidth * 1024, parser=args.parser, rate=args.rate, verbose=args.verbose)
+    print_report(results)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n📋 结果已保存: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,18 +4,33 @@
 整合 Firecrawl MCP、简单抓取和资源下载功能
 """
 
+import argparse
 import asyncio
-import requests
 import json
 import os
 import time
 from pathlib import Path
 from urllib.parse import urljoin, urlparse
-from bs4 import BeautifulSoup
 import base64
 
+import metrics
+from asset_store import AssetStore
+from content_manifest import ContentManifest, content_digest
+from crawl_journal import DONE, FAILED, CrawlJournal
+from fetch_engine import BlockingFetchEngine
+from file_manifest import FileManifest
+from html_markdown import MARKDOWN_VERSION, html_to_markdown
+from html_parser import add_parser_argument, parse_page_facts
+from http_cache import HTTPCache
+from scrape_log import add_log_arguments, configure_from_args, log, progress
+
+# 报告中包含文件统计，报告文件本身不计入
+REPORT_FILENAME = 'comprehensive_report.json'
+
 class ComprehensiveScraper:
-    def __init__(self, output_dir="comprehensive_output"):
+    def __init__(self, output_dir="comprehensive_output", fetcher=None, rate=5.0, per_host=4, asset_store=None,
+                 parser=None, resume=False, base_url="https://68tt.co"):
+        self.base_url = base_url.rstrip('/')
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
         
@@ -28,28 +43,59 @@ class ComprehensiveScraper:
         for dir_path in [self.assets_dir, self.screenshots_dir, self.html_dir, self.markdown_dir]:
             dir_path.mkdir(exist_ok=True)
         
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        }
+        # Markdown 按源HTML摘要增量生成：源未变化时跳过提取和写入
+        self.markdown_manifest = ContentManifest(self.markdown_dir, self.output_dir / 'markdown_manifest.json',
+                                                 version=MARKDOWN_VERSION)
+        
+        # 写入时登记的输出文件清单，报告中的文件统计直接读取累计值
+        self.files = FileManifest(self.output_dir, exclude=(REPORT_FILENAME,))
+        
+        # 所有抓取器共享的内容寻址资源仓库
+        self.asset_store = asset_store or AssetStore()
+        
+        # 共享抓取引擎：连接池 + 按主机并发限制 + 礼貌速率 + 条件请求缓存
+        self.owns_fetcher = fetcher is None
+        self.fetcher = fetcher or BlockingFetchEngine(rate=rate, per_host=per_host,
+                                                      cache=HTTPCache(self.asset_store))
+        
+        # HTML解析后端，None 表示使用默认后端
+        self.parser = parser
         
         self.downloaded_images = set()
         self.scraped_pages = []
         
-    def scrape_page(self, url):
-        """抓取单个页面"""
-        print(f"🔍 抓取页面: {url}")
+        # 检查点日志：resume 时跳过已完成的页面和图片，只重做未完成和失败的部分
+        self.journal = CrawlJournal(self.output_dir, resume=resume)
+        if resume:
+            self.restore_checkpoint()
+        
+    def restore_checkpoint(self):
+        """从检查点日志恢复已完成的页面和图片"""
+        for entry in self.journal.items('asset', DONE):
+            self.downloaded_images.add(entry['url'])
+        for entry in self.journal.items('page', DONE):
+            self.scraped_pages.append(entry['page'])
+        
+        log.info(f"♻️  从检查点恢复: {len(self.scraped_pages)} 个页面, {len(self.downloaded_images)} 个图片已完成")
+        
+    def scrape_page(self, url, result=None, facts=None):
+        """抓取单个页面，result 为已获取的响应时不再重复请求，facts 为已提取的页面信息时不再重复解析"""
+        log.debug(f"🔍 抓取页面: {url}")
         
         try:
-            response = requests.get(url, headers=self.headers, timeout=30)
-            if response.status_code != 200:
-                print(f"❌ 页面获取失败: HTTP {response.status_code}")
+            if result is None:
+                result = self.fetcher.fetch(url, as_text=True)
+            if 'content' not in result:
+                log.error(f"❌ 页面获取失败 {url}: {result['error']}", extra={'data': {'url': url}})
                 return None
             
-            print(f"✅ 页面获取成功: {len(response.text)} 字符")
+            html_content = result['content']
+            log.debug(f"✅ 页面获取成功: {len(html_content)} 字符")
             
-            # 解析HTML
-            soup = BeautifulSoup(response.text, 'html.parser')
-            title = soup.title.string if soup.title else "Untitled"
+            # 解析HTML，一次遍历提取所有输出共用的页面信息
+            if facts is None:
+                facts = parse_page_facts(html_content, self.parser)
+            title = facts.title or "Untitled"
             
             # 生成文件名
             parsed_url = urlparse(url)
@@ -61,15 +107,15 @@ class ComprehensiveScraper:
                 'url': url,
                 'title': title.strip(),
                 'filename_base': filename_base,
-                'html_content': response.text,
-                'soup': soup,
-                'content_length': len(response.text)
+                'html_content': html_content,
+                'facts': facts,
+                'content_length': len(html_content)
             }
             
             return page_data
             
         except Exception as e:
-            print(f"❌ 页面抓取错误: {e}")
+            log.error(f"❌ 页面抓取错误 {url}: {e}", extra={'data': {'url': url}})
             return None
     
     def save_html(self, page_data):
@@ -77,79 +123,56 @@ class ComprehensiveScraper:
         filename = f"{page_data['filename_base']}.html"
         html_path = self.html_dir / filename
         
-        with open(html_path, 'w', encoding='utf-8') as f:
-            f.write(page_data['html_content'])
+        with metrics.timer('write'):
+            self.files.write_text(html_path, page_data['html_content'])
         
-        print(f"📄 HTML保存: {filename}")
+        log.debug(f"📄 HTML保存: {filename}")
         return html_path
     
     def extract_and_save_markdown(self, page_data):
-        """提取并保存Markdown格式内容"""
-        soup = page_data['soup']
-        
-        # 提取主要内容
-        markdown_content = []
-        
-        # 标题
-        if soup.title:
-            markdown_content.append(f"# {soup.title.string}\n")
-        
-        # 主要文本内容
-        for element in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'div']):
-            text = element.get_text().strip()
-            if text and len(text) > 10:  # 过滤太短的内容
-                if element.name.startswith('h'):
-                    level = int(element.name[1])
-                    markdown_content.append(f"{'#' * level} {text}\n")
-                else:
-                    markdown_content.append(f"{text}\n")
-        
-        # 链接
-        links = soup.find_all('a', href=True)
-        if links:
-            markdown_content.append("\n## 链接\n")
-            for link in links:
-                href = link['href']
-                text = link.get_text().strip()
-                if text and href:
-                    markdown_content.append(f"- [{text}]({href})")
-        
-        # 图片
-        images = soup.find_all('img', src=True)
-        if images:
-            markdown_content.append("\n## 图片\n")
-            for img in images:
-                src = img['src']
-                alt = img.get('alt', '')
-                markdown_content.append(f"![{alt}]({src})")
-        
-        # 保存Markdown
-        markdown_text = '\n'.join(markdown_content)
+        """提取并保存Markdown格式内容
+
+        源HTML与上次生成时相同则直接跳过；生成结果与已有文件相同时也不重写
+        """
         filename = f"{page_data['filename_base']}.md"
         md_path = self.markdown_dir / filename
+        source_digest = content_digest(page_data['html_content'])
+        if self.markdown_manifest.is_current(filename, source_digest):
+            if not self.files.contains(md_path):
+                self.files.record(md_path, md_path.stat().st_size)
+            log.debug(f"♻️  Markdown未变化: {filename}")
+            return md_path
+        
+        # 转换整个页面：每个文本节点只输出一次，保留标题、列表、表格、链接和图片的位置
+        markdown_text = html_to_markdown(page_data['html_content'], self.parser)
         
-        with open(md_path, 'w', encoding='utf-8') as f:
-            f.write(markdown_text)
+        # 保存Markdown
+        with metrics.timer('write'):
+            written = self.markdown_manifest.write(filename, source_digest, markdown_text)
+        self.files.record_content(md_path, markdown_text)
         
-        print(f"📝 Markdown保存: {filename}")
+        log.debug(f"📝 Markdown保存: {filename}" if written else f"♻️  Markdown内容未变化: {filename}")
         return md_path
     
     def download_images(self, page_data):
         """下载页面中的图片"""
-        soup = page_data['soup']
-        images = soup.find_all('img', src=True)
+        images = page_data['facts'].images
+        page_data['images_failed'] = 0
         
-        print(f"🖼️  发现 {len(images)} 个图片")
+        log.debug(f"🖼️  发现 {len(images)} 个图片")
         downloaded_count = 0
         
+        # 收集需要下载的图片URL（保持页面顺序并去重）
+        pending = []
+        pending_urls = set()
         for i, img in enumerate(images):
-            img_src = img['src']
+            img_src = img.src
             
             # 处理相对URL
             if img_src.startswith('//'):
                 img_url = 'https:' + img_src
             elif img_src.startswith('/'):
-                img_url = 'https://68tt.co' + img_src
+                img_url = self.base_url + img_src
             elif not img_src.startswith('http'):
                 img_url = urljoin(page_data['url'], img_src)
             else:
@@ -158,57 +181,78 @@ class ComprehensiveScraper:
             # 跳过base64和已下载的图片
             if img_url.startswith('data:') or img_url in self.downloaded_images:
                 continue
+            if img_url in pending_urls:
+                continue
+            pending_urls.add(img_url)
+            pending.append((i, img_url))
+        
+        # 通过共享抓取引擎并发下载，请求频率由引擎按主机控制
+        # 未变化的图片由条件请求缓存返回（HTTP 304），不再重新传输
+        results = self.fetcher.download_many([img_url for _, img_url in pending])
+        
+        bar = progress('🖼️  图片', len(pending))
+        for (i, img_url), result in zip(pending, results):
+            bar.advance()
+            if result.get('from_cache'):
+                log.debug(f"  ♻️  图片未变化 {i+1}: {os.path.basename(urlparse(img_url).path)}")
+            else:
+                log.debug(f"  📥 下载图片 {i+1}: {os.path.basename(urlparse(img_url).path)}")
+            
+            if 'digest' not in result:
+                log.warning(f"⚠️  图片下载失败 {img_url}: {result['error']}", extra={'data': {'url': img_url}})
+                self.journal.record(img_url, 'asset', FAILED, error=result['error'])
+                page_data['images_failed'] += 1
+                continue
             
             try:
-                print(f"  📥 下载图片 {i+1}: {os.path.basename(urlparse(img_url).path)}")
-                img_response = requests.get(img_url, headers=self.headers, timeout=30)
+                content_type = result['content_type']
+                
+                # 内容已流式写入资源仓库（相同内容只保存一份），登记后链接到资源目录
+                ext = os.path.splitext(self.image_filename(img_url, {'content_type': content_type}))[1]
+                entry = self.asset_store.register(img_url, result['digest'], result['size'], content_type, ext,
+                                                  src_ext=result['ext'])
+                img_path = self.asset_store.place_unique(entry, self.assets_dir, self.image_filename(img_url, entry))
+                self.files.record(img_path, entry['size'], entry['digest'])
+                
+                self.downloaded_images.add(img_url)
+                self.journal.record(img_url, 'asset', DONE, path=str(img_path))
+                downloaded_count += 1
+                log.debug(f"    ✅ 保存: {img_path.name} ({entry['size']} 字节)")
                 
-                if img_response.status_code == 200:
-                    # 生成文件名
-                    img_filename = os.path.basename(urlparse(img_url).path)
-                    if not img_filename or '.' not in img_filename:
-                        content_type = img_response.headers.get('content-type', '')
-                        if 'png' in content_type:
-                            ext = '.png'
-                        elif 'jpeg' in content_type or 'jpg' in content_type:
-                            ext = '.jpg'
-                        elif 'gif' in content_type:
-                            ext = '.gif'
-                        elif 'svg' in content_type:
-                            ext = '.svg'
-                        else:
-                            ext = '.jpg'
-                        img_filename = f"image_{hash(img_url) % 10000}{ext}"
-                    
-                    # 确保文件名唯一
-                    counter = 1
-                    original_filename = img_filename
-                    while (self.assets_dir / img_filename).exists():
-                        name, ext = os.path.splitext(original_filename)
-                        img_filename = f"{name}_{counter}{ext}"
-                        counter += 1
-                    
-                    img_path = self.assets_dir / img_filename
-                    with open(img_path, 'wb') as f:
-                        f.write(img_response.content)
-                    
-                    self.downloaded_images.add(img_url)
-                    downloaded_count += 1
-                    print(f"    ✅ 保存: {img_filename} ({len(img_response.content)} 字节)")
-                else:
-                    print(f"    ❌ 下载失败: HTTP {img_response.status_code}")
-                    
             except Exception as e:
-                print(f"    ❌ 图片下载错误: {e}")
-            
-            # 避免过于频繁的请求
-            time.sleep(0.2)
+                log.error(f"❌ 图片保存错误 {img_url}: {e}", extra={'data': {'url': img_url}})
+                page_data['images_failed'] += 1
+        bar.close()
         
-        print(f"📥 成功下载 {downloaded_count} 个图片")
+        log.info(f"📥 成功下载 {downloaded_count} 个图片")
         return downloaded_count
     
+    def image_filename(self, img_url, entry):
+        """根据URL生成图片文件名，URL中没有扩展名时按内容类型推断"""
+        img_filename = os.path.basename(urlparse(img_url).path)
+        if img_filename and '.' in img_filename:
+            return img_filename
+        
+        content_type = entry.get('content_type', '')
+        if 'png' in content_type:
+            ext = '.png'
+        elif 'jpeg' in content_type or 'jpg' in content_type:
+            ext = '.jpg'
+        elif 'gif' in content_type:
+            ext = '.gif'
+        elif 'svg' in content_type:
+            ext = '.svg'
+        else:
+            ext = '.jpg'
+        
+        # 使用内容摘要命名，保证多次运行文件名稳定
+        if 'digest' in entry:
+            return f"image_{entry['digest'][:8]}{ext}"
+        return f"image{ext}"
+    
     def take_screenshot_simulation(self, page_data):
         """模拟截图功能（创建页面预览）"""
+        counts = page_data['facts'].counts
         # 由于我们无法真正截图，创建一个HTML预览文件
         preview_html = f"""
         <!DOCTYPE html>
@@ -238,9 +282,9 @@ class ComprehensiveScraper:
                 </div>
                 <div class="stats">
                     <strong>页面统计:</strong><br>
-                    - 图片数量: {len(page_data['soup'].find_all('img'))} 个<br>
-                    - 链接数量: {len(page_data['soup'].find_all('a', href=True))} 个<br>
-                    - 段落数量: {len(page_data['soup'].find_all('p'))} 个
+                    - 图片数量: {counts['images']} 个<br>
+                    - 链接数量: {counts['links']} 个<br>
+                    - 段落数量: {counts['paragraphs']} 个
                 </div>
             </div>
         </body>
@@ -250,93 +294,120 @@ class ComprehensiveScraper:
         filename = f"{page_data['filename_base']}_preview.html"
         preview_path = self.screenshots_dir / filename
         
-        with open(preview_path, 'w', encoding='utf-8') as f:
-            f.write(preview_html)
+        with metrics.timer('write'):
+            self.files.write_text(preview_path, preview_html)
         
-        print(f"📸 页面预览保存: {filename}")
+        log.debug(f"📸 页面预览保存: {filename}")
         return preview_path
     
     def scrape_website(self):
         """抓取整个网站"""
-        print("🚀 开始综合网站抓取...")
-        print(f"📁 输出目录: {self.output_dir}")
+        log.info("🚀 开始综合网站抓取...")
+        log.info(f"📁 输出目录: {self.output_dir}")
         
         # 要抓取的页面
         pages = [
-            "https://68tt.co/cn/",
-            "https://68tt.co/cn/about.html",
-            "https://68tt.co/cn/privacy.html",
-            "https://68tt.co/cn/enterprise.html"
+            f"{self.base_url}/cn/",
+            f"{self.base_url}/cn/about.html",
+            f"{self.base_url}/cn/privacy.html",
+            f"{self.base_url}/cn/enterprise.html"
         ]
         
         total_images = 0
         
-        for i, url in enumerate(pages, 1):
-            print(f"\n{'='*60}")
-            print(f"[{i}/{len(pages)}] 处理页面")
-            
-            # 抓取页面
-            page_data = self.scrape_page(url)
-            if not page_data:
-                continue
-            
-            # 保存HTML
-            self.save_html(page_data)
-            
-            # 保存Markdown
-            self.extract_and_save_markdown(page_data)
-            
-            # 下载图片
-            img_count = self.download_images(page_data)
-            total_images += img_count
-            
-            # 创建页面预览
-            self.take_screenshot_simulation(page_data)
-            
-            # 记录页面信息
-            self.scraped_pages.append({
-                'url': page_data['url'],
-                'title': page_data['title'],
-                'content_length': page_data['content_length'],
-                'images_downloaded': img_count
-            })
-            
-            # 页面间停顿
-            if i < len(pages):
-                time.sleep(2)
+        # 跳过检查点中已完成的页面
+        pending = [url for url in pages if self.journal.state(url) != DONE]
+        if len(pending) < len(pages):
+            log.info(f"⏭️  跳过 {len(pages) - len(pending)} 个已完成的页面")
+        
+        # 并发获取所有页面
+        try:
+            results = self.fetcher.fetch_many(pending, as_text=True)
+            for i, (url, result) in enumerate(zip(pending, results), 1):
+                total_images += self.process_page(i, len(pending), url, result)
+        finally:
+            self.close()
         
         # 生成最终报告
         self.generate_final_report(total_images)
     
-    def generate_final_report(self, total_images):
-        """生成最终报告"""
-        print(f"\n{'='*60}")
-        print("📊 综合抓取完成统计")
+    def process_page(self, i, total, url, result=None, facts=None):
+        """处理单个页面的所有输出，返回下载的图片数量"""
+        log.info(f"[{i}/{total}] 处理页面: {url}")
+        
+        # 抓取页面
+        page_data = self.scrape_page(url, result, facts)
+        if not page_data:
+            self.journal.record(url, 'page', FAILED)
+            return 0
+            
+        # 保存HTML
+        page_data['html_path'] = str(self.save_html(page_data))
         
-        # 文件统计
-        all_files = list(self.output_dir.rglob("*"))
-        files = [f for f in all_files if f.is_file()]
+        # 保存Markdown
+        self.extract_and_save_markdown(page_data)
         
-        html_files = [f for f in files if f.suffix == '.html']
-        md_files = [f for f in files if f.suffix == '.md']
-        img_files = [f for f in files if f.suffix.lower() in ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg']]
+        # 之后的阶段只需要页面信息记录，原始HTML已写入文件，随即释放
+        del page_data['html_content']
         
-        # 计算总大小
-        total_size = sum(f.stat().st_size for f in files)
+        # 下载图片
+        img_count = self.download_images(page_data)
         
-        print(f"📄 HTML 文件: {len(html_files)} 个")
-        print(f"📝 Markdown 文件: {len(md_files)} 个")
-        print(f"🖼️  图片文件: {len(img_files)} 个")
-        print(f"📁 总文件数: {len(files)} 个")
-        print(f"💾 总大小: {total_size/1024:.1f} KB")
+        # 创建页面预览
+        self.take_screenshot_simulation(page_data)
+        
+        # 记录页面信息
+        page_info = {
+            'url': page_data['url'],
+            'title': page_data['title'],
+            'content_length': page_data['content_length'],
+            'images_downloaded': img_count
+        }
+        self.scraped_pages.append(page_info)
+        
+        # 有图片下载失败的页面记为失败，恢复时重新处理（已下载的图片会跳过）
+        if page_data['images_failed']:
+            self.journal.record(url, 'page', FAILED, page=page_info)
+        else:
+            self.journal.record(url, 'page', DONE, page=page_info)
+        
+        return img_count
+    
+    def close(self):
+        """关闭自有的抓取引擎、检查点日志并保存资源索引和Markdown清单"""
+        self.journal.close()
+        self.asset_store.save()
+        self.markdown_manifest.save()
+        self.files.save()
+        if self.owns_fetcher:
+            self.fetcher.close()
+    
+    def generate_final_report(self, total_images, near_duplicates=None):
+        """生成最终报告
+
+        near_duplicates 为抓取时检测到的近似重复页面分组（这些页面没有生成输出）
+        """
+        log.info(f"{'='*60}")
+        log.info("📊 综合抓取完成统计")
+        
+        # 文件统计：读取写入时登记的累计值（先去掉已被删除的文件，报告本身不计入）
+        self.files.prune()
+        file_summary = self.files.summary()
+        by_kind = file_summary['by_kind']
+        
+        log.info(f"📄 HTML 文件: {by_kind.get('html', 0)} 个")
+        log.info(f"📝 Markdown 文件: {by_kind.get('markdown', 0)} 个")
+        log.info(f"🖼️  图片文件: {by_kind.get('image', 0)} 个")
+        log.info(f"📁 总文件数: {file_summary['files']} 个")
+        log.info(f"💾 总大小: {file_summary['bytes']/1024:.1f} KB")
         
         # 页面统计
-        print(f"\n📋 页面详情:")
+        log.debug(f"📋 页面详情:")
         for page in self.scraped_pages:
-            print(f"  - {page['title']}")
-            print(f"    URL: {page['url']}")
-            print(f"    内容: {page['content_length']} 字符")
-            print(f"    图片: {page['images_downloaded']} 个")
+            log.debug(f"  - {page['title']}")
+            log.debug(f"    URL: {page['url']}")
+            log.debug(f"    内容: {page['content_length']} 字符")
+            log.debug(f"    图片: {page['images_downloaded']} 个")
         
         # 生成JSON报告
         report = {
@@ -344,16 +415,22 @@ class ComprehensiveScraper:
                 'tool': 'Comprehensive Scraper',
                 'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
                 'total_pages': len(self.scraped_pages),
-                'total_images': len(img_files),
-                'total_files': len(files),
-                'total_size_bytes': total_size
+                'total_images': by_kind.get('image', 0),
+                'total_files': file_summary['files'],
+                'total_size_bytes': file_summary['bytes']
             },
             'pages': self.scraped_pages,
+            'near_duplicates': near_duplicates,
+            'http_cache': self.fetcher.engine.cache.stats() if self.fetcher.engine.cache else None,
+            # 本次写入和跳过（未变化）的 Markdown 文件数
+            'markdown': self.markdown_manifest.stats(),
+            # 各阶段和各主机的耗时与计数，同时写入 metrics.prom
+            'metrics': metrics.export(self.output_dir),
             'file_counts': {
-                'html': len(html_files),
-                'markdown': len(md_files),
-                'images': len(img_files),
-                'total': len(files)
+                'html': by_kind.get('html', 0),
+                'markdown': by_kind.get('markdown', 0),
+                'images': by_kind.get('image', 0),
+                'total': file_summary['files']
             },
             'directory_structure': {
                 'html': str(self.html_dir),
@@ -363,16 +440,23 @@ class ComprehensiveScraper:
             }
         }
         
-        report_path = self.output_dir / 'comprehensive_report.json'
-        with open(report_path, 'w', encoding='utf-8') as f:
-            json.dump(report, f, indent=2, ensure_ascii=False)
+        report_path = self.output_dir / REPORT_FILENAME
+        self.files.write_text(report_path, json.dumps(report, indent=2, ensure_ascii=False))
+        self.files.save()
         
-        print(f"\n📋 详细报告: {report_path}")
-        print(f"🎉 所有内容已保存到: {self.output_dir}")
+        log.info(f"📋 详细报告: {report_path}")
+        log.info(f"🎉 所有内容已保存到: {self.output_dir}")
 
 def main():
     """主函数"""
-    scraper = ComprehensiveScraper()
+    arg_parser = argparse.ArgumentParser(description='68tt.co 综合网站抓取工具')
+    arg_parser.add_argument('--resume', action='store_true', help='从检查点日志继续上次中断的抓取')
+    add_parser_argument(arg_parser)
+    add_log_arguments(arg_parser)
+    args = arg_parser.parse_args()
+    configure_from_args(args)
+    
+    scraper = ComprehensiveScraper(parser=args.parser, resume=args.resume)
     scraper.scrape_website()
 
 if __name__ == "__main__":
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+增量输出清单
+记录每个输出文件对应的源内容摘要和输出内容摘要，源内容未变化时跳过生成和写入，
+输出内容未变化时不重写文件，监视输出目录的下游只会看到真正的变化
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+MANIFEST_FILENAME = 'manifest.json'
+
+
+def content_digest(content):
+    """字符串或字节内容的 SHA-256 摘要"""
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return hashlib.sha256(content).hexdigest()
+
+
+class ContentManifest:
+    """输出目录的清单
+
+    manifest_path 默认为输出目录下的 manifest.json，放在目录外可避免清单本身触发下游的变化通知；
+    清单内容: {"version": 生成器版本, "files": {文件名: {"source": 源摘要, "output": 输出摘要}}}；
+    version 与当前生成器版本不同时（输出格式已改变）视为全部需要重新生成
+    """
+
+    def __init__(self, output_dir, manifest_path=None, version=1):
+        self.output_dir = Path(output_dir)
+        self.path = Path(manifest_path) if manifest_path else self.output_dir / MANIFEST_FILENAME
+        self.version = version
+        self.files = self.load()
+        self.dirty = False
+        self.written = 0
+        self.unchanged = 0
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        if manifest.get('version') != self.version:
+            return {}
+        return manifest.get('files', {})
+
+    def is_current(self, name, source_digest):
+        """源内容未变化且输出文件仍然存在"""
+        entry = self.files.get(name)
+        if entry and entry['source'] == source_digest and (self.output_dir / name).exists():
+            self.unchanged += 1
+            return True
+        return False
+
+    def write(self, name, source_digest, content):
+        """写入输出文件并记录摘要，输出内容与上次相同时不重写，返回是否写入"""
+        output_digest = content_digest(content)
+        entry = self.files.get(name)
+        path = self.output_dir / name
+        changed = not (entry and entry['output'] == output_digest and path.exists())
+        if changed:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            self.written += 1
+        else:
+            self.unchanged += 1
+        if not entry or entry != {'source': source_digest, 'output': output_digest}:
+            self.files[name] = {'source': source_digest, 'output': output_digest}
+            self.dirty = True
+        return changed
+
+    def stats(self):
+        return {'written': self.written, 'unchanged': self.unchanged}
+
+    def save(self):
+        """保存清单（先写临时文件再替换）"""
+        if not self.dirty:
+            return
+        tmp_path = self.path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': self.version, 'files': self.files}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
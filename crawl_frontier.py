@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+广度优先抓取队列
+URL规范化、去重、深度和页面数量限制
+"""
+
+import os
+from collections import deque
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# 视为页面的路径扩展名；其他扩展名（图片、PDF 等）不进入抓取队列
+PAGE_EXTENSIONS = {'', '.html', '.htm', '.php', '.asp', '.aspx', '.jsp'}
+
+
+def normalize_url(url):
+    """规范化URL，用于去重
+
+    协议和主机名转小写，去掉默认端口和片段，空路径补为 /，查询参数按名称排序
+    """
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = parts.path or '/'
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, path, query, ''))
+
+
+def is_page_url(url):
+    """根据路径扩展名判断是否为HTML页面"""
+    return os.path.splitext(urlsplit(url).path)[1].lower() in PAGE_EXTENSIONS
+
+
+class Frontier:
+    """广度优先抓取队列
+
+    max_depth: 起始页为第 0 层，超过该深度的链接不再加入
+    max_pages: 最多加入队列的页面数（None 表示不限）
+    key: 可选的去重键函数，例如按本地保存路径去重，使 /cn/ 与 /cn/index.html 只抓取一次
+    """
+
+    def __init__(self, max_depth=3, max_pages=200, key=None):
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.key = key
+        self.queue = deque()
+        self.seen = set()
+        self.depths = {}
+
+    def add(self, url, depth=0):
+        """加入队列，返回规范化后的URL；已见过或超出限制时返回 None"""
+        url = normalize_url(url)
+        key = self.key(url) if self.key else url
+        if key in self.seen or not is_page_url(url):
+            return None
+        if self.max_depth is not None and depth > self.max_depth:
+            return None
+        if self.max_pages is not None and len(self.seen) >= self.max_pages:
+            return None
+        self.seen.add(key)
+        self.depths[url] = depth
+        self.queue.append(url)
+        return url
+
+    def add_links(self, urls, parent_url):
+        """加入页面上发现的链接，深度为父页面深度加一，返回新加入的URL"""
+        depth = self.depths.get(normalize_url(parent_url), 0) + 1
+        added = (self.add(url, depth) for url in urls)
+        return [url for url in added if url]
+
+    def restore(self, url, depth, pending):
+        """从检查点恢复一个已发现的页面，pending 为 False 时只标记为已见过"""
+        if pending:
+            return self.add(url, depth)
+        url = normalize_url(url)
+        self.seen.add(self.key(url) if self.key else url)
+        self.depths[url] = depth
+        return None
+
+    def pop(self):
+        """取出下一个URL，队列为空时返回 None"""
+        return self.queue.popleft() if self.queue else None
+
+    def depth(self, url):
+        return self.depths.get(normalize_url(url))
+
+    def __len__(self):
+        return len(self.queue)
+
+    def __bool__(self):
+        return bool(self.queue)
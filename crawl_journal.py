@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+抓取检查点日志
+以 JSONL 追加记录每个 URL 的状态变化，进程中断后可从日志恢复，只重做未完成和失败的部分
+"""
+
+import json
+import time
+from pathlib import Path
+
+JOURNAL_FILENAME = 'crawl_journal.jsonl'
+
+QUEUED = 'queued'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class CrawlJournal:
+    """追加写入的抓取日志
+
+    每行一条记录: {"url", "kind", "state", "time", ...}，kind 为 page 或 asset；
+    同一 URL 以最后一条记录为准。resume=False 时清空旧日志重新开始
+    """
+
+    def __init__(self, output_dir, resume=False):
+        self.path = Path(output_dir) / JOURNAL_FILENAME
+        self.entries = self.load() if resume else {}
+        self.file = open(self.path, 'a' if resume else 'w', encoding='utf-8')
+
+    def load(self):
+        """重放日志，返回 {url: 最后一条记录}，按首次出现的顺序排列"""
+        entries = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # 中断时可能留下写了一半的最后一行
+                        continue
+                    previous = entries.get(entry['url'], {})
+                    entries[entry['url']] = {**previous, **entry}
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def record(self, url, kind, state, **fields):
+        """追加一条状态记录并立即刷新到磁盘"""
+        entry = {'url': url, 'kind': kind, 'state': state, 'time': time.time(), **fields}
+        previous = self.entries.get(url, {})
+        self.entries[url] = {**previous, **entry}
+        self.file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self.file.flush()
+
+    def items(self, kind, state=None):
+        """指定类型（和状态）的记录，按首次出现的顺序"""
+        return [entry for entry in self.entries.values()
+                if entry['kind'] == kind and (state is None or entry['state'] == state)]
+
+    def state(self, url):
+        entry = self.entries.get(url)
+        return entry['state'] if entry else None
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
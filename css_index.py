@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+CSS 解析与规则索引
+逐字符扫描样式表（正确处理注释、字符串和嵌套的 @media 块），
+每个样式表只解析一次，建立 选择器 → 规则 和 类名 → 规则 的索引，按内容摘要缓存
+"""
+
+import hashlib
+import re
+from collections import namedtuple
+from dataclasses import dataclass, field
+
+Declaration = namedtuple('Declaration', ['name', 'value', 'important'])
+
+# 块内仍是规则列表的 @ 规则；其他 @ 规则（@font-face、@keyframes 等）整体保存原文
+NESTED_AT_RULES = {'media', 'supports', 'document', 'layer', 'container'}
+
+CLASS_PATTERN = re.compile(r'\.(-?[_a-zA-Z][\w-]*)')
+ATTRIBUTE_PATTERN = re.compile(r'\[[^\]]*\]')
+AT_NAME_PATTERN = re.compile(r'@([-\w]*)')
+NAME_CHAR_PATTERN = re.compile(r'[\w-]')
+
+
+@dataclass
+class StyleRule:
+    """样式规则"""
+    selectors: tuple
+    declarations: tuple
+    media: tuple
+    text: str
+
+    def get(self, name, default=None):
+        """最后一个同名声明的值"""
+        for declaration in reversed(self.declarations):
+            if declaration.name == name:
+                return declaration.value
+        return default
+
+
+@dataclass
+class AtRule:
+    """@ 规则（@import、@font-face、@keyframes 等），只保存原文"""
+    name: str
+    prelude: str
+    text: str
+
+
+@dataclass
+class MediaBlock:
+    """@media 等条件块，children 中可以继续嵌套条件块"""
+    name: str
+    condition: str
+    text: str = ''
+    rules: list = field(default_factory=list)
+    children: list = field(default_factory=list)
+
+
+@dataclass
+class Stylesheet:
+    """解析后的样式表及其索引"""
+    digest: str
+    rules: list
+    at_rules: list
+    media: list
+    by_selector: dict
+    by_class: dict
+    _positions: dict = field(default=None, repr=False, compare=False)
+
+    def lookup(self, selector, contains=False):
+        """按完整选择器查找规则（O(1)）
+
+        contains 为 True 时同时匹配包含该选择器的较长选择器（如 .headImg img 匹配
+        .wrap .headImg img、.headImg img:hover），候选规则先按类名索引缩小范围，结果按文档顺序排列
+        """
+        selector = normalize_selector(selector)
+        if not contains:
+            return self.by_selector.get(selector, [])
+        classes = selector_classes(selector)
+        candidates = min((self.by_class.get(name, []) for name in classes), key=len) if classes else self.rules
+        return [rule for rule in candidates
+                if any(selector_contains(candidate, selector) for candidate in rule.selectors)]
+
+    def rules_with_class(self, class_name, prefix=False):
+        """选择器中包含指定类名的规则（O(1)）
+
+        prefix 为 True 时匹配以该名称开头的所有类名（如 banner 匹配 .banner2、.banner-top），
+        结果按文档顺序排列且不重复
+        """
+        class_name = class_name.lstrip('.')
+        if not prefix:
+            return self.by_class.get(class_name, [])
+        matched = {}
+        for name in self.classes_with_prefix(class_name):
+            for rule in self.by_class[name]:
+                matched[id(rule)] = rule
+        position = self.rule_positions()
+        return sorted(matched.values(), key=lambda rule: position[id(rule)])
+
+    def rule_positions(self):
+        """规则在样式表中的顺序"""
+        if self._positions is None:
+            self._positions = {id(rule): i for i, rule in enumerate(self.rules)}
+        return self._positions
+
+    def classes_with_prefix(self, *prefixes):
+        """以指定前缀开头的类名"""
+        return sorted(name for name in self.by_class if name.startswith(prefixes))
+
+    def iter_media(self):
+        """按文档顺序遍历所有条件块（含嵌套）"""
+        stack = list(reversed(self.media))
+        while stack:
+            block = stack.pop()
+            yield block
+            stack.extend(reversed(block.children))
+
+
+def normalize_selector(selector):
+    """规范化选择器：合并空白，组合符两侧统一为单个空格（括号内不处理）"""
+    parts = []
+    depth = 0
+    pending_space = False
+    for char in selector.strip():
+        if char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+
+        if depth == 0 and char.isspace():
+            pending_space = True
+            continue
+        if depth == 0 and char in '>+~':
+            parts.append(f' {char} ')
+            pending_space = False
+            continue
+
+        if pending_space and parts and not parts[-1].endswith(' '):
+            parts.append(' ')
+        pending_space = False
+        parts.append(char)
+    return ''.join(parts)
+
+
+def selector_contains(selector, part):
+    """规范化后的 selector 是否在简单选择器边界处包含 part
+
+    .headImg img 匹配 .wrap .headImg img 和 .headImg img:hover，不匹配 .headImg imgs 或 .headImgs img
+    """
+    start = selector.find(part)
+    while start != -1:
+        end = start + len(part)
+        before = start == 0 or not NAME_CHAR_PATTERN.match(part[0]) or selector[start - 1] == ' '
+        after = end == len(selector) or not NAME_CHAR_PATTERN.match(selector[end])
+        if before and after:
+            return True
+        start = selector.find(part, start + 1)
+    return False
+
+
+def selector_classes(selector):
+    """选择器中出现的类名（忽略属性选择器中的内容）"""
+    return set(CLASS_PATTERN.findall(ATTRIBUTE_PATTERN.sub('', selector)))
+
+
+class _Scanner:
+    """按字符扫描CSS，跳过注释和字符串"""
+
+    def __init__(self, text):
+        self.text = text
+        self.pos = 0
+
+    def skip_space(self):
+        text = self.text
+        while self.pos < len(text):
+            if text[self.pos].isspace():
+                self.pos += 1
+            elif text.startswith('/*', self.pos):
+                end = text.find('*/', self.pos + 2)
+                self.pos = len(text) if end == -1 else end + 2
+            else:
+                break
+
+    def read_until(self, stops):
+        """读取到 stops 中的字符（括号和字符串内的不算），返回去掉注释的文本"""
+        text = self.text
+        parts = []
+        depth = 0
+        while self.pos < len(text):
+            char = text[self.pos]
+            if depth == 0 and char in stops:
+                break
+            if text.startswith('/*', self.pos):
+                end = text.find('*/', self.pos + 2)
+                self.pos = len(text) if end == -1 else end + 2
+                parts.append(' ')
+                continue
+            if char in '"\'':
+                end = self._string_end(char)
+                parts.append(text[self.pos:end])
+                self.pos = end
+                continue
+            if char in '([':
+                depth += 1
+            elif char in ')]' and depth:
+                depth -= 1
+            parts.append(char)
+            self.pos += 1
+        return ''.join(parts)
+
+    def skip_block(self):
+        """跳过一个 {...} 块（当前位置为 {），支持嵌套"""
+        text = self.text
+        depth = 0
+        while self.pos < len(text):
+            char = text[self.pos]
+            if text.startswith('/*', self.pos):
+                end = text.find('*/', self.pos + 2)
+                self.pos = len(text) if end == -1 else end + 2
+                continue
+            if char in '"\'':
+                self.pos = self._string_end(char)
+                continue
+            self.pos += 1
+            if char == '{':
+                depth += 1
+            elif char == '}':
+                depth -= 1
+                if depth == 0:
+                    return
+
+    def _string_end(self, quote):
+        text = self.text
+        pos = self.pos + 1
+        while pos < len(text):
+            if text[pos] == '\\':
+                pos += 2
+                continue
+            if text[pos] == quote or text[pos] == '\n':
+                return pos + 1
+            pos += 1
+        return len(text)
+
+
+def _parse_declarations(body):
+    """解析声明块内容"""
+    declarations = []
+    scanner = _Scanner(body)
+    while scanner.pos < len(body):
+        item = scanner.read_until(';').strip()
+        scanner.pos += 1
+        if ':' not in item:
+            continue
+        name, value = item.split(':', 1)
+        value = value.strip()
+        important = value.lower().endswith('!important')
+        if important:
+            value = value[:-len('!important')].rstrip()
+        declarations.append(Declaration(name.strip().lower(), value, important))
+    return tuple(declarations)
+
+
+def _parse(text):
+    """扫描样式表，返回 (规则, @规则, 条件块)"""
+    scanner = _Scanner(text)
+    rules = []
+    at_rules = []
+    top_media = []
+    # 栈中每一层为 (条件块, 条件链, 起始位置)，顶层为 (None, (), 0)
+    stack = [(None, (), 0)]
+
+    while True:
+        scanner.skip_space()
+        if scanner.pos >= len(text):
+            break
+
+        char = text[scanner.pos]
+        if char == '}':
+            # 条件块结束
+            scanner.pos += 1
+            if len(stack) > 1:
+                block, _, block_start = stack.pop()
+                block.text = text[block_start:scanner.pos]
+            continue
+
+        start = scanner.pos
+        prelude = scanner.read_until('{;}').strip()
+        if scanner.pos >= len(text):
+            break
+
+        terminator = text[scanner.pos]
+        parent, media, _ = stack[-1]
+
+        if prelude.startswith('@'):
+            name = AT_NAME_PATTERN.match(prelude).group(1)
+            condition = prelude[1 + len(name):].strip()
+            name = name.lower()
+            if terminator == '{' and name in NESTED_AT_RULES:
+                scanner.pos += 1
+                block = MediaBlock(name, condition)
+                (parent.children if parent else top_media).append(block)
+                stack.append((block, media + (condition,), start))
+                continue
+            if terminator == '{':
+                scanner.skip_block()
+            elif terminator == ';':
+                scanner.pos += 1
+            at_rules.append(AtRule(name, condition, text[start:scanner.pos].strip()))
+            continue
+
+        if terminator != '{':
+            # 孤立的文本（语法错误），跳过
+            if terminator == ';':
+                scanner.pos += 1
+            continue
+
+        body_start = scanner.pos + 1
+        scanner.skip_block()
+        body = text[body_start:scanner.pos - 1]
+        selectors = tuple(normalize_selector(part) for part in prelude.split(',') if part.strip())
+        rule = StyleRule(selectors, _parse_declarations(body), media, text[start:scanner.pos].strip())
+        rules.append(rule)
+        if parent:
+            parent.rules.append(rule)
+
+    return rules, at_rules, top_media
+
+
+_cache = {}
+
+
+def parse_stylesheet(text):
+    """解析样式表并建立索引，相同内容只解析一次"""
+    digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    if digest in _cache:
+        return _cache[digest]
+
+    rules, at_rules, media = _parse(text)
+    by_selector = {}
+    by_class = {}
+    for rule in rules:
+        for selector in rule.selectors:
+            by_selector.setdefault(selector, []).append(rule)
+        classes = set()
+        for selector in rule.selectors:
+            classes |= selector_classes(selector)
+        for class_name in classes:
+            by_class.setdefault(class_name, []).append(rule)
+
+    sheet = Stylesheet(digest, rules, at_rules, media, by_selector, by_class)
+    _cache[digest] = sheet
+    return sheet
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+多设备并发抓取
+把 (URL, 设备) 组合一次性并发提交给共享抓取引擎，按内容摘要标记字节完全相同的设备变体
+"""
+
+import asyncio
+import hashlib
+
+from fetch_engine import DEFAULT_USER_AGENT, BlockingFetchEngine
+
+# 设备配置：每个设备对应一组请求头
+DEVICE_PROFILES = {
+    'desktop': {
+        'User-Agent': DEFAULT_USER_AGENT
+    },
+    'mobile': {
+        'User-Agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Mobile/15E148 Safari/604.1'
+    }
+}
+
+
+def fetch_device_matrix(pairs, profiles=None, fetcher=None, as_text=True):
+    """并发获取多个 (URL, 设备) 组合
+
+    返回 {(url, device): 结果}，结果与 FetchEngine.fetch 相同，成功时另有：
+    digest: 响应内容的 SHA-256
+    duplicate_of: 同一URL下内容完全相同的第一个设备，内容不同时为 None
+
+    不启用条件请求缓存：缓存按URL索引，不同设备的响应会互相覆盖
+    """
+    profiles = profiles or DEVICE_PROFILES
+    pairs = list(dict.fromkeys(pairs))
+    owns_fetcher = fetcher is None
+    fetcher = fetcher or BlockingFetchEngine(per_host=max(len(pairs), 1))
+
+    async def fetch_all():
+        tasks = [fetcher.engine.fetch(url, headers=profiles[device], as_text=as_text) for url, device in pairs]
+        return await asyncio.gather(*tasks)
+
+    try:
+        results = fetcher.run(fetch_all())
+    finally:
+        if owns_fetcher:
+            fetcher.close()
+
+    matrix = {}
+    first_by_digest = {}
+    for (url, device), result in zip(pairs, results):
+        if 'content' in result:
+            content = result['content']
+            digest = hashlib.sha256(content.encode('utf-8') if as_text else content).hexdigest()
+            first_device = first_by_digest.setdefault((url, digest), device)
+            result['digest'] = digest
+            result['duplicate_of'] = first_device if first_device != device else None
+        matrix[(url, device)] = result
+    return matrix
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+共享异步抓取引擎
+为所有抓取器提供连接池、按主机并发限制和礼貌速率控制
+"""
+
+import asyncio
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+import aiohttp
+
+import metrics
+from asset_store import CHUNK_SIZE, AssetStore
+
+# 可能在重试后成功的状态码；其余 4xx（如 404）视为永久失败
+TRANSIENT_STATUSES = {408, 425, 429}
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+
+def is_transient_error(result):
+    """失败结果是否为临时错误（连接异常、超时、5xx、429 等），重新请求可能成功"""
+    status = result['status']
+    return status == 0 or status >= 500 or status in TRANSIENT_STATUSES
+
+
+class FetchEngine:
+    """异步抓取引擎
+
+    concurrency: 连接池总连接数
+    per_host: 单个主机同时进行的请求数
+    rate: 单个主机每秒最多发起的请求数（None 表示不限速）
+    cache: 可选的 HTTPCache，启用条件请求重新验证
+    store: 流式下载写入的 AssetStore，默认使用缓存所在的仓库
+    share_downloads: 为 True 时同一URL在引擎生命周期内只下载一次，多个调用方共享结果；
+        404 等永久失败同样共享，只有临时错误才会在之后重新请求
+    """
+
+    def __init__(self, concurrency=10, per_host=4, rate=5.0, timeout=30, headers=None, cache=None, store=None,
+                 share_downloads=False):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.min_interval = 1.0 / rate if rate else 0
+        self.timeout = timeout
+        self.headers = {'User-Agent': DEFAULT_USER_AGENT}
+        if headers:
+            self.headers.update(headers)
+        self.cache = cache
+        self.store = store or (cache.store if cache else None)
+        self._downloads = {} if share_downloads else None
+
+        self.session = None
+        self._host_slots = {}
+        self._host_locks = {}
+        self._next_request_at = {}
+
+    async def start(self):
+        """创建连接池和会话"""
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.per_host)
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers=self.headers
+            )
+        return self
+
+    async def close(self):
+        """关闭会话并保存缓存索引"""
+        if self.cache:
+            self.cache.save()
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _host_slot(self, host):
+        """获取主机对应的信号量"""
+        if host not in self._host_slots:
+            self._host_slots[host] = asyncio.Semaphore(self.per_host)
+            self._host_locks[host] = asyncio.Lock()
+        return self._host_slots[host]
+
+    async def _throttle(self, host):
+        """按主机控制请求间隔"""
+        if not self.min_interval:
+            return
+
+        loop = asyncio.get_running_loop()
+        async with self._host_locks[host]:
+            now = loop.time()
+            next_at = self._next_request_at.get(host, now)
+            if next_at > now:
+                await asyncio.sleep(next_at - now)
+            self._next_request_at[host] = max(now, next_at) + self.min_interval
+
+    async def _request(self, url, headers, handle, stage='fetch'):
+        """在主机并发限制和限速下发起 GET 请求
+
+        handle(response, cached, started) 处理响应并返回结果字典；
+        启用缓存时自动附加条件请求头，出错时返回包含 error 的字典；
+        服务器返回 304 但缓存内容已从资源仓库中丢失时，删除缓存条目并不带条件头重新请求；
+        耗时、状态码和字节数按 stage 和主机记入指标
+        """
+        await self.start()
+        host = urlparse(url).netloc
+
+        request_headers = headers
+        cached = self.cache.lookup(url) if self.cache else None
+        if cached:
+            headers = dict(headers or {})
+            headers.update(self.cache.conditional_headers(cached))
+        stale = False
+
+        async with self._host_slot(host):
+            await self._throttle(host)
+            started = time.perf_counter()
+            try:
+                async with self.session.get(url, headers=headers) as response:
+                    if response.status == 304 and cached and not self.cache.has_content(cached):
+                        stale = True
+                        result = None
+                    elif response.status != 200 and not (response.status == 304 and cached):
+                        result = {
+                            'url': url,
+                            'status': response.status,
+                            'error': f'HTTP {response.status}',
+                            'elapsed': time.perf_counter() - started
+                        }
+                    else:
+                        result = await handle(response, cached, started)
+            except Exception as e:
+                result = {
+                    'url': url,
+                    'status': 0,
+                    'error': str(e) or e.__class__.__name__,
+                    'elapsed': time.perf_counter() - started
+                }
+
+        if stale:
+            self.cache.forget(url)
+            return await self._request(url, request_headers, handle, stage)
+
+        self._record(stage, host, result)
+        return result
+
+    def _record(self, stage, host, result):
+        """把一次请求记入指标"""
+        metrics.registry.observe(metrics.STAGE_SECONDS, result['elapsed'], stage=stage, host=host)
+        metrics.registry.inc('requests_total', stage=stage, host=host, status=result['status'])
+        if 'error' in result:
+            metrics.registry.inc('errors_total', stage=stage, host=host)
+        elif not result.get('from_cache'):
+            metrics.registry.inc('bytes_total', result.get('size', 0), stage=stage, host=host)
+
+    async def fetch(self, url, headers=None, as_text=False):
+        """获取单个URL
+
+        成功时返回包含 content 的字典，失败时返回包含 error 的字典；
+        启用缓存时，服务器返回 304 的结果带有 from_cache 标记
+        """
+        async def handle(response, cached, started):
+            if response.status == 304:
+                content = self.cache.read(cached)
+                if as_text:
+                    content = content.decode(cached['charset'] or 'utf-8', errors='replace')
+                return {
+                    'url': url,
+                    'final_url': str(response.url),
+                    'status': 200,
+                    'content': content,
+                    'content_type': cached['content_type'],
+                    'headers': dict(response.headers),
+                    'from_cache': True,
+                    'elapsed': time.perf_counter() - started
+                }
+
+            content = await response.read()
+            size = len(content)
+            if self.cache:
+                self.cache.store_response(url, response.headers, content, response.charset)
+            if as_text:
+                # 未声明字符集时按 UTF-8 解码，避免退化为 latin-1
+                content = content.decode(response.charset or 'utf-8', errors='replace')
+
+            return {
+                'url': url,
+                'final_url': str(response.url),
+                'status': response.status,
+                'content': content,
+                'content_type': response.headers.get('content-type', ''),
+                'headers': dict(response.headers),
+                'size': size,
+                'from_cache': False,
+                'elapsed': time.perf_counter() - started
+            }
+
+        return await self._request(url, headers, handle)
+
+    async def download(self, url, headers=None):
+        """流式下载单个URL到资源仓库
+
+        响应按块写入临时文件并同时计算摘要，完成后原子改名，内存占用与资源大小无关；
+        成功时返回包含 digest / ext / size 的字典（不含 content），失败时返回包含 error 的字典
+        """
+        if self._downloads is None:
+            return await self._download(url, headers)
+
+        # 共享模式：并发或先后请求同一URL的调用方等待同一个下载任务
+        task = self._downloads.get(url)
+        if task is None:
+            task = self._downloads[url] = asyncio.ensure_future(self._download(url, headers))
+            task.add_done_callback(lambda done: self._forget_failed_download(url, done))
+        return await asyncio.shield(task)
+
+    def _forget_failed_download(self, url, task):
+        """临时失败的下载不保留在共享表中，之后的调用方重新请求，避免一次网络错误影响整次运行；
+        404 等永久失败的结果保留，整次运行中不再重复请求
+        """
+        failed = (task.cancelled() or task.exception() is not None
+                  or ('error' in task.result() and is_transient_error(task.result())))
+        if failed and self._downloads.get(url) is task:
+            del self._downloads[url]
+
+    async def _download(self, url, headers):
+        if self.store is None:
+            self.store = AssetStore()
+        url_ext = os.path.splitext(urlparse(url).path)[1]
+
+        async def handle(response, cached, started):
+            if response.status == 304:
+                self.cache.revalidated(cached)
+                digest, object_ext, size = cached['digest'], cached['ext'], cached['size']
+                content_type = cached['content_type']
+            else:
+                with self.store.open_object(url_ext) as writer:
+                    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                        writer.write(chunk)
+                    digest = writer.commit()
+                object_ext, size = url_ext, writer.size
+                content_type = response.headers.get('content-type', '')
+                if self.cache:
+                    self.cache.store_object(url, response.headers, digest, url_ext, size, response.charset)
+
+            return {
+                'url': url,
+                'final_url': str(response.url),
+                'status': 200,
+                'digest': digest,
+                'ext': object_ext,
+                'size': size,
+                'content_type': content_type,
+                'headers': dict(response.headers),
+                'from_cache': response.status == 304,
+                'elapsed': time.perf_counter() - started
+            }
+
+        return await self._request(url, headers, handle, stage='download')
+
+    async def fetch_many(self, urls, headers=None, as_text=False):
+        """并发获取多个URL，结果顺序与输入一致"""
+        tasks = [self.fetch(url, headers=headers, as_text=as_text) for url in urls]
+        return await asyncio.gather(*tasks)
+
+    async def download_many(self, urls, headers=None):
+        """并发流式下载多个URL到资源仓库，结果顺序与输入一致"""
+        tasks = [self.download(url, headers=headers) for url in urls]
+        return await asyncio.gather(*tasks)
+
+
+class BlockingFetchEngine:
+    """同步包装器
+
+    在后台线程中运行事件循环，让同步抓取器也能共享同一个连接池
+    """
+
+    def __init__(self, **engine_options):
+        self.engine = FetchEngine(**engine_options)
+        self._loop = None
+        self._thread = None
+        self._loop_lock = threading.Lock()
+
+    def _ensure_loop(self):
+        # 多个线程同时提交时只创建一个事件循环
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+                self._thread.start()
+
+    def submit(self, coro):
+        """提交协程到后台事件循环，返回 concurrent.futures.Future"""
+        self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def run(self, coro):
+        """提交协程并等待结果"""
+        return self.submit(coro).result()
+
+    def submit_fetch(self, url, headers=None, as_text=False):
+        """提交单个请求，不等待结果，返回 concurrent.futures.Future"""
+        return self.submit(self.engine.fetch(url, headers=headers, as_text=as_text))
+
+    def fetch(self, url, headers=None, as_text=False):
+        return self.run(self.engine.fetch(url, headers=headers, as_text=as_text))
+
+    def fetch_many(self, urls, headers=None, as_text=False):
+        return self.run(self.engine.fetch_many(urls, headers=headers, as_text=as_text))
+
+    def download(self, url, headers=None):
+        return self.run(self.engine.download(url, headers=headers))
+
+    def download_many(self, urls, headers=None):
+        return self.run(self.engine.download_many(urls, headers=headers))
+
+    def close(self):
+        """关闭会话并停止后台事件循环"""
+        if self._loop is None:
+            return
+        self.run(self.engine.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+        self._thread = None
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+输出文件清单
+写入方在写文件时登记路径、大小、类型和摘要，并累加各类型、各目录的计数；
+报告直接读取累计值，不再对整个输出目录 rglob 并逐个 stat
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import Counter
+from pathlib import Path
+
+FILE_MANIFEST_FILENAME = 'file_manifest.json'
+
+IMAGE_SUFFIXES = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg'}
+FILE_KINDS = {'.html': 'html', '.md': 'markdown', '.json': 'json'}
+
+
+def file_kind(path):
+    """按扩展名分类: html / markdown / json / image / other"""
+    suffix = Path(path).suffix.lower()
+    if suffix in IMAGE_SUFFIXES:
+        return 'image'
+    return FILE_KINDS.get(suffix, 'other')
+
+
+class FileManifest:
+    """输出目录的文件清单（线程安全）
+
+    file_manifest.json 记录 {相对路径: {"size", "kind", "sha256"}}，多次运行之间保留，
+    未在本次重写的文件仍计入统计；同一路径重复登记时以最后一次为准。
+    exclude 中的相对路径（如包含文件统计的报告本身）不登记、不计入统计
+    """
+
+    def __init__(self, output_dir, exclude=()):
+        self.output_dir = Path(output_dir)
+        self.path = self.output_dir / FILE_MANIFEST_FILENAME
+        self.exclude = set(exclude)
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.kinds = Counter()
+        self.dirs = Counter()
+        self.total_size = 0
+        # 本次运行中登记过的路径，清理时不必再检查是否存在
+        self.seen = set()
+        self.dirty = False
+        for name, entry in self.load().items():
+            if name in self.exclude:
+                self.dirty = True
+                continue
+            self._add(name, entry)
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _name(self, path):
+        return Path(os.path.relpath(path, self.output_dir)).as_posix()
+
+    def _add(self, name, entry):
+        self.entries[name] = entry
+        self.kinds[entry['kind']] += 1
+        self.total_size += entry['size']
+        if '/' in name:
+            self.dirs[name.split('/', 1)[0]] += 1
+
+    def _remove(self, name):
+        entry = self.entries.pop(name)
+        self.kinds[entry['kind']] -= 1
+        self.total_size -= entry['size']
+        if '/' in name:
+            self.dirs[name.split('/', 1)[0]] -= 1
+
+    def contains(self, path):
+        return self._name(path) in self.entries
+
+    def record(self, path, size, digest=None):
+        """登记一个已写入的文件，digest 为内容的 SHA-256（未知时为 None）"""
+        name = self._name(path)
+        if name in self.exclude:
+            return
+        entry = {'size': size, 'kind': file_kind(name), 'sha256': digest}
+        with self.lock:
+            self.seen.add(name)
+            if self.entries.get(name) == entry:
+                return
+            if name in self.entries:
+                self._remove(name)
+            self._add(name, entry)
+            self.dirty = True
+
+    def record_content(self, path, content):
+        """登记一个刚写入的文件，大小和摘要由写入的内容计算"""
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        self.record(path, len(content), hashlib.sha256(content).hexdigest())
+
+    def write_text(self, path, text):
+        """写入文本文件并登记"""
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        self.record_content(path, text)
+
+    def summary(self):
+        """文件总数、总字节数，以及按类型和按一级子目录的计数"""
+        with self.lock:
+            return {
+                'files': len(self.entries),
+                'bytes': self.total_size,
+                'by_kind': {kind: count for kind, count in sorted(self.kinds.items()) if count},
+                'by_dir': {name: count for name, count in sorted(self.dirs.items()) if count}
+            }
+
+    def files(self):
+        """(相对路径, 大小) 列表，按路径排序"""
+        with self.lock:
+            return sorted((name, entry['size']) for name, entry in self.entries.items())
+
+    def prune(self):
+        """删除本次未登记且已不存在的文件（被删除或改名替换），返回删除的条目数"""
+        with self.lock:
+            stale = [name for name in self.entries
+                     if name not in self.seen and not (self.output_dir / name).exists()]
+            for name in stale:
+                self._remove(name)
+            if stale:
+                self.dirty = True
+        return len(stale)
+
+    def save(self):
+        """清理已不存在的文件后保存清单（先写临时文件再替换）"""
+        self.prune()
+        with self.lock:
+            if not self.dirty:
+                return
+            tmp_path = self.path.with_suffix('.json.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Firecrawl 爬取任务轮询
+异步轮询 /crawl/status/{job_id}，指数退避加随机抖动，不设固定次数上限；
+任务进行中返回的部分结果立即交给下游处理，处理与远程爬取同时进行，可随时取消
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import time
+
+import aiohttp
+
+from raw_results import PAGE_LIST_FIELDS
+from scrape_log import log
+
+DEFAULT_API_URL = "https://api.firecrawl.dev/v0"
+
+# 任务结束的状态
+TERMINAL_STATUSES = {'completed', 'failed', 'cancelled'}
+
+# 连续多少次状态检查失败后放弃（服务不可达或任务不存在）
+MAX_CONSECUTIVE_ERRORS = 10
+
+
+def page_key(page_data):
+    """页面的去重键：优先使用来源URL，没有时使用内容摘要"""
+    metadata = page_data.get('metadata') or {}
+    url = metadata.get('sourceURL') or page_data.get('url')
+    if url:
+        return url
+    content = json.dumps(page_data, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+class FirecrawlPoller:
+    """爬取任务轮询器
+
+    initial_delay: 首次等待和收到新页面后的等待秒数
+    max_delay: 退避等待的上限
+    factor: 没有新页面时等待时间的增长倍数
+    jitter: 随机抖动比例，实际等待在 [delay*(1-jitter), delay] 之间
+    deadline: 可选的总时长上限（秒），None 表示一直等到任务结束
+    cancel_event: 可选的 asyncio.Event，置位后停止轮询
+
+    任务进行中的部分结果在 partial_data 中（只保留最近的若干页），完成后在 data 中；
+    两者可能重叠，按来源URL去重，每个页面只交出一次。
+    status 只保存任务状态字段，不保留页面列表，内存占用不随爬取规模增长
+    """
+
+    def __init__(self, base_url=DEFAULT_API_URL, headers=None, initial_delay=1.0, max_delay=30.0,
+                 factor=2.0, jitter=0.5, timeout=30, deadline=None, cancel_event=None):
+        self.base_url = base_url.rstrip('/')
+        self.headers = headers or {}
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.factor = factor
+        self.jitter = jitter
+        self.timeout = timeout
+        self.deadline = deadline
+        self.cancel_event = cancel_event or asyncio.Event()
+
+        self.status = {}
+        self.seen = set()
+        self.checks = 0
+        self.errors = 0
+
+    def cancel(self):
+        """停止轮询（需在事件循环所在线程调用）"""
+        self.cancel_event.set()
+
+    def next_delay(self, delay, got_pages):
+        """下一次的基础等待时间：有新页面时回到初始值，否则按倍数增长"""
+        if got_pages:
+            return self.initial_delay
+        return min(delay * self.factor, self.max_delay)
+
+    def jittered(self, delay):
+        return delay * random.uniform(1 - self.jitter, 1)
+
+    async def sleep(self, seconds):
+        """等待指定秒数，期间被取消时立即返回 True"""
+        try:
+            await asyncio.wait_for(self.cancel_event.wait(), seconds)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def check(self, session, job_id):
+        """请求一次任务状态，返回 (状态数据, 建议等待秒数)；失败时状态数据为 None"""
+        self.checks += 1
+        try:
+            async with session.get(f"{self.base_url}/crawl/status/{job_id}") as response:
+                if response.status == 200:
+                    return await response.json(content_type=None), None
+
+                retry_after = None
+                if response.status == 429:
+                    try:
+                        retry_after = float(response.headers.get('Retry-After', ''))
+                    except ValueError:
+                        pass
+                log.warning(f"⚠️  状态检查失败: {response.status}")
+                return None, retry_after
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            log.warning(f"⚠️  状态检查错误: {e}")
+            return None, None
+
+    def new_pages(self, status_data):
+        """状态数据中尚未交出的页面"""
+        pages = status_data.get('data') or status_data.get('partial_data') or []
+        fresh = []
+        for page_data in pages:
+            key = page_key(page_data)
+            if key not in self.seen:
+                self.seen.add(key)
+                fresh.append(page_data)
+        return fresh
+
+    async def poll(self, job_id, queue):
+        """轮询直到任务结束或被取消，新页面依次放入队列，最后放入 None
+
+        队列已满时等待下游取走页面，之后再发起下一次状态检查
+        """
+        started = time.monotonic()
+        delay = self.initial_delay
+        cancelled = False
+        try:
+            async with aiohttp.ClientSession(headers=self.headers,
+                                             timeout=aiohttp.ClientTimeout(total=self.timeout)) as session:
+                while not self.cancel_event.is_set():
+                    status_data, retry_after = await self.check(session, job_id)
+
+                    if status_data is None:
+                        self.errors += 1
+                        if self.errors >= MAX_CONSECUTIVE_ERRORS:
+                            self.status = {'status': 'failed', 'error': f'连续 {self.errors} 次状态检查失败'}
+                            return
+                        delay = self.next_delay(delay, False)
+                        wait = max(retry_after or 0, self.jittered(delay))
+                    else:
+                        self.errors = 0
+                        fresh = self.new_pages(status_data)
+                        # 页面已交给队列，状态中不再保留页面列表（含 rawHtml 和 base64 截图）
+                        status_data = {key: value for key, value in status_data.items()
+                                       if key not in PAGE_LIST_FIELDS}
+                        self.status = status_data
+                        for page_data in fresh:
+                            await queue.put(page_data)
+
+                        status = status_data.get('status')
+                        if status in TERMINAL_STATUSES:
+                            return
+                        completed = status_data.get('completed', status_data.get('current', 0))
+                        total = status_data.get('total', 0)
+                        log.debug(f"🔄 进度: {completed}/{total} ({status}), 已接收 {len(self.seen)} 个页面")
+                        delay = self.next_delay(delay, bool(fresh))
+                        wait = self.jittered(delay)
+
+                    if self.deadline is not None and time.monotonic() - started + wait > self.deadline:
+                        self.status = {**self.status, 'status': 'timeout'}
+                        return
+                    if await self.sleep(wait):
+                        break
+
+                self.status = {**self.status, 'status': 'cancelled'}
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            # 被取消时下游已不再读取，不等待队列空位
+            if not cancelled:
+                await queue.put(None)
+
+    async def watch(self, job_id, max_pending=1):
+        """异步迭代任务返回的新页面；轮询在后台进行
+
+        最多 max_pending 个页面等待下游处理，下游跟不上时轮询暂停，已接收的页面不在内存中堆积
+        """
+        queue = asyncio.Queue(maxsize=max_pending)
+        task = asyncio.create_task(self.poll(job_id, queue))
+        try:
+            while True:
+                page_data = await queue.get()
+                if page_data is None:
+                    break
+                yield page_data
+            await task
+        finally:
+            if not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
@@ -4,24 +4,88 @@ Firecrawl MCP 客户端 - 68tt.co 网站抓取
 使用 Firecrawl MCP 服务进行专业网站内容提取
 """
 
+import argparse
 import asyncio
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
 import json
 import os
 import subprocess
 import sys
 from pathlib import Path
+import threading
 import time
 import requests
 from urllib.parse import urljoin, urlparse
 import shutil
+import hashlib
+
+import metrics
+from asset_store import AssetStore
+from fetch_engine import BlockingFetchEngine
+from file_manifest import FileManifest
+from firecrawl_poller import DEFAULT_API_URL, FirecrawlPoller
+from html_parser import add_parser_argument, make_soup
+from http_cache import HTTPCache
+from raw_results import RAW_RESULTS_FILENAME, RawResultsWriter, iter_raw_pages, read_raw_status
+from scrape_log import add_log_arguments, configure_from_args, flush, log, progress
+from screenshot_sink import ScreenshotSink
+
+def extract_image_urls(html_content, base_url, parser=None):
+    """解析HTML，返回页面中图片的绝对地址（按出现顺序去重，跳过内联图片）
+
+    定义在模块级，可在进程池中执行
+    """
+    if not html_content:
+        return []
+    
+    soup = make_soup(html_content, parser)
+    image_urls = []
+    for img in soup.find_all('img', src=True):
+        img_url = img['src']
+        if img_url.startswith('//'):
+            img_url = 'https:' + img_url
+        elif not img_url.startswith('http'):
+            img_url = urljoin(base_url, img_url)
+        
+        # 跳过base64图片
+        if img_url.startswith('data:'):
+            continue
+        image_urls.append(img_url)
+    return list(dict.fromkeys(image_urls))
 
 class FirecrawlMCPClient:
-    def __init__(self, config_file="firecrawl_simple_config.json"):
+    def __init__(self, config_file="firecrawl_simple_config.json", parser=None, api_url=None, fetcher=None,
+                 workers=None, asset_store=None, output_dir=None):
         self.config_file = config_file
         self.config = self.load_config()
-        self.output_dir = Path(self.config['scraping_config']['output']['directory'])
+        # API 地址可指向本地模拟服务进行测试
+        self.api_url = (api_url or os.getenv('FIRECRAWL_API_URL')
+                        or self.config['scraping_config'].get('api_url', DEFAULT_API_URL))
+        # 输出目录默认取配置文件中的设置；文件清单随目录创建，需在构造时确定
+        self.output_dir = Path(output_dir or self.config['scraping_config']['output']['directory'])
         self.output_dir.mkdir(exist_ok=True)
         self.api_key = None
+        self.parser = parser
+        
+        # 所有抓取器共享的内容寻址资源仓库
+        self.asset_store = asset_store or AssetStore()
+        
+        # 共享抓取引擎：图片下载共用连接池，同一URL只下载一次
+        self.owns_fetcher = fetcher is None
+        self.fetcher = fetcher or BlockingFetchEngine(cache=HTTPCache(self.asset_store), share_downloads=True)
+        self.downloaded_images = set()
+        # 多个页面并行处理时，图片登记和放置需要互斥
+        self.images_lock = threading.Lock()
+        
+        # 写入时登记的输出文件清单，运行结束时的文件统计直接读取累计值
+        self.files = FileManifest(self.output_dir)
+        
+        # 同时处理的页面数（线程池和解析进程池大小）
+        self.workers = workers or os.cpu_count() or 4
+        # 处理页面期间的解析进程池，由 page_workers() 创建
+        self.parse_pool = None
         
     def load_config(self):
         """加载配置文件"""
@@ -29,10 +93,10 @@ class FirecrawlMCPClient:
             with open(self.config_file, 'r', encoding='utf-8') as f:
                 return json.load(f)
         except FileNotFoundError:
-            print(f"❌ 配置文件 {self.config_file} 不存在")
+            log.error(f"❌ 配置文件 {self.config_file} 不存在")
             sys.exit(1)
         except json.JSONDecodeError as e:
-            print(f"❌ 配置文件格式错误: {e}")
+            log.error(f"❌ 配置文件格式错误: {e}")
             sys.exit(1)
     
     def setup_api_key(self):
@@ -41,6 +105,8 @@ class FirecrawlMCPClient:
         api_key = os.getenv('FIRECRAWL_API_KEY')
         
         if not api_key:
+            # 交互式提示直接输出，不受日志级别影响；先输出缓冲中的日志，保持先后顺序
+            flush()
             print("🔑 Firecrawl API 密钥设置")
             print("=" * 40)
             print("请访问 https://firecrawl.dev 获取免费API密钥")
@@ -52,7 +118,7 @@ class FirecrawlMCPClient:
             if choice == "1":
                 api_key = input("请输入您的Firecrawl API密钥: ").strip()
                 if not api_key:
-                    print("❌ 未输入API密钥")
+                    log.error("❌ 未输入API密钥")
                     return False
                     
                 # 保存到环境变量
@@ -64,14 +130,14 @@ class FirecrawlMCPClient:
                     self.config['mcpServers']['firecrawl']['env']['FIRECRAWL_API_KEY'] = api_key
                     with open(self.config_file, 'w', encoding='utf-8') as f:
                         json.dump(self.config, f, indent=2, ensure_ascii=False)
-                    print("✅ API密钥已保存到配置文件")
+                    log.info("✅ API密钥已保存到配置文件")
                     
             elif choice == "2":
-                print("⚠️  使用演示模式，功能受限")
+                log.warning("⚠️  使用演示模式，功能受限")
                 api_key = "demo-key"
                 os.environ['FIRECRAWL_API_KEY'] = api_key
             else:
-                print("❌ 无效选择")
+                log.error("❌ 无效选择")
                 return False
         
         self.api_key = api_key
@@ -79,35 +145,35 @@ class FirecrawlMCPClient:
     
     def install_firecrawl_mcp(self):
         """安装Firecrawl MCP服务器"""
-        print("📦 检查Firecrawl MCP服务器...")
+        log.info("📦 检查Firecrawl MCP服务器...")
         
         try:
             # 检查是否已安装
             result = subprocess.run(['npx', '--version'], capture_output=True, text=True)
             if result.returncode != 0:
-                print("❌ NPX 未安装，请先安装 Node.js")
+                log.error("❌ NPX 未安装，请先安装 Node.js")
                 return False
             
-            print("✅ NPX 可用")
+            log.info("✅ NPX 可用")
             
             # 测试Firecrawl MCP服务器
-            print("🔧 准备Firecrawl MCP服务器...")
+            log.info("🔧 准备Firecrawl MCP服务器...")
             return True
             
         except FileNotFoundError:
-            print("❌ Node.js/NPM 未安装")
-            print("请访问 https://nodejs.org 安装 Node.js")
+            log.error("❌ Node.js/NPM 未安装")
+            log.info("请访问 https://nodejs.org 安装 Node.js")
             return False
     
     def scrape_with_firecrawl_api(self):
         """使用Firecrawl API直接抓取"""
         if not self.api_key or self.api_key == "demo-key":
-            print("⚠️  使用免费抓取模式（无需API密钥）")
+            log.warning("⚠️  使用免费抓取模式（无需API密钥）")
             return self.scrape_without_api()
         
-        print("🔥 使用Firecrawl API抓取网站...")
+        log.info("🔥 使用Firecrawl API抓取网站...")
         
-        base_url = "https://api.firecrawl.dev/v0"
+        base_url = self.api_url
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
@@ -136,7 +202,7 @@ class FirecrawlMCPClient:
         }
         
         try:
-            print(f"🚀 开始爬取: {target_url}")
+            log.info(f"🚀 开始爬取: {target_url}")
             response = requests.post(f"{base_url}/crawl", json=crawl_data, headers=headers)
             
             if response.status_code == 200:
@@ -144,146 +210,215 @@ class FirecrawlMCPClient:
                 job_id = job_data.get("jobId")
                 
                 if job_id:
-                    print(f"📋 爬取任务ID: {job_id}")
+                    log.info(f"📋 爬取任务ID: {job_id}")
                     return self.wait_for_crawl_completion(job_id, headers, base_url)
                 else:
-                    print("❌ 未获取到任务ID")
+                    log.error("❌ 未获取到任务ID")
                     return False
             else:
-                print(f"❌ API请求失败: {response.status_code}")
-                print(f"错误信息: {response.text}")
+                log.error(f"❌ API请求失败: {response.status_code}")
+                log.error(f"错误信息: {response.text}")
                 return False
                 
         except requests.exceptions.RequestException as e:
-            print(f"❌ 网络请求错误: {e}")
+            log.error(f"❌ 网络请求错误: {e}")
             return False
     
     def wait_for_crawl_completion(self, job_id, headers, base_url):
-        """等待爬取任务完成"""
-        print("⏳ 等待爬取任务完成...")
-        
-        max_attempts = 30
-        attempt = 0
-        
-        while attempt < max_attempts:
-            try:
-                response = requests.get(f"{base_url}/crawl/status/{job_id}", headers=headers)
-                
-                if response.status_code == 200:
-                    status_data = response.json()
-                    status = status_data.get("status")
-                    
-                    if status == "completed":
-                        print("✅ 爬取任务完成!")
-                        return self.process_crawl_results(status_data)
-                    elif status == "failed":
-                        print("❌ 爬取任务失败")
-                        print(f"错误信息: {status_data.get('error', 'Unknown error')}")
-                        return False
-                    else:
-                        completed = status_data.get("completed", 0)
-                        total = status_data.get("total", 0)
-                        print(f"🔄 进度: {completed}/{total} ({status})")
-                        
-                else:
-                    print(f"⚠️  状态检查失败: {response.status_code}")
-                
-            except requests.exceptions.RequestException as e:
-                print(f"⚠️  状态检查错误: {e}")
-            
-            attempt += 1
-            time.sleep(5)  # 等待5秒后重试
+        """等待爬取任务完成，边轮询边处理已返回的页面"""
+        log.info("⏳ 等待爬取任务完成...")
+        flush()
         
-        print("⏰ 等待超时")
-        return False
+        try:
+            return asyncio.run(self.stream_crawl_results(job_id, headers, base_url))
+        except KeyboardInterrupt:
+            log.info("🛑 已取消等待，已处理的页面已保存")
+            return False
     
-    def process_crawl_results(self, results_data):
-        """处理爬取结果"""
-        print("📊 处理爬取结果...")
+    async def stream_crawl_results(self, job_id, headers, base_url, poller=None):
+        """异步轮询爬取任务，新页面一出现就交给线程池处理，与远程爬取同时进行
+
+        最多 workers 个页面同时处理；已满时先等待最早提交的页面完成，
+        原始结果和进度按页面返回的顺序写入
+        """
+        poller = poller or FirecrawlPoller(base_url, headers)
+        assets_dir, screenshots_dir = self.prepare_output_dirs()
         
-        data = results_data.get("data", [])
-        if not data:
-            print("❌ 没有获取到数据")
+        # 原始页面逐页写入 JSON Lines，处理完即释放，不在内存中累积
+        processed_pages = []
+        pending = deque()
+        with RawResultsWriter(self.output_dir / RAW_RESULTS_FILENAME) as writer, progress('📄 页面') as bar:
+            def finish_page(page_data, page_info):
+                processed_pages.append(page_info)
+                writer.write_page(self.raw_page(page_data, page_info))
+                bar.total = poller.status.get('total')
+                bar.advance()
+            
+            try:
+                with self.page_workers() as pool:
+                    submitted = 0
+                    async for page_data in poller.watch(job_id, max_pending=self.workers):
+                        if len(pending) >= self.workers:
+                            done_data, future = pending.popleft()
+                            finish_page(done_data, await asyncio.wrap_future(future))
+                        submitted += 1
+                        pending.append((page_data, pool.submit(self.process_crawl_page, submitted, page_data,
+                                                               assets_dir, screenshots_dir)))
+                    while pending:
+                        done_data, future = pending.popleft()
+                        finish_page(done_data, await asyncio.wrap_future(future))
+            finally:
+                # 线程池退出时已等待进行中的页面结束；取消或出错时同样保存已处理的页面
+                for done_data, future in pending:
+                    if not future.cancelled() and future.exception() is None:
+                        finish_page(done_data, future.result())
+                writer.write_status(poller.status)
+                if processed_pages:
+                    self.finish_crawl_results(processed_pages, poller.status)
+        
+        status = poller.status.get("status")
+        if status == "completed":
+            log.info("✅ 爬取任务完成!")
+        elif status == "failed":
+            log.error(f"❌ 爬取任务失败: {poller.status.get('error', 'Unknown error')}")
+            return False
+        else:
+            log.warning(f"⚠️  爬取任务未完成 ({status})")
             return False
         
-        print(f"📄 获取到 {len(data)} 个页面")
-        
-        # 保存原始结果
-        raw_results_path = self.output_dir / "firecrawl_raw_results.json"
-        with open(raw_results_path, 'w', encoding='utf-8') as f:
-            json.dump(results_data, f, indent=2, ensure_ascii=False)
+        if not processed_pages:
+            log.error("❌ 没有获取到数据")
+            return False
         
-        # 创建资源目录
+        log.info(f"✅ 所有页面处理完成，保存在: {self.output_dir}")
+        return True
+    
+    def prepare_output_dirs(self):
+        """创建资源和截图目录"""
         assets_dir = self.output_dir / "assets"
         assets_dir.mkdir(exist_ok=True)
         screenshots_dir = self.output_dir / "screenshots"
         screenshots_dir.mkdir(exist_ok=True)
+        return assets_dir, screenshots_dir
+    
+    @contextmanager
+    def page_workers(self):
+        """页面处理线程池；同时创建解析进程池
+
+        保存文件和下载图片在线程中进行，bs4 解析持有 GIL，只把 HTML 和URL交给子进程解析，
+        多个页面的解析才能真正占用多个核
+        """
+        pool = ThreadPoolExecutor(self.workers)
+        if self.workers > 1:
+            self.parse_pool = ProcessPoolExecutor(self.workers)
+        try:
+            yield pool
+        finally:
+            pool.shutdown(wait=True)
+            if self.parse_pool:
+                self.parse_pool.shutdown()
+                self.parse_pool = None
+    
+    def process_raw_results(self, raw_results_path):
+        """重新处理保存的原始结果，逐页读取并在线程池中处理，不需要重新爬取
+
+        与 stream_crawl_results 相同，最多 workers 个页面同时处理，按原始顺序收集结果
+        """
+        log.info(f"📊 处理原始结果: {raw_results_path}")
         
-        # 处理每个页面
+        assets_dir, screenshots_dir = self.prepare_output_dirs()
         processed_pages = []
+        pending = deque()
+        with self.page_workers() as pool, progress('📄 页面') as bar:
+            for i, page_data in enumerate(iter_raw_pages(raw_results_path), 1):
+                if len(pending) >= self.workers:
+                    processed_pages.append(pending.popleft().result())
+                    bar.advance()
+                pending.append(pool.submit(self.process_crawl_page, i, page_data, assets_dir, screenshots_dir))
+            while pending:
+                processed_pages.append(pending.popleft().result())
+                bar.advance()
+        
+        if not processed_pages:
+            log.error("❌ 没有获取到数据")
+            return False
         
-        for i, page_data in enumerate(data, 1):
-            url = page_data.get("metadata", {}).get("sourceURL", f"page_{i}")
-            title = page_data.get("metadata", {}).get("title", "Untitled")
-            
-            print(f"📝 处理页面 {i}: {title}")
-            
-            # 保存HTML
-            if page_data.get("html"):
-                html_filename = self.url_to_filename(url) + ".html"
-                html_path = self.output_dir / html_filename
-                with open(html_path, 'w', encoding='utf-8') as f:
-                    f.write(page_data["html"])
-            
-            # 保存Markdown
-            if page_data.get("markdown"):
-                md_filename = self.url_to_filename(url) + ".md"
-                md_path = self.output_dir / md_filename
-                with open(md_path, 'w', encoding='utf-8') as f:
-                    f.write(page_data["markdown"])
-            
-            # 保存截图
-            if page_data.get("screenshot"):
-                screenshot_filename = self.url_to_filename(url) + "_screenshot.png"
-                screenshot_path = screenshots_dir / screenshot_filename
-                try:
-                    # 截图通常是base64编码
-                    import base64
-                    screenshot_data = page_data["screenshot"]
-                    if screenshot_data.startswith('data:image'):
-                        # 移除data:image/png;base64,前缀
-                        screenshot_data = screenshot_data.split(',')[1]
-                    
-                    with open(screenshot_path, 'wb') as f:
-                        f.write(base64.b64decode(screenshot_data))
-                    print(f"📸 保存截图: {screenshot_filename}")
-                except Exception as e:
-                    print(f"⚠️  截图保存失败 {url}: {e}")
-            
-            # 下载页面中的图片
-            self.download_page_images(page_data, assets_dir, url)
-            
-            # 保存结构化数据
-            page_info = {
-                "url": url,
-                "title": title,
-                "metadata": page_data.get("metadata", {}),
-                "content_length": len(page_data.get("markdown", "")),
-                "html_length": len(page_data.get("html", "")),
-                "extracted_at": time.strftime('%Y-%m-%d %H:%M:%S')
-            }
-            
-            processed_pages.append(page_info)
+        self.finish_crawl_results(processed_pages, read_raw_status(raw_results_path))
+        log.info(f"✅ 所有页面处理完成，保存在: {self.output_dir}")
+        return True
+    
+    def process_crawl_page(self, i, page_data, assets_dir, screenshots_dir):
+        """保存一个页面的HTML、Markdown、截图和图片，返回页面信息
+
+        在线程池中执行，多个页面可同时处理
+        """
+        url = page_data.get("metadata", {}).get("sourceURL", f"page_{i}")
+        title = page_data.get("metadata", {}).get("title", "Untitled")
+        
+        log.debug(f"📝 处理页面 {i}: {title}")
+        
+        # 保存HTML
+        if page_data.get("html"):
+            html_filename = self.url_to_filename(url) + ".html"
+            html_path = self.output_dir / html_filename
+            with metrics.timer('write'):
+                self.files.write_text(html_path, page_data["html"])
+        
+        # 保存Markdown
+        if page_data.get("markdown"):
+            md_filename = self.url_to_filename(url) + ".md"
+            md_path = self.output_dir / md_filename
+            with metrics.timer('write'):
+                self.files.write_text(md_path, page_data["markdown"])
+        
+        # 保存截图：分块解码写入文件，页面信息中只保留路径、摘要和尺寸
+        screenshot = page_data.get("screenshot")
+        if isinstance(screenshot, str) and screenshot:
+            try:
+                screenshot = ScreenshotSink(screenshots_dir, self.asset_store, self.fetcher).save(
+                    page_data["screenshot"], self.url_to_filename(url) + "_screenshot", url)
+                self.files.record(self.output_dir / screenshot['path'], screenshot['size'], screenshot['sha256'])
+                log.debug(f"📸 保存截图: {screenshot['path']} ({screenshot['width']}x{screenshot['height']})")
+            except (OSError, ValueError) as e:
+                screenshot = None
+                log.warning(f"⚠️  截图保存失败 {url}: {e}", extra={'data': {'url': url}})
+        elif not isinstance(screenshot, dict):
+            # 重新处理原始结果时截图已是文件引用（字典），保留不变；其他情况视为没有截图
+            screenshot = None
+        
+        # 下载页面中的图片
+        self.download_page_images(page_data, assets_dir, url)
+        
+        # 保存结构化数据
+        return {
+            "url": url,
+            "title": title,
+            "metadata": page_data.get("metadata", {}),
+            "content_length": len(page_data.get("markdown", "")),
+            "html_length": len(page_data.get("html", "")),
+            "screenshot": screenshot,
+            "extracted_at": time.strftime('%Y-%m-%d %H:%M:%S')
+        }
+    
+    def raw_page(self, page_data, page_info):
+        """写入原始结果的页面：内联截图替换为已保存文件的引用"""
+        if page_data.get("screenshot") and page_info.get("screenshot"):
+            return {**page_data, "screenshot": page_info["screenshot"]}
+        return page_data
+    
+    def finish_crawl_results(self, processed_pages, status_data):
+        """保存资源索引和总结报告（原始页面已逐页写入 JSON Lines）"""
+        self.asset_store.save()
+        raw_results_path = self.output_dir / RAW_RESULTS_FILENAME
+        if raw_results_path.exists():
+            self.files.record(raw_results_path, raw_results_path.stat().st_size)
         
         # 生成总结报告
-        self.generate_firecrawl_report(processed_pages, results_data)
-        
-        print(f"✅ 所有页面处理完成，保存在: {self.output_dir}")
-        return True
+        self.generate_firecrawl_report(processed_pages, status_data)
     
     def scrape_without_api(self):
         """无API密钥的备用抓取方法"""
-        print("🔧 使用备用抓取方法...")
+        log.info("🔧 使用备用抓取方法...")
         
         # 使用requests直接抓取主要页面
         target_url = self.config['scraping_config']['target_url']
@@ -301,19 +436,22 @@ class FirecrawlMCPClient:
         
         for url in pages_to_scrape:
             try:
-                print(f"📥 抓取: {url}")
-                response = requests.get(url, headers=headers, timeout=30)
+                log.debug(f"📥 抓取: {url}")
+                host = urlparse(url).netloc
+                with metrics.timer('fetch', host=host):
+                    response = requests.get(url, headers=headers, timeout=30)
+                metrics.registry.inc('requests_total', stage='fetch', host=host, status=response.status_code)
+                metrics.registry.inc('bytes_total', len(response.content), stage='fetch', host=host)
                 
                 if response.status_code == 200:
                     # 保存HTML
                     html_filename = self.url_to_filename(url) + ".html"
                     html_path = self.output_dir / html_filename
-                    with open(html_path, 'w', encoding='utf-8') as f:
-                        f.write(response.text)
+                    with metrics.timer('write'):
+                        self.files.write_text(html_path, response.text)
                     
                     # 提取基本信息
-                    from bs4 import BeautifulSoup
-                    soup = BeautifulSoup(response.text, 'html.parser')
+                    soup = make_soup(response.text, self.parser)
                     title = soup.title.string if soup.title else "Untitled"
                     
                     page_info = {
@@ -325,67 +463,78 @@ class FirecrawlMCPClient:
                     }
                     
                     processed_pages.append(page_info)
-                    print(f"✅ 成功: {title.strip()}")
+                    log.info(f"✅ 成功: {title.strip()}")
                     
                 else:
-                    print(f"❌ 失败 {url}: HTTP {response.status_code}")
+                    log.error(f"❌ 失败 {url}: HTTP {response.status_code}")
                     
             except Exception as e:
-                print(f"❌ 错误 {url}: {e}")
+                log.error(f"❌ 错误 {url}: {e}")
         
         # 生成报告
         self.generate_simple_report(processed_pages)
         return len(processed_pages) > 0
     
     def download_page_images(self, page_data, assets_dir, base_url):
-        """下载页面中的图片"""
+        """解析页面并下载其中的图片；有解析进程池时在子进程中解析"""
         html_content = page_data.get("html", "")
-        if not html_content:
-            return
-        
         try:
-            from bs4 import BeautifulSoup
-            soup = BeautifulSoup(html_content, 'html.parser')
-            images = soup.find_all('img', src=True)
+            if self.parse_pool and html_content:
+                with metrics.timer('parse'):
+                    image_urls = self.parse_pool.submit(extract_image_urls, html_content, base_url,
+                                                        self.parser).result()
+            else:
+                image_urls = extract_image_urls(html_content, base_url, self.parser)
+        except Exception as e:
+            log.warning(f"⚠️  图片提取失败: {e}")
+            return 0
+        return self.download_images(image_urls, assets_dir)
+    
+    def download_images(self, image_urls, assets_dir):
+        """通过共享抓取引擎并发下载图片并链接到资源目录，返回新保存的数量"""
+        # 本次运行中已保存过的图片不再处理
+        pending = [img_url for img_url in dict.fromkeys(image_urls) if img_url not in self.downloaded_images]
+        if not pending:
+            return 0
+        
+        # 连接池、按主机限速和条件请求缓存由引擎负责，未变化的图片返回 HTTP 304；
+        # 其他页面同时请求的同一图片由引擎合并为一次下载
+        results = self.fetcher.download_many(pending)
+        
+        saved = 0
+        for img_url, result in zip(pending, results):
+            if 'digest' not in result:
+                log.warning(f"⚠️  图片下载失败: {img_url} ({result['error']})", extra={'data': {'url': img_url}})
+                continue
             
-            for img in images:
-                img_url = img['src']
-                if img_url.startswith('//'):
-                    img_url = 'https:' + img_url
-                elif img_url.startswith('/'):
-                    img_url = urljoin(base_url, img_url)
-                elif not img_url.startswith('http'):
-                    img_url = urljoin(base_url, img_url)
-                
-                # 跳过base64图片
-                if img_url.startswith('data:'):
+            img_filename = self.image_filename(img_url)
+            with self.images_lock:
+                if img_url in self.downloaded_images:
                     continue
-                
                 try:
-                    print(f"📥 下载图片: {img_url}")
-                    response = requests.get(img_url, timeout=30, headers={
-                        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-                    })
-                    
-                    if response.status_code == 200:
-                        # 生成文件名
-                        img_filename = os.path.basename(urlparse(img_url).path)
-                        if not img_filename or '.' not in img_filename:
-                            img_filename = f"image_{hash(img_url) % 10000}.jpg"
-                        
-                        img_path = assets_dir / img_filename
-                        with open(img_path, 'wb') as f:
-                            f.write(response.content)
-                        
-                        print(f"✅ 图片保存: {img_filename}")
-                    else:
-                        print(f"❌ 图片下载失败: {img_url} (HTTP {response.status_code})")
-                        
-                except Exception as e:
-                    print(f"❌ 图片下载错误 {img_url}: {e}")
-                    
-        except Exception as e:
-            print(f"⚠️  图片提取失败: {e}")
+                    ext = os.path.splitext(img_filename)[1]
+                    entry = self.asset_store.register(img_url, result['digest'], result['size'],
+                                                      result['content_type'], ext, src_ext=result['ext'])
+                    img_path = self.asset_store.place(entry, assets_dir / img_filename)
+                    self.files.record(img_path, entry['size'], entry['digest'])
+                except OSError as e:
+                    log.error(f"❌ 图片保存错误 {img_url}: {e}", extra={'data': {'url': img_url}})
+                    continue
+                self.downloaded_images.add(img_url)
+            
+            saved += 1
+            if result.get('from_cache'):
+                log.debug(f"♻️  图片未变化: {img_filename}")
+            else:
+                log.debug(f"✅ 图片保存: {img_filename}")
+        return saved
+    
+    def image_filename(self, img_url):
+        """图片URL对应的文件名，没有扩展名时按URL摘要生成"""
+        img_filename = os.path.basename(urlparse(img_url).path)
+        if not img_filename or '.' not in img_filename:
+            img_filename = f"image_{hashlib.sha256(img_url.encode('utf-8')).hexdigest()[:8]}.jpg"
+        return img_filename
     
     def url_to_filename(self, url):
         """URL转文件名"""
@@ -399,7 +548,7 @@ class FirecrawlMCPClient:
         filename = path.replace('/', '_').replace('?', '_').replace('&', '_')
         return filename or 'index'
     
-    def generate_firecrawl_report(self, processed_pages, raw_data):
+    def generate_firecrawl_report(self, processed_pages, status_data):
         """生成Firecrawl报告"""
         report = {
             "scraping_info": {
@@ -411,18 +560,20 @@ class FirecrawlMCPClient:
             },
             "pages": processed_pages,
             "raw_data_summary": {
-                "total_data_points": len(raw_data.get("data", [])),
-                "job_status": raw_data.get("status", "unknown"),
-                "completed": raw_data.get("completed", 0),
-                "total": raw_data.get("total", 0)
-            }
+                "raw_results": RAW_RESULTS_FILENAME,
+                "total_data_points": len(processed_pages),
+                "job_status": status_data.get("status", "unknown"),
+                "completed": status_data.get("completed", status_data.get("current", 0)),
+                "total": status_data.get("total", 0)
+            },
+            # 各阶段和各主机的耗时与计数，同时写入 metrics.prom
+            "metrics": metrics.export(self.output_dir)
         }
         
         report_path = self.output_dir / "firecrawl_report.json"
-        with open(report_path, 'w', encoding='utf-8') as f:
-            json.dump(report, f, indent=2, ensure_ascii=False)
+        self.files.write_text(report_path, json.dumps(report, indent=2, ensure_ascii=False))
         
-        print(f"📋 报告已生成: {report_path}")
+        log.info(f"📋 报告已生成: {report_path}")
     
     def generate_simple_report(self, processed_pages):
         """生成简单报告"""
@@ -433,19 +584,19 @@ class FirecrawlMCPClient:
                 "timestamp": time.strftime('%Y-%m-%d %H:%M:%S'),
                 "total_pages": len(processed_pages)
             },
-            "pages": processed_pages
+            "pages": processed_pages,
+            "metrics": metrics.export(self.output_dir)
         }
         
         report_path = self.output_dir / "scraping_report.json"
-        with open(report_path, 'w', encoding='utf-8') as f:
-            json.dump(report, f, indent=2, ensure_ascii=False)
+        self.files.write_text(report_path, json.dumps(report, indent=2, ensure_ascii=False))
         
-        print(f"📋 报告已生成: {report_path}")
+        log.info(f"📋 报告已生成: {report_path}")
     
     def run(self):
         """运行Firecrawl MCP客户端"""
-        print("🔥 Firecrawl MCP 68tt.co 网站抓取器")
-        print("=" * 50)
+        log.info("🔥 Firecrawl MCP 68tt.co 网站抓取器")
+        log.info("=" * 50)
         
         # 检查Node.js环境
         if not self.install_firecrawl_mcp():
@@ -459,42 +610,55 @@ class FirecrawlMCPClient:
         success = self.scrape_with_firecrawl_api()
         
         if success:
-            print("\n🎉 Firecrawl 抓取完成!")
-            print(f"📁 结果保存在: {self.output_dir}")
+            log.info("🎉 Firecrawl 抓取完成!")
+            log.info(f"📁 结果保存在: {self.output_dir}")
             
-            # 显示输出文件统计
-            if self.output_dir.exists():
-                all_files = list(self.output_dir.rglob("*"))
-                files = [f for f in all_files if f.is_file()]
-                
-                html_files = [f for f in files if f.suffix == '.html']
-                md_files = [f for f in files if f.suffix == '.md']
-                json_files = [f for f in files if f.suffix == '.json']
-                img_files = [f for f in files if f.suffix.lower() in ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg']]
-                screenshot_files = [f for f in files if 'screenshot' in f.name]
-                
-                print(f"\n📊 文件统计:")
-                print(f"   📄 HTML 文件: {len(html_files)} 个")
-                print(f"   📝 Markdown 文件: {len(md_files)} 个")
-                print(f"   📋 JSON 报告: {len(json_files)} 个")
-                print(f"   🖼️  图片文件: {len(img_files)} 个")
-                print(f"   📸 截图文件: {len(screenshot_files)} 个")
-                print(f"   📁 总文件数: {len(files)} 个")
-                
-                print(f"\n📁 目录结构:")
-                for directory in sorted(self.output_dir.iterdir()):
-                    if directory.is_dir():
-                        dir_files = list(directory.glob("*"))
-                        print(f"   📂 {directory.name}/: {len(dir_files)} 个文件")
+            # 显示输出文件统计：读取写入时登记的累计值（先去掉已被删除的文件）
+            self.files.prune()
+            file_summary = self.files.summary()
+            by_kind = file_summary['by_kind']
+            
+            log.info(f"📊 文件统计:")
+            log.info(f"   📄 HTML 文件: {by_kind.get('html', 0)} 个")
+            log.info(f"   📝 Markdown 文件: {by_kind.get('markdown', 0)} 个")
+            log.info(f"   📋 JSON 报告: {by_kind.get('json', 0)} 个")
+            log.info(f"   🖼️  图片文件: {by_kind.get('image', 0)} 个")
+            log.info(f"   📸 截图文件: {file_summary['by_dir'].get('screenshots', 0)} 个")
+            log.info(f"   📁 总文件数: {file_summary['files']} 个")
+            
+            log.info(f"📁 目录结构:")
+            for directory, count in file_summary['by_dir'].items():
+                log.info(f"   📂 {directory}/: {count} 个文件")
         else:
-            print("\n❌ 抓取失败")
+            log.error("❌ 抓取失败")
         
         return success
+    
+    def close(self):
+        """关闭自有的抓取引擎并保存资源索引和文件清单"""
+        self.asset_store.save()
+        self.files.save()
+        if self.owns_fetcher:
+            self.fetcher.close()
 
 def main():
     """主函数"""
-    client = FirecrawlMCPClient()
-    client.run()
+    arg_parser = argparse.ArgumentParser(description='Firecrawl MCP 客户端')
+    arg_parser.add_argument('--api-url', help=f'Firecrawl API 地址（默认 {DEFAULT_API_URL}）')
+    arg_parser.add_argument('--from-raw', metavar='PATH', help='重新处理保存的原始结果（.jsonl 或旧版 .json），不重新爬取')
+    add_parser_argument(arg_parser)
+    add_log_arguments(arg_parser)
+    args = arg_parser.parse_args()
+    configure_from_args(args)
+    
+    client = FirecrawlMCPClient(parser=args.parser, api_url=args.api_url)
+    try:
+        if args.from_raw:
+            client.process_raw_results(args.from_raw)
+        else:
+            client.run()
+    finally:
+        client.close()
 
 if __name__ == "__main__":
     main()
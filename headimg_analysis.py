@@ -3,33 +3,51 @@
 headImg.png 渲染尺寸和背景色分析工具
 """
 
-import requests
+import argparse
 from pathlib import Path
-from bs4 import BeautifulSoup
-import re
+from css_index import parse_stylesheet
+from device_matrix import DEVICE_PROFILES, fetch_device_matrix
+from fetch_engine import BlockingFetchEngine
+from html_parser import make_soup
+from scrape_log import add_log_arguments, configure_from_args, log
 import json
 
 def analyze_headimg_rendering():
     """分析源站点headImg.png的实际渲染情况"""
     
-    print("🔍 分析源站点 headImg.png 渲染情况...")
-    
-    # 桌面端和移动端User-Agent
-    user_agents = {
-        'desktop': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'mobile': 'Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Mobile/15E148 Safari/604.1'
-    }
+    log.info("🔍 分析源站点 headImg.png 渲染情况...")
     
     url = "https://68tt.co/cn/"
+    css_urls = [
+        'https://68tt.co/css/index.css',
+        'https://68tt.co/css/lang.css'
+    ]
     results = {}
     
-    for device, ua in user_agents.items():
-        print(f"\n📱 分析 {device} 版本...")
+    # 桌面端、移动端页面和CSS文件通过同一个抓取引擎并发获取
+    fetcher = BlockingFetchEngine(per_host=len(DEVICE_PROFILES) + len(css_urls))
+    try:
+        css_future = fetcher.submit(fetcher.engine.fetch_many(css_urls, as_text=True))
+        matrix = fetch_device_matrix([(url, device) for device in DEVICE_PROFILES], fetcher=fetcher)
+        css_responses = dict(zip(css_urls, css_future.result()))
+    finally:
+        fetcher.close()
+    
+    for device in DEVICE_PROFILES:
+        log.info(f"📱 分析 {device} 版本...")
         
         try:
-            headers = {'User-Agent': ua}
-            response = requests.get(url, headers=headers, timeout=30)
-            soup = BeautifulSoup(response.text, 'html.parser')
+            result = matrix[(url, device)]
+            if 'content' not in result:
+                raise RuntimeError(result['error'])
+            
+            # 与其他设备内容完全相同时复用其分析结果
+            if result['duplicate_of'] in results:
+                log.debug(f"  ♻️  与 {result['duplicate_of']} 版本内容相同，跳过分析")
+                results[device] = results[result['duplicate_of']]
+                continue
+            
+            soup = make_soup(result['content'])
             
             # 查找headImg相关元素
             headimg_container = soup.find('div', class_='headImg')
@@ -64,62 +82,58 @@ def analyze_headimg_rendering():
             
             results[device] = device_result
             
-            print(f"  ✅ headImg找到: {device_result['headimg_found']}")
+            log.info(f"  ✅ headImg找到: {device_result['headimg_found']}")
             if device_result['headimg_found']:
-                print(f"  📍 图片路径: {device_result['headimg_src']}")
-                print(f"  🎨 图片样式: {device_result['headimg_style']}")
-                print(f"  📦 容器类: {device_result['container_class']}")
-                print(f"  🎨 容器样式: {device_result['container_style']}")
+                log.info(f"  📍 图片路径: {device_result['headimg_src']}")
+                log.info(f"  🎨 图片样式: {device_result['headimg_style']}")
+                log.info(f"  📦 容器类: {device_result['container_class']}")
+                log.info(f"  🎨 容器样式: {device_result['container_style']}")
         
         except Exception as e:
-            print(f"  ❌ {device} 分析失败: {e}")
+            log.error(f"❌ {device} 分析失败: {e}")
             results[device] = {'error': str(e)}
     
     # 获取CSS文件分析headImg相关样式
-    print(f"\n🎨 分析CSS样式...")
+    log.info(f"🎨 分析CSS样式...")
     try:
-        css_urls = [
-            'https://68tt.co/css/index.css',
-            'https://68tt.co/css/lang.css'
-        ]
-        
         css_styles = {}
-        for css_url in css_urls:
+        for css_url, css_response in css_responses.items():
             try:
-                css_response = requests.get(css_url, timeout=15)
-                if css_response.status_code == 200:
-                    css_content = css_response.text
-                    
-                    # 查找headImg相关样式
-                    headimg_styles = re.findall(r'\.headImg[^{]*\{[^}]*\}', css_content, re.DOTALL)
-                    headimg_img_styles = re.findall(r'\.headImg\s+img[^{]*\{[^}]*\}', css_content, re.DOTALL)
-                    banner_styles = re.findall(r'\.banner[^{]*\{[^}]*\}', css_content, re.DOTALL)
-                    bg_styles = re.findall(r'\.bg[^{]*\{[^}]*\}', css_content, re.DOTALL)
-                    
-                    css_styles[css_url] = {
-                        'headImg_styles': headimg_styles,
-                        'headImg_img_styles': headimg_img_styles,
-                        'banner_styles': banner_styles,
-                        'bg_styles': bg_styles
-                    }
-                    
-                    print(f"  📄 {css_url}:")
-                    print(f"    .headImg 样式: {len(headimg_styles)} 个")
-                    print(f"    .headImg img 样式: {len(headimg_img_styles)} 个")
-                    print(f"    .banner 样式: {len(banner_styles)} 个")
-                    print(f"    .bg 样式: {len(bg_styles)} 个")
-                    
-                    # 打印具体样式
-                    for style in headimg_styles + headimg_img_styles:
-                        print(f"    🎨 样式: {style.strip()}")
+                if 'content' not in css_response:
+                    raise RuntimeError(css_response['error'])
+                # 解析一次并建立索引，各类样式直接按类名/选择器查找；
+                # 类名按前缀匹配，.headImg-wrap、.banner2、.bg-dark 等同样计入；
+                # .headImg img 同样计入 .wrap .headImg img 等包含它的选择器
+                sheet = parse_stylesheet(css_response['content'])
+                headimg_styles = [rule.text for rule in sheet.rules_with_class('headImg', prefix=True)]
+                headimg_img_styles = [rule.text for rule in sheet.lookup('.headImg img', contains=True)]
+                banner_styles = [rule.text for rule in sheet.rules_with_class('banner', prefix=True)]
+                bg_styles = [rule.text for rule in sheet.rules_with_class('bg', prefix=True)]
+                
+                css_styles[css_url] = {
+                    'headImg_styles': headimg_styles,
+                    'headImg_img_styles': headimg_img_styles,
+                    'banner_styles': banner_styles,
+                    'bg_styles': bg_styles
+                }
+                
+                log.debug(f"  📄 {css_url}:")
+                log.debug(f"    .headImg 样式: {len(headimg_styles)} 个")
+                log.debug(f"    .headImg img 样式: {len(headimg_img_styles)} 个")
+                log.debug(f"    .banner 样式: {len(banner_styles)} 个")
+                log.debug(f"    .bg 样式: {len(bg_styles)} 个")
+                
+                # 打印具体样式
+                for style in headimg_styles + headimg_img_styles:
+                    log.debug(f"    🎨 样式: {style.strip()}")
             
             except Exception as e:
-                print(f"  ⚠️ CSS分析失败 {css_url}: {e}")
+                log.warning(f"⚠️ CSS分析失败 {css_url}: {e}")
         
         results['css_analysis'] = css_styles
     
     except Exception as e:
-        print(f"❌ CSS分析失败: {e}")
+        log.error(f"❌ CSS分析失败: {e}")
     
     # 保存分析结果
     output_file = Path("headimg_analysis.json")
@@ -129,9 +143,9 @@ def analyze_headimg_rendering():
     # 生成修复建议
     generate_fix_suggestions(results)
     
-    print(f"\n📊 分析完成!")
-    print(f"📋 结果保存: {output_file}")
-    print(f"📝 修复建议: headimg_fix_suggestions.md")
+    log.info(f"📊 分析完成!")
+    log.info(f"📋 结果保存: {output_file}")
+    log.info(f"📝 修复建议: headimg_fix_suggestions.md")
 
 def generate_fix_suggestions(results):
     """生成修复建议"""
@@ -235,4 +249,7 @@ def generate_fix_suggestions(results):
         f.write(report)
 
 if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='headImg.png 渲染尺寸和背景色分析工具')
+    add_log_arguments(arg_parser)
+    configure_from_args(arg_parser.parse_args())
     analyze_headimg_rendering()
@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""
+HTML → Markdown 转换
+按文档顺序遍历一次DOM树，每个文本节点只输出一次，保留标题、段落、列表、引用、
+代码块、表格、链接和图片的结构；批量转换保存的HTML目录时使用进程池
+"""
+
+import argparse
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import metrics
+from content_manifest import ContentManifest, content_digest
+from file_manifest import FileManifest
+from html_parser import add_parser_argument, make_soup, resolve_parser
+from page_facts import lexbor_children, lexbor_root_children, soup_children
+from scrape_log import add_log_arguments, configure_from_args, log, progress
+
+# 转换规则的版本，修改输出格式时递增，使已有的 Markdown 文件全部重新生成
+MARKDOWN_VERSION = 2
+
+# 命令行默认转换 ComprehensiveScraper 的输出，与其共用清单
+DEFAULT_OUTPUT_DIR = 'comprehensive_output'
+
+HEADING_TAGS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+
+# 块级元素：开始和结束处断开段落；在链接、强调或表格单元格内只作为空格
+BLOCK_TAGS = {
+    'address', 'article', 'aside', 'body', 'dd', 'details', 'dialog', 'div', 'dl', 'dt', 'fieldset',
+    'figcaption', 'figure', 'footer', 'form', 'header', 'html', 'li', 'main', 'nav', 'ol', 'p',
+    'section', 'summary', 'table', 'tbody', 'tfoot', 'thead', 'tr', 'ul', 'blockquote', 'pre'
+} | set(HEADING_TAGS)
+
+# 不输出内容的元素，不进入其子树
+SKIP_TAGS = {'script', 'style', 'noscript', 'template', 'svg', 'canvas', 'iframe', 'object', 'select'}
+
+# 行内强调：标签 → 包围符号
+INLINE_MARKS = {'strong': '**', 'b': '**', 'em': '*', 'i': '*', 'del': '~~', 's': '~~'}
+
+WHITESPACE = re.compile(r'\s+')
+MARKDOWN_SPECIAL = re.compile(r'([\\`*_\[\]])')
+
+
+def escape(text):
+    """转义文本中的 Markdown 标记字符"""
+    return MARKDOWN_SPECIAL.sub(r'\\\1', text)
+
+
+def link_target(url):
+    """链接和图片地址中的空格和括号会截断 Markdown 语法，改为百分号编码"""
+    return url.strip().replace(' ', '%20').replace('(', '%28').replace(')', '%29')
+
+
+class _Inline:
+    """未结束的行内元素（链接、强调、代码、表格单元格、<title>）收集的文本"""
+    __slots__ = ('name', 'attrs', 'parts')
+
+    def __init__(self, name, attrs=None):
+        self.name = name
+        self.attrs = attrs
+        self.parts = []
+
+
+class MarkdownWriter:
+    """接收遍历事件（开始标签、文本、结束标签），生成 Markdown 文本"""
+
+    def __init__(self):
+        self.blocks = []
+        self.last_tight = False
+        self.last_quote = 0
+        self.title = None
+        # 行内缓冲栈：栈底是当前段落
+        self.inline = [_Inline(None)]
+        # 块容器栈：引用为 '>'，列表项为 [标记, 标记是否尚未输出]
+        self.containers = []
+        self.lists = []
+        self.tables = []
+        self.pre_depth = 0
+        self.code_depth = 0
+
+    # ---- 输出 ----
+
+    def prefixes(self):
+        """当前块的首行前缀和续行前缀"""
+        first = []
+        rest = []
+        for container in self.containers:
+            if container == '>':
+                first.append('> ')
+                rest.append('> ')
+            else:
+                marker, pending = container
+                first.append(marker if pending else ' ' * len(marker))
+                rest.append(' ' * len(marker))
+                container[1] = False
+        return ''.join(first), ''.join(rest)
+
+    def emit(self, lines, tight=False):
+        """输出一个块；列表项之间不空行"""
+        first, rest = self.prefixes()
+        text = '\n'.join((first if i == 0 else rest) + line if line else rest.rstrip()
+                         for i, line in enumerate(lines))
+        # 同一引用内的相邻块之间的空行保留引用标记
+        quote = '> ' * min(self.last_quote, self.containers.count('>'))
+        self.blocks.append(('\n' if tight and self.last_tight else '\n' + quote.rstrip() + '\n', text))
+        self.last_tight = tight
+        self.last_quote = self.containers.count('>')
+
+    def flush(self, prefix=''):
+        """输出当前段落；prefix 用于标题"""
+        paragraph = self.inline[0]
+        text = ''.join(paragraph.parts)
+        paragraph.parts = []
+        lines = [WHITESPACE.sub(' ', line).strip() for line in text.split('\n')]
+        lines = [line for line in lines if line]
+        if not lines:
+            return
+        if prefix:
+            lines = [prefix + ' '.join(lines)]
+        else:
+            # <br> 换行：行尾两个空格
+            lines = [line + '  ' for line in lines[:-1]] + lines[-1:]
+        self.emit(lines, tight=self.in_list_item())
+
+    def in_list_item(self):
+        return bool(self.containers) and self.containers[-1] != '>'
+
+    def append(self, text):
+        self.inline[-1].parts.append(text)
+
+    def in_inline(self):
+        return len(self.inline) > 1
+
+    # ---- 事件 ----
+
+    def text(self, text):
+        if self.pre_depth:
+            self.append(text)
+        elif self.code_depth:
+            self.append(WHITESPACE.sub(' ', text))
+        else:
+            self.append(escape(WHITESPACE.sub(' ', text)))
+
+    def start(self, name, attrs):
+        if name == 'br':
+            self.append('\n' if not self.in_inline() or self.pre_depth else ' ')
+        elif name == 'hr':
+            if not self.in_inline():
+                self.flush()
+                self.emit(['---'])
+        elif name == 'img':
+            if attrs.get('src'):
+                alt = escape(WHITESPACE.sub(' ', attrs.get('alt', '')).strip())
+                self.append(f"![{alt}]({link_target(attrs['src'])})")
+        elif name == 'title':
+            self.inline.append(_Inline(name))
+        elif name == 'code':
+            if not self.pre_depth:
+                self.inline.append(_Inline(name))
+            self.code_depth += 1
+        elif self.pre_depth and name != 'pre':
+            # 代码块内只保留原始文本，不生成链接、强调和段落
+            pass
+        elif name in ('a', 'td', 'th') or name in INLINE_MARKS:
+            self.inline.append(_Inline(name, attrs))
+        elif name in BLOCK_TAGS:
+            if self.in_inline():
+                self.append(' ')
+            else:
+                self.start_block(name)
+
+    def start_block(self, name):
+        if not self.pre_depth:
+            self.flush()
+        if name == 'blockquote':
+            self.containers.append('>')
+        elif name in ('ul', 'ol'):
+            self.lists.append([name == 'ol', 0])
+        elif name == 'li':
+            if self.lists:
+                ordered = self.lists[-1]
+                ordered[1] += 1
+                marker = f"{ordered[1]}. " if ordered[0] else '- '
+            else:
+                marker = '- '
+            self.containers.append([marker, True])
+        elif name == 'pre':
+            self.pre_depth += 1
+        elif name == 'table':
+            self.tables.append([])
+        elif name == 'tr':
+            if self.tables:
+                self.tables[-1].append([])
+
+    def end(self, name):
+        if name == 'title':
+            frame = self.inline.pop()
+            if self.title is None:
+                self.title = WHITESPACE.sub(' ', ''.join(frame.parts)).strip()
+        elif name in ('a', 'td', 'th') or name in INLINE_MARKS:
+            if self.inline[-1].name == name:
+                self.end_inline(self.inline.pop())
+        elif name == 'code':
+            self.code_depth -= 1
+            if not self.pre_depth and self.inline[-1].name == 'code':
+                code = ''.join(self.inline.pop().parts).strip()
+                if code:
+                    fence = '``' if '`' in code else '`'
+                    self.append(f"{fence}{code}{fence}")
+        elif name in BLOCK_TAGS:
+            if self.in_inline():
+                self.append(' ')
+            elif not self.pre_depth or name == 'pre':
+                self.end_block(name)
+
+    def end_inline(self, frame):
+        text = WHITESPACE.sub(' ', ''.join(frame.parts)).strip()
+        if frame.name in ('td', 'th'):
+            if self.tables and not self.in_inline():
+                rows = self.tables[-1]
+                if not rows:
+                    rows.append([])
+                rows[-1].append(text.replace('|', '\\|'))
+            else:
+                self.append(f" {text} ")
+        elif frame.name == 'a':
+            href = frame.attrs.get('href', '').strip()
+            if text and href and not href.startswith('javascript:'):
+                self.append(f"[{text}]({link_target(href)})")
+            elif text:
+                self.append(text)
+        elif text:
+            mark = INLINE_MARKS[frame.name]
+            self.append(f"{mark}{text}{mark}")
+
+    def end_block(self, name):
+        if name in HEADING_TAGS:
+            self.flush('#' * HEADING_TAGS[name] + ' ')
+        elif name == 'pre':
+            self.end_pre()
+        else:
+            self.flush()
+        if name == 'blockquote':
+            if '>' in self.containers:
+                self.containers.pop(len(self.containers) - 1 - self.containers[::-1].index('>'))
+        elif name in ('ul', 'ol'):
+            if self.lists:
+                self.lists.pop()
+        elif name == 'li':
+            if self.in_list_item():
+                self.containers.pop()
+        elif name == 'table':
+            if self.tables:
+                self.emit_table(self.tables.pop())
+
+    def end_pre(self):
+        self.pre_depth -= 1
+        if self.pre_depth:
+            return
+        paragraph = self.inline[0]
+        code = ''.join(paragraph.parts).strip('\n')
+        paragraph.parts = []
+        if code.strip():
+            self.emit(['```', *code.split('\n'), '```'])
+
+    def emit_table(self, rows):
+        rows = [row for row in rows if any(row)]
+        if not rows:
+            return
+        width = max(len(row) for row in rows)
+        lines = []
+        for i, row in enumerate(rows):
+            lines.append('| ' + ' | '.join(row + [''] * (width - len(row))) + ' |')
+            if i == 0:
+                lines.append('|' + ' --- |' * width)
+        self.emit(lines)
+
+    def markdown(self):
+        """结束转换，返回 Markdown 文本；<title> 作为一级标题放在最前"""
+        self.flush()
+        blocks = list(self.blocks)
+        if self.title:
+            blocks.insert(0, ('\n\n', f"# {self.title}"))
+        if not blocks:
+            return ''
+        return blocks[0][1] + ''.join(separator + text for separator, text in blocks[1:]) + '\n'
+
+
+def _convert(top_level, children_of):
+    """遍历一次DOM树，逐个节点交给 MarkdownWriter"""
+    writer = MarkdownWriter()
+    stack = [(top_level, None)]
+    while stack:
+        children, name = stack[-1]
+        child = next(children, None)
+
+        if child is None:
+            stack.pop()
+            if name is not None:
+                writer.end(name)
+            continue
+
+        if isinstance(child, str):
+            writer.text(child)
+            continue
+
+        name, attrs, node = child
+        if name in SKIP_TAGS:
+            continue
+        writer.start(name, attrs)
+        stack.append((children_of(node), name))
+
+    return writer.markdown()
+
+
+def soup_to_markdown(soup):
+    """BeautifulSoup 树 → Markdown"""
+    with metrics.timer('markdown'):
+        return _convert(soup_children(soup), soup_children)
+
+
+def html_to_markdown(markup, parser=None):
+    """HTML → Markdown；选择 selectolax 时直接在 lexbor 树上遍历"""
+    if resolve_parser(parser) == 'selectolax':
+        from selectolax.lexbor import LexborHTMLParser
+        with metrics.timer('parse'):
+            tree = LexborHTMLParser(markup)
+        with metrics.timer('markdown'):
+            return _convert(lexbor_root_children(tree), lexbor_children)
+    return soup_to_markdown(make_soup(markup, parser))
+
+
+def convert_file(html_path, parser=None):
+    """转换一个HTML文件，返回 (源摘要, Markdown 文本)；在进程池的工作进程中运行"""
+    markup = Path(html_path).read_text(encoding='utf-8', errors='replace')
+    return content_digest(markup), html_to_markdown(markup, parser)
+
+
+def convert_directory(html_dir, markdown_dir, parser=None, workers=None, output_dir=None):
+    """把目录中的 *.html 批量转换为同名 .md
+
+    源HTML未变化的文件按清单跳过，其余文件分给进程池并行转换，结果由主进程写入；
+    转换清单 markdown_manifest.json 和文件清单 file_manifest.json 保存在 output_dir（默认 markdown 目录本身），
+    传入 ComprehensiveScraper 的输出目录时与其共用清单
+    返回 {'converted', 'written', 'unchanged', 'html_bytes', 'markdown_bytes'}，
+    unchanged 包括跳过的源文件和转换结果与已有文件相同的文件
+    """
+    html_dir = Path(html_dir)
+    markdown_dir = Path(markdown_dir)
+    markdown_dir.mkdir(parents=True, exist_ok=True)
+    output_dir = Path(output_dir) if output_dir else markdown_dir
+    manifest = ContentManifest(markdown_dir, output_dir / 'markdown_manifest.json', version=MARKDOWN_VERSION)
+    files = FileManifest(output_dir)
+    workers = workers or os.cpu_count() or 4
+
+    pending = []
+    skipped = 0
+    for html_path in sorted(html_dir.glob('*.html')):
+        name = html_path.stem + '.md'
+        markup = html_path.read_bytes().decode('utf-8', errors='replace')
+        if manifest.is_current(name, content_digest(markup)):
+            md_path = markdown_dir / name
+            if not files.contains(md_path):
+                files.record(md_path, md_path.stat().st_size)
+            skipped += 1
+            continue
+        pending.append(html_path)
+
+    stats = {'converted': len(pending), 'html_bytes': 0, 'markdown_bytes': 0}
+    if pending:
+        log.info(f"📝 转换 {len(pending)} 个HTML文件（{skipped} 个未变化，{min(workers, len(pending))} 个进程）")
+
+    with progress('📝 Markdown', len(pending)) as bar:
+        if workers <= 1 or len(pending) <= 1:
+            results = map(convert_file, pending, [parser] * len(pending))
+            pool = None
+        else:
+            pool = ProcessPoolExecutor(min(workers, len(pending)))
+            results = pool.map(convert_file, pending, [parser] * len(pending),
+                               chunksize=max(1, len(pending) // (workers * 4)))
+        try:
+            for html_path, (source_digest, markdown_text) in zip(pending, results):
+                name = html_path.stem + '.md'
+                manifest.write(name, source_digest, markdown_text)
+                files.record_content(markdown_dir / name, markdown_text)
+                stats['html_bytes'] += html_path.stat().st_size
+                stats['markdown_bytes'] += len(markdown_text.encode('utf-8'))
+                log.debug(f"📝 {html_path.name} → {name}")
+                bar.advance()
+        finally:
+            if pool:
+                pool.shutdown()
+
+    manifest.save()
+    files.save()
+    stats.update(manifest.stats())
+    return stats
+
+
+def main():
+    """主函数"""
+    arg_parser = argparse.ArgumentParser(description='批量把保存的HTML转换为Markdown')
+    arg_parser.add_argument('--output-dir', default=None,
+                            help=f'保存转换清单和文件清单的抓取输出目录（默认: 指定 --markdown-dir 时为该目录，'
+                                 f'否则为 {DEFAULT_OUTPUT_DIR}）')
+    arg_parser.add_argument('--html-dir', default=None, help='HTML 目录（默认: <输出目录>/html）')
+    arg_parser.add_argument('--markdown-dir', default=None, help='Markdown 目录（默认: <输出目录>/markdown）')
+    arg_parser.add_argument('--workers', type=int, default=None, help='转换进程数（默认: CPU 核数）')
+    add_parser_argument(arg_parser)
+    add_log_arguments(arg_parser)
+    args = arg_parser.parse_args()
+    configure_from_args(args)
+
+    root = Path(args.output_dir or DEFAULT_OUTPUT_DIR)
+    markdown_dir = args.markdown_dir or root / 'markdown'
+    # 只指定 markdown 目录时清单放在该目录中，不写到无关的目录
+    output_dir = args.output_dir or (markdown_dir if args.markdown_dir else root)
+    stats = convert_directory(args.html_dir or root / 'html', markdown_dir, parser=args.parser,
+                              workers=args.workers, output_dir=output_dir)
+    log.info(f"✅ 转换完成: 转换 {stats['converted']} 个文件，写入 {stats['written']} 个，"
+             f"未变化 {stats['unchanged']} 个")
+    if stats['html_bytes']:
+        log.info(f"💾 HTML {stats['html_bytes']/1024:.1f} KB → Markdown {stats['markdown_bytes']/1024:.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
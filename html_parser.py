@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+可切换的HTML解析后端
+BeautifulSoup 支持 lxml / html5lib / html.parser，纯提取路径可使用 selectolax (lexbor)，
+html.parser 只在其他后端不可用时作为兜底
+"""
+
+import importlib.util
+import os
+
+from bs4 import BeautifulSoup
+
+import metrics
+from page_facts import extract_lexbor_facts, extract_page_facts
+from scrape_log import log
+
+# 可选的解析后端
+PARSER_BACKENDS = ('lxml', 'selectolax', 'html5lib', 'html.parser')
+
+# 生成 BeautifulSoup 树的后端；selectolax 不是 bs4 的树构建器
+SOUP_BACKENDS = ('lxml', 'html5lib', 'html.parser')
+
+FALLBACK_PARSER = 'html.parser'
+
+_MODULES = {
+    'lxml': 'lxml',
+    'html5lib': 'html5lib',
+    'selectolax': 'selectolax',
+    'html.parser': None
+}
+
+_default_parser = None
+_warned = set()
+
+
+def is_available(name):
+    """后端依赖是否已安装"""
+    if name not in _MODULES:
+        return False
+    module = _MODULES[name]
+    return module is None or importlib.util.find_spec(module) is not None
+
+
+def available_parsers():
+    """已安装的后端（按优先级）"""
+    return [name for name in PARSER_BACKENDS if is_available(name)]
+
+
+def resolve_parser(name=None):
+    """确定实际使用的后端
+
+    name 为 None 时使用默认后端；指定的后端未安装时回退到 html.parser
+    """
+    name = name or get_default_parser()
+    if name not in _MODULES:
+        raise ValueError(f"未知的解析后端: {name}（可选: {', '.join(PARSER_BACKENDS)}）")
+    if not is_available(name):
+        if name not in _warned:
+            _warned.add(name)
+            log.warning(f"⚠️  解析后端 {name} 未安装，回退到 {FALLBACK_PARSER}")
+        return FALLBACK_PARSER
+    return name
+
+
+def get_default_parser():
+    """默认后端：SCRAPER_PARSER 环境变量，否则为第一个可用的 bs4 后端"""
+    global _default_parser
+    if _default_parser is None:
+        env_parser = os.getenv('SCRAPER_PARSER')
+        if env_parser:
+            _default_parser = resolve_parser(env_parser)
+        else:
+            _default_parser = next(name for name in SOUP_BACKENDS if is_available(name))
+    return _default_parser
+
+
+def set_default_parser(name):
+    """设置进程内默认后端，返回实际生效的后端"""
+    global _default_parser
+    _default_parser = resolve_parser(name)
+    return _default_parser
+
+
+def soup_parser(name=None):
+    """生成 BeautifulSoup 树时使用的后端
+
+    selectolax 只用于纯提取；需要修改或遍历 bs4 树的路径改用最快的 bs4 后端
+    """
+    name = resolve_parser(name)
+    if name in SOUP_BACKENDS:
+        return name
+    return next(backend for backend in SOUP_BACKENDS if is_available(backend))
+
+
+def make_soup(markup, parser=None):
+    """用选定的后端构建 BeautifulSoup 树"""
+    with metrics.timer('parse'):
+        return BeautifulSoup(markup, soup_parser(parser))
+
+
+def parse_page_facts(markup, parser=None):
+    """解析HTML并提取页面信息（纯提取路径）
+
+    选择 selectolax 时直接在 lexbor 树上遍历，不构建 BeautifulSoup 树
+    """
+    if resolve_parser(parser) == 'selectolax':
+        from selectolax.lexbor import LexborHTMLParser
+        with metrics.timer('parse'):
+            tree = LexborHTMLParser(markup)
+        return extract_lexbor_facts(tree)
+    return extract_page_facts(make_soup(markup, parser))
+
+
+def add_parser_argument(arg_parser):
+    """为命令行添加 --parser 选项"""
+    arg_parser.add_argument(
+        '--parser',
+        choices=PARSER_BACKENDS,
+        default=None,
+        help='HTML解析后端（默认: SCRAPER_PARSER 环境变量或第一个可用的 bs4 后端）'
+    )
+    return arg_parser
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+HTTP 条件请求缓存
+保存 ETag / Last-Modified 校验值，重复抓取时发送 If-None-Match / If-Modified-Since，
+服务器返回 304 时直接使用本地内容
+"""
+
+import json
+import os
+from pathlib import Path
+from urllib.parse import urlparse
+
+
+class HTTPCache:
+    """磁盘HTTP缓存
+
+    响应内容保存在 AssetStore 的对象目录中（按 SHA-256 去重），
+    本类只维护 URL → 校验值/摘要 的索引和命中统计
+    """
+
+    def __init__(self, store, index_path=None):
+        self.store = store
+        self.index_path = Path(index_path) if index_path else self.store.root / 'http_cache.json'
+        self.entries = self.load_index()
+        self.dirty = False
+
+        self.hits = 0
+        self.misses = 0
+        self.bytes_downloaded = 0
+        self.bytes_saved = 0
+
+    def load_index(self):
+        """加载缓存索引"""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def save(self):
+        """保存缓存索引（先写临时文件再替换）"""
+        if not self.dirty:
+            return
+        tmp_path = self.index_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.index_path)
+        self.dirty = False
+
+    def lookup(self, url):
+        """返回可用于重新验证的缓存条目，内容文件丢失时视为未缓存"""
+        entry = self.entries.get(url)
+        if entry and self.has_content(entry):
+            return entry
+        return None
+
+    def has_content(self, entry):
+        """缓存条目对应的内容文件是否仍在资源仓库中"""
+        return bool(entry.get('digest')) and self.store.object_path(entry['digest'], entry['ext']).exists()
+
+    def forget(self, url):
+        """删除缓存条目（内容已丢失，下次完整下载）"""
+        if self.entries.pop(url, None) is not None:
+            self.dirty = True
+
+    def conditional_headers(self, entry):
+        """根据缓存条目生成条件请求头"""
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def revalidated(self, entry):
+        """记录一次 304 命中"""
+        self.hits += 1
+        self.bytes_saved += entry['size']
+
+    def read(self, entry):
+        """读取缓存内容"""
+        self.revalidated(entry)
+        with open(self.store.object_path(entry['digest'], entry['ext']), 'rb') as f:
+            return f.read()
+
+    def store_response(self, url, headers, content, charset=None):
+        """记录一次完整下载，响应带校验值时写入缓存"""
+        ext = os.path.splitext(urlparse(url).path)[1]
+        digest = None
+        if headers.get('ETag') or headers.get('Last-Modified'):
+            digest = self.store.write_object(content, ext)
+        return self.store_object(url, headers, digest, ext, len(content), charset)
+
+    def store_object(self, url, headers, digest, ext, size, charset=None):
+        """记录一次已流式写入资源仓库的下载，响应带校验值时写入缓存"""
+        self.misses += 1
+        self.bytes_downloaded += size
+
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        if not etag and not last_modified:
+            if self.entries.pop(url, None) is not None:
+                self.dirty = True
+            return None
+
+        entry = {
+            'etag': etag,
+            'last_modified': last_modified,
+            'digest': digest,
+            'ext': ext,
+            'size': size,
+            'content_type': headers.get('Content-Type', ''),
+            'charset': charset
+        }
+        self.entries[url] = entry
+        self.dirty = True
+        return entry
+
+    def stats(self):
+        """缓存命中统计，写入各抓取器的报告"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 3) if total else 0,
+            'bytes_downloaded': self.bytes_downloaded,
+            'bytes_saved': self.bytes_saved
+        }
@@ -4,150 +4,118 @@ MCP (Model Context Protocol) 风格的网站抓取工具
 专门为 68tt.co 网站设计的轻量级抓取器
 """
 
+import argparse
 import asyncio
-import aiohttp
 import json
 import os
 from pathlib import Path
 from urllib.parse import urljoin, urlparse
-from bs4 import BeautifulSoup
 import time
 
+import metrics
+from asset_store import AssetStore
+from fetch_engine import FetchEngine
+from html_parser import add_parser_argument, parse_page_facts
+from http_cache import HTTPCache
+from page_facts import extract_page_facts
+from scrape_log import add_log_arguments, configure_from_args, log, progress
+
+# 结构化内容的格式版本
+# 1: 各级标题分组排列（先所有 h1，再所有 h2……），标题为 <title> 的原始字符串
+# 2: 单次遍历提取，标题按文档顺序排列，<title> 文本去除首尾空白
+EXTRACT_SCHEMA_VERSION = 2
+
 class MCPScraper:
-    def __init__(self):
+    def __init__(self, engine=None, asset_concurrency=8, asset_store=None, parser=None, rate=5.0):
         self.base_url = "https://68tt.co/cn/"
         self.output_dir = Path("mcp_scraped")
-        self.session = None
+        self.engine = engine
+        self.owns_engine = engine is None
+        self.asset_concurrency = asset_concurrency
+        self.asset_store = asset_store
+        self.parser = parser
+        self.rate = rate
+        self.asset_timings = {}
+        self.asset_stage_seconds = 0.0
         self.scraped_content = {}
         
+        # 报告中的去重统计，按页面累加，页面记录本身只保留计数
+        self.image_srcs = set()
+        self.link_hrefs = set()
+        
     async def initialize(self):
-        """初始化异步会话"""
-        connector = aiohttp.TCPConnector(limit=10)
-        timeout = aiohttp.ClientTimeout(total=30)
-        self.session = aiohttp.ClientSession(
-            connector=connector,
-            timeout=timeout,
-            headers={
-                'User-Agent': 'MCP-Scraper/1.0 (68tt.co content extraction)'
-            }
-        )
+        """初始化共享抓取引擎"""
+        if self.asset_store is None:
+            self.asset_store = AssetStore()
+        if self.engine is None:
+            self.engine = FetchEngine(
+                concurrency=10,
+                per_host=self.asset_concurrency,
+                rate=self.rate,
+                headers={
+                    'User-Agent': 'MCP-Scraper/1.0 (68tt.co content extraction)'
+                },
+                cache=HTTPCache(self.asset_store)
+            )
+        await self.engine.start()
         self.output_dir.mkdir(exist_ok=True)
         
     async def close(self):
-        """关闭会话"""
-        if self.session:
-            await self.session.close()
+        """关闭会话并保存资源索引"""
+        if self.asset_store:
+            self.asset_store.save()
+        if self.engine and self.owns_engine:
+            await self.engine.close()
     
     async def fetch_page(self, url):
         """异步获取页面内容"""
-        try:
-            async with self.session.get(url) as response:
-                if response.status == 200:
-                    content = await response.text()
-                    return {
-                        'url': url,
-                        'status': response.status,
-                        'content': content,
-                        'headers': dict(response.headers)
-                    }
-                else:
-                    return {
-                        'url': url,
-                        'status': response.status,
-                        'error': f'HTTP {response.status}'
-                    }
-        except Exception as e:
-            return {
-                'url': url,
-                'status': 0,
-                'error': str(e)
-            }
+        result = await self.engine.fetch(url, as_text=True)
+        if 'content' not in result:
+            return {'url': url, 'status': result['status'], 'error': result['error']}
+        return {
+            'url': url,
+            'status': result['status'],
+            'content': result['content'],
+            'headers': result['headers']
+        }
     
     async def fetch_asset(self, url):
-        """异步获取静态资源"""
-        try:
-            async with self.session.get(url) as response:
-                if response.status == 200:
-                    content = await response.read()
-                    return {
-                        'url': url,
-                        'status': response.status,
-                        'content': content,
-                        'content_type': response.headers.get('content-type', '')
-                    }
-                else:
-                    return {'url': url, 'status': response.status, 'error': f'HTTP {response.status}'}
-        except Exception as e:
-            return {'url': url, 'status': 0, 'error': str(e)}
+        """异步流式下载静态资源到资源仓库"""
+        result = await self.engine.download(url)
+        if 'digest' not in result:
+            return {'url': url, 'status': result['status'], 'error': result['error']}
+        return {
+            'url': url,
+            'status': result['status'],
+            'digest': result['digest'],
+            'ext': result['ext'],
+            'size': result['size'],
+            'content_type': result['content_type'],
+            'from_cache': result['from_cache']
+        }
     
-    def extract_content(self, html_content):
-        """提取页面结构化内容"""
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        # 提取主要内容
-        content_data = {
-            'title': soup.title.string if soup.title else '',
-            'meta_description': '',
-            'headings': [],
-            'paragraphs': [],
-            'links': [],
-            'images': [],
-            'scripts': [],
-            'stylesheets': []
+    def extract_content(self, html_content, soup=None, facts=None):
+        """提取页面结构化内容
+
+        soup 为已解析的树时不再重复解析，facts 为已提取的页面信息时不再遍历
+        """
+        if facts is None:
+            facts = parse_page_facts(html_content, self.parser) if soup is None else extract_page_facts(soup)
+        return self.content_from_facts(facts)
+    
+    def content_from_facts(self, facts):
+        """把单次遍历提取的页面信息转换为结构化内容（EXTRACT_SCHEMA_VERSION 格式）"""
+        return {
+            'schema_version': EXTRACT_SCHEMA_VERSION,
+            'title': facts.title or '',
+            'meta_description': facts.meta_description,
+            'headings': [{'level': h.level, 'text': h.text, 'id': h.id} for h in facts.headings],
+            'paragraphs': list(facts.paragraphs),
+            'links': [{'href': link.href, 'text': link.text, 'title': link.title} for link in facts.links],
+            'images': [{'src': img.src, 'alt': img.alt, 'title': img.title} for img in facts.images],
+            'scripts': list(facts.scripts),
+            'stylesheets': list(facts.stylesheets)
         }
-        
-        # Meta描述
-        meta_desc = soup.find('meta', attrs={'name': 'description'})
-        if meta_desc:
-            content_data['meta_description'] = meta_desc.get('content', '')
-        
-        # 标题
-        for i in range(1, 7):
-            headings = soup.find_all(f'h{i}')
-            for h in headings:
-                content_data['headings'].append({
-                    'level': i,
-                    'text': h.get_text().strip(),
-                    'id': h.get('id', '')
-                })
-        
-        # 段落
-        paragraphs = soup.find_all('p')
-        for p in paragraphs:
-            text = p.get_text().strip()
-            if text:
-                content_data['paragraphs'].append(text)
-        
-        # 链接
-        links = soup.find_all('a', href=True)
-        for link in links:
-            content_data['links'].append({
-                'href': link['href'],
-                'text': link.get_text().strip(),
-                'title': link.get('title', '')
-            })
-        
-        # 图片
-        images = soup.find_all('img', src=True)
-        for img in images:
-            content_data['images'].append({
-                'src': img['src'],
-                'alt': img.get('alt', ''),
-                'title': img.get('title', '')
-            })
-        
-        # 样式表
-        stylesheets = soup.find_all('link', rel='stylesheet')
-        for css in stylesheets:
-            if css.get('href'):
-                content_data['stylesheets'].append(css['href'])
-        
-        # JavaScript
-        scripts = soup.find_all('script', src=True)
-        for script in scripts:
-            content_data['scripts'].append(script['src'])
-        
-        return content_data
     
     async def scrape_main_pages(self):
         """抓取主要页面"""
@@ -158,7 +126,7 @@ class MCPScraper:
             urljoin(self.base_url, '/contact'),
         ]
         
-        print("🚀 开始抓取主要页面...")
+        log.info("🚀 开始抓取主要页面...")
         
         tasks = [self.fetch_page(url) for url in pages_to_scrape]
         results = await asyncio.gather(*tasks)
@@ -167,86 +135,121 @@ class MCPScraper:
         
         for result in results:
             if 'content' in result:
-                print(f"✅ 成功抓取: {result['url']}")
-                
-                # 提取结构化内容
-                extracted = self.extract_content(result['content'])
-                
-                scraped_pages[result['url']] = {
-                    'raw_html': result['content'],
-                    'extracted_content': extracted,
-                    'status': result['status'],
-                    'headers': result.get('headers', {})
-                }
-                
-                # 保存原始HTML
-                filename = self.url_to_filename(result['url'])
-                html_path = self.output_dir / f"{filename}.html"
-                with open(html_path, 'w', encoding='utf-8') as f:
-                    f.write(result['content'])
-                
-                # 保存结构化数据
-                json_path = self.output_dir / f"{filename}.json"
-                with open(json_path, 'w', encoding='utf-8') as f:
-                    json.dump(extracted, f, ensure_ascii=False, indent=2)
-                    
+                log.info(f"✅ 成功抓取: {result['url']}")
+                scraped_pages[result['url']] = self.save_page(result)
             else:
-                print(f"❌ 抓取失败: {result['url']} - {result.get('error', 'Unknown error')}")
+                log.error(f"❌ 抓取失败: {result['url']} - {result.get('error', 'Unknown error')}")
         
         return scraped_pages
     
+    def save_page(self, result, soup=None, save=True, facts=None):
+        """提取并保存单个页面的结构化内容，返回页面记录
+
+        页面记录只保留HTML文件路径、汇总计数和资源地址，原始HTML和提取结果写入文件后即释放，
+        内存占用不随站点规模增长。soup 为已解析的树、facts 为已提取的页面信息时不再重复解析和遍历；
+        save 为 False 时只提取不写文件（html_path 为 None）
+        """
+        url = result['url']
+        extracted = self.extract_content(result['content'], soup, facts)
+        
+        html_path = None
+        if save:
+            # 保存原始HTML
+            filename = self.url_to_filename(url)
+            html_path = self.output_dir / f"{filename}.html"
+            with metrics.timer('write'), open(html_path, 'w', encoding='utf-8') as f:
+                f.write(result['content'])
+            
+            # 保存结构化数据
+            json_path = self.output_dir / f"{filename}.json"
+            with metrics.timer('write'), open(json_path, 'w', encoding='utf-8') as f:
+                json.dump(extracted, f, ensure_ascii=False, indent=2)
+        
+        self.image_srcs.update(img['src'] for img in extracted['images'])
+        self.link_hrefs.update(link['href'] for link in extracted['links'])
+        
+        # 资源下载阶段需要的地址（图片、样式表、脚本）
+        asset_refs = [img['src'] for img in extracted['images']] + extracted['stylesheets'] + extracted['scripts']
+        
+        return {
+            'title': extracted['title'],
+            'status': result['status'],
+            'headers': result.get('headers', {}),
+            'html_path': str(html_path) if html_path else None,
+            'content_length': len(result['content']),
+            'headings_count': len(extracted['headings']),
+            'paragraphs_count': len(extracted['paragraphs']),
+            'images_count': len(extracted['images']),
+            'links_count': len(extracted['links']),
+            'assets': [urljoin(url, ref) for ref in asset_refs]
+        }
+    
     async def download_assets(self, pages_data):
         """下载静态资源"""
         assets_to_download = set()
         
-        # 收集所有资源URL
-        for url, page_data in pages_data.items():
-            extracted = page_data['extracted_content']
-            
-            # 图片
-            for img in extracted['images']:
-                img_url = urljoin(url, img['src'])
-                assets_to_download.add(img_url)
-            
-            # 样式表
-            for css in extracted['stylesheets']:
-                css_url = urljoin(url, css)
-                assets_to_download.add(css_url)
-            
-            # JavaScript
-            for js in extracted['scripts']:
-                js_url = urljoin(url, js)
-                assets_to_download.add(js_url)
+        # 收集所有资源URL（图片、样式表和 JavaScript）
+        for page_data in pages_data.values():
+            assets_to_download.update(page_data['assets'])
         
-        print(f"📦 发现 {len(assets_to_download)} 个静态资源")
+        log.info(f"📦 发现 {len(assets_to_download)} 个静态资源")
         
         # 创建资源目录
         assets_dir = self.output_dir / "assets"
         assets_dir.mkdir(exist_ok=True)
         
-        # 下载资源
-        downloaded_assets = {}
+        # 有界并发下载资源，按完成顺序输出进度
+        targets = sorted(url for url in assets_to_download if self.is_same_domain(url))
+        semaphore = asyncio.Semaphore(self.asset_concurrency)
         
-        for asset_url in assets_to_download:
-            if self.is_same_domain(asset_url):
+        async def download(asset_url):
+            async with semaphore:
+                started = time.perf_counter()
                 result = await self.fetch_asset(asset_url)
+                return asset_url, result, time.perf_counter() - started
+        
+        downloaded_assets = {}
+        self.asset_timings = {}
+        stage_started = time.perf_counter()
+        
+        bar = progress('📦 资源', len(targets))
+        tasks = [asyncio.ensure_future(download(url)) for url in targets]
+        for done, future in enumerate(asyncio.as_completed(tasks), 1):
+            asset_url, result, elapsed = await future
+            elapsed_ms = round(elapsed * 1000, 1)
+            bar.advance()
+            
+            if 'digest' in result:
+                filename = self.url_to_filename(asset_url, keep_extension=True)
+                asset_path = assets_dir / filename
+                
+                # 内容已流式写入资源仓库，登记后链接到资源目录
+                entry = self.asset_store.register(asset_url, result['digest'], result['size'], result['content_type'],
+                                                  os.path.splitext(filename)[1], src_ext=result['ext'])
+                self.asset_store.place(entry, asset_path)
+                
+                downloaded_assets[asset_url] = {
+                    'local_path': str(asset_path),
+                    'content_type': result['content_type'],
+                    'size': entry['size'],
+                    'sha256': entry['digest'],
+                    'from_cache': result['from_cache'],
+                    'elapsed_ms': elapsed_ms
+                }
                 
-                if 'content' in result:
-                    filename = self.url_to_filename(asset_url, keep_extension=True)
-                    asset_path = assets_dir / filename
-                    
-                    with open(asset_path, 'wb') as f:
-                        f.write(result['content'])
-                    
-                    downloaded_assets[asset_url] = {
-                        'local_path': str(asset_path),
-                        'content_type': result['content_type'],
-                        'size': len(result['content'])
-                    }
-                    
-                    print(f"📥 下载资源: {filename}")
-                else:
-                    print(f"❌ 资源下载失败: {asset_url}")
+                log.debug(f"📥 [{done}/{len(targets)}] 下载资源: {filename} ({elapsed_ms} ms)")
+            else:
+                log.warning(f"⚠️  [{done}/{len(targets)}] 资源下载失败: {asset_url} - {result.get('error', 'Unknown error')}",
+                            extra={'data': {'url': asset_url}})
+            
+            self.asset_timings[asset_url] = {
+                'status': result['status'],
+                'size': downloaded_assets[asset_url]['size'] if asset_url in downloaded_assets else 0,
+                'elapsed_ms': elapsed_ms
+            }
+        bar.close()
+        
+        self.asset_stage_seconds = time.perf_counter() - stage_started
         
         return downloaded_assets
     
@@ -270,39 +273,62 @@ class MCPScraper:
         else:
             return os.path.splitext(filename)[0] or 'index'
     
-    async def generate_mcp_report(self, pages_data, assets_data):
-        """生成MCP格式的报告"""
+    def summarize_asset_timings(self):
+        """汇总资源下载阶段的耗时"""
+        timings = self.asset_timings
+        total_ms = sum(t['elapsed_ms'] for t in timings.values())
+        slowest = sorted(timings.items(), key=lambda item: item[1]['elapsed_ms'], reverse=True)[:5]
+        
+        return {
+            'concurrency': self.asset_concurrency,
+            'stage_seconds': round(self.asset_stage_seconds, 3),
+            'sum_of_asset_ms': round(total_ms, 1),
+            'mean_asset_ms': round(total_ms / len(timings), 1) if timings else 0,
+            'slowest': [{'url': url, **timing} for url, timing in slowest],
+            'per_asset': timings
+        }
+    
+    async def generate_mcp_report(self, pages_data, assets_data, near_duplicates=None):
+        """生成MCP格式的报告
+
+        near_duplicates 为抓取时检测到的近似重复页面分组（这些页面没有提取结构化内容）
+        """
         report = {
             'scraping_info': {
                 'target_url': self.base_url,
+                'schema_version': EXTRACT_SCHEMA_VERSION,
                 'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
                 'total_pages': len(pages_data),
                 'total_assets': len(assets_data),
                 'output_directory': str(self.output_dir)
             },
             'pages': {},
+            'near_duplicates': near_duplicates,
             'assets': assets_data,
+            'asset_timing': self.summarize_asset_timings(),
+            'http_cache': self.engine.cache.stats() if self.engine.cache else None,
+            # 各阶段和各主机的耗时与计数，同时写入 metrics.prom
+            'metrics': metrics.export(self.output_dir),
             'summary': {
                 'successful_pages': len([p for p in pages_data.values() if p['status'] == 200]),
                 'failed_pages': len([p for p in pages_data.values() if p['status'] != 200]),
-                'total_content_size': sum(len(p['raw_html']) for p in pages_data.values()),
-                'unique_images': len(set(img['src'] for page in pages_data.values() 
-                                      for img in page['extracted_content']['images'])),
-                'unique_links': len(set(link['href'] for page in pages_data.values() 
-                                     for link in page['extracted_content']['links']))
+                'total_content_size': sum(p['content_length'] for p in pages_data.values()),
+                'unique_images': len(self.image_srcs),
+                'unique_links': len(self.link_hrefs)
             }
         }
         
         # 简化页面数据用于报告
         for url, page_data in pages_data.items():
             report['pages'][url] = {
-                'title': page_data['extracted_content']['title'],
+                'title': page_data['title'],
                 'status': page_data['status'],
-                'content_length': len(page_data['raw_html']),
-                'headings_count': len(page_data['extracted_content']['headings']),
-                'paragraphs_count': len(page_data['extracted_content']['paragraphs']),
-                'images_count': len(page_data['extracted_content']['images']),
-                'links_count': len(page_data['extracted_content']['links'])
+                'html_path': page_data['html_path'],
+                'content_length': page_data['content_length'],
+                'headings_count': page_data['headings_count'],
+                'paragraphs_count': page_data['paragraphs_count'],
+                'images_count': page_data['images_count'],
+                'links_count': page_data['links_count']
             }
         
         # 保存报告
@@ -317,8 +343,8 @@ class MCPScraper:
         await self.initialize()
         
         try:
-            print("🔧 MCP 68tt.co 网站内容抓取器")
-            print("=" * 50)
+            log.info("🔧 MCP 68tt.co 网站内容抓取器")
+            log.info("=" * 50)
             
             # 抓取页面
             pages_data = await self.scrape_main_pages()
@@ -329,18 +355,24 @@ class MCPScraper:
             # 生成报告
             report = await self.generate_mcp_report(pages_data, assets_data)
             
-            print("\n✅ MCP 抓取完成!")
-            print(f"📊 页面: {report['summary']['successful_pages']} 成功, {report['summary']['failed_pages']} 失败")
-            print(f"📦 资源: {len(assets_data)} 个文件")
-            print(f"💾 总大小: {report['summary']['total_content_size']:,} 字节")
-            print(f"📁 输出目录: {self.output_dir}")
+            log.info("✅ MCP 抓取完成!")
+            log.info(f"📊 页面: {report['summary']['successful_pages']} 成功, {report['summary']['failed_pages']} 失败")
+            log.info(f"📦 资源: {len(assets_data)} 个文件")
+            log.info(f"💾 总大小: {report['summary']['total_content_size']:,} 字节")
+            log.info(f"📁 输出目录: {self.output_dir}")
             
         finally:
             await self.close()
 
 async def main():
     """主函数"""
-    scraper = MCPScraper()
+    arg_parser = argparse.ArgumentParser(description='MCP 风格的网站抓取工具')
+    add_parser_argument(arg_parser)
+    add_log_arguments(arg_parser)
+    args = arg_parser.parse_args()
+    configure_from_args(args)
+    
+    scraper = MCPScraper(parser=args.parser)
     await scraper.run()
 
 if __name__ == "__main__":
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+抓取指标
+按阶段（fetch、download、parse、extract、write）和主机记录计数器与耗时直方图，
+可导出为报告中的 JSON 和 Prometheus 文本格式
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# 耗时直方图的桶上限（秒）
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+
+STAGE_SECONDS = 'stage_seconds'
+METRICS_FILENAME = 'metrics.prom'
+
+
+class Histogram:
+    """累积桶直方图"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, upper in enumerate(self.buckets):
+            if value <= upper:
+                self.counts[i] += 1
+                break
+
+    def cumulative(self):
+        """每个桶上限对应的累计数量"""
+        total = 0
+        for upper, count in zip(self.buckets, self.counts):
+            total += count
+            yield upper, total
+
+    def quantile(self, q):
+        """按桶估算分位数（取所在桶的上限）"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        for upper, total in self.cumulative():
+            if total >= rank:
+                return upper if upper != float('inf') else self.buckets[-2]
+        return self.buckets[-2]
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'total_seconds': round(self.sum, 4),
+            'mean_ms': round(self.sum / self.count * 1000, 2) if self.count else 0.0,
+            'p95_ms': round(self.quantile(0.95) * 1000, 2)
+        }
+
+
+def _key(name, labels):
+    return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_le(upper):
+    return '+Inf' if upper == float('inf') else repr(upper)
+
+
+class Metrics:
+    """线程安全的指标注册表
+
+    inc(name, value, **labels) 累加计数器；observe(name, seconds, **labels) 记录耗时；
+    timer(stage, **labels) 计时一个阶段，记入 stage_seconds 直方图
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counters = {}
+            self.histograms = {}
+            self.started = time.time()
+
+    def inc(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = _key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(STAGE_SECONDS, time.perf_counter() - started, stage=stage, **labels)
+
+    def _merged(self, label):
+        """按某个标签合并 stage_seconds 直方图"""
+        merged = {}
+        with self.lock:
+            for (name, labels), histogram in self.histograms.items():
+                labels = dict(labels)
+                if name != STAGE_SECONDS or label not in labels:
+                    continue
+                target = merged.get(labels[label])
+                if target is None:
+                    target = merged[labels[label]] = Histogram(self.buckets)
+                target.count += histogram.count
+                target.sum += histogram.sum
+                target.counts = [a + b for a, b in zip(target.counts, histogram.counts)]
+        return merged
+
+    def stage_summary(self):
+        """每个阶段的次数、总耗时、平均和 P95 耗时"""
+        return {stage: histogram.summary() for stage, histogram in sorted(self._merged('stage').items())}
+
+    def host_summary(self):
+        """每个主机的请求耗时，以及请求数和字节数"""
+        hosts = {host: histogram.summary() for host, histogram in sorted(self._merged('host').items())}
+        with self.lock:
+            for (name, labels), value in self.counters.items():
+                host = dict(labels).get('host')
+                if host in hosts and name in ('requests_total', 'bytes_total', 'errors_total'):
+                    hosts[host][name] = hosts[host].get(name, 0) + value
+        return hosts
+
+    def to_dict(self):
+        """报告中使用的 JSON 结构"""
+        with self.lock:
+            counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                        for (name, labels), value in sorted(self.counters.items())]
+        return {
+            'elapsed_seconds': round(time.time() - self.started, 3),
+            'stages': self.stage_summary(),
+            'hosts': self.host_summary(),
+            'counters': counters
+        }
+
+    def to_prometheus(self, prefix='scraper'):
+        """Prometheus 文本格式"""
+        lines = []
+        with self.lock:
+            counter_names = sorted({name for name, _ in self.counters})
+            for counter_name in counter_names:
+                metric = f'{prefix}_{counter_name}'
+                lines.append(f'# TYPE {metric} counter')
+                for (name, labels), value in sorted(self.counters.items()):
+                    if name == counter_name:
+                        lines.append(f'{metric}{_format_labels(labels)} {value}')
+
+            histogram_names = sorted({name for name, _ in self.histograms})
+            for histogram_name in histogram_names:
+                metric = f'{prefix}_{histogram_name}'
+                lines.append(f'# TYPE {metric} histogram')
+                for (name, labels), histogram in sorted(self.histograms.items()):
+                    if name != histogram_name:
+                        continue
+                    for upper, total in histogram.cumulative():
+                        lines.append(f'{metric}_bucket{_format_labels(labels, [("le", _format_le(upper))])} {total}')
+                    lines.append(f'{metric}_sum{_format_labels(labels)} {histogram.sum:.6f}')
+                    lines.append(f'{metric}_count{_format_labels(labels)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path, prefix='scraper'):
+        """写入 Prometheus 文本文件（先写临时文件再改名，供 node_exporter 等采集）"""
+        path = Path(path)
+        tmp_path = path.with_suffix(path.suffix + '.tmp')
+        tmp_path.write_text(self.to_prometheus(prefix), encoding='utf-8')
+        tmp_path.replace(path)
+        return path
+
+
+# 进程内默认注册表，各抓取器和共享组件都记录到这里
+registry = Metrics()
+
+
+def timer(stage, **labels):
+    """在默认注册表中计时一个阶段"""
+    return registry.timer(stage, **labels)
+
+
+def export(output_dir):
+    """把默认注册表写入 output_dir/metrics.prom，返回报告中使用的 JSON 结构"""
+    registry.write_prometheus(Path(output_dir) / METRICS_FILENAME)
+    return registry.to_dict()
@@ -3,9 +3,11 @@
 移动端专用抓取器 - 获取手机版完整内容
 """
 
+import argparse
 import requests
 from pathlib import Path
-from bs4 import BeautifulSoup
+from html_parser import make_soup
+from scrape_log import add_log_arguments, configure_from_args, log
 import json
 import time
 
@@ -23,31 +25,31 @@ def scrape_mobile_version():
     
     url = "https://68tt.co/cn/"
     
-    print("🔍 开始抓取移动端版本...")
-    print(f"📱 User-Agent: iPhone")
-    print(f"🌐 目标URL: {url}")
+    log.info("🔍 开始抓取移动端版本...")
+    log.info(f"📱 User-Agent: iPhone")
+    log.info(f"🌐 目标URL: {url}")
     
     try:
         response = requests.get(url, headers=mobile_headers, timeout=30)
         if response.status_code != 200:
-            print(f"❌ 请求失败: HTTP {response.status_code}")
+            log.error(f"❌ 请求失败: HTTP {response.status_code}")
             return
         
-        print(f"✅ 页面获取成功: {len(response.text)} 字符")
+        log.info(f"✅ 页面获取成功: {len(response.text)} 字符")
         
         # 保存原始HTML
         with open(output_dir / "mobile_raw.html", 'w', encoding='utf-8') as f:
             f.write(response.text)
         
         # 解析HTML
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = make_soup(response.text)
         
         # 分析移动端特有的内容结构
-        print("\n📋 分析移动端内容结构:")
+        log.info("📋 分析移动端内容结构:")
         
         # 查找phone-inner区域
         phone_inner_sections = soup.find_all('div', class_='phone-inner')
-        print(f"📱 找到 {len(phone_inner_sections)} 个 phone-inner 区域")
+        log.info(f"📱 找到 {len(phone_inner_sections)} 个 phone-inner 区域")
         
         mobile_content = {
             'title': soup.title.string if soup.title else '',
@@ -58,7 +60,7 @@ def scrape_mobile_version():
         }
         
         for i, section in enumerate(phone_inner_sections):
-            print(f"\n📱 Phone-inner 区域 {i+1}:")
+            log.debug(f"📱 Phone-inner 区域 {i+1}:")
             
             section_data = {
                 'index': i+1,
@@ -79,7 +81,7 @@ def scrape_mobile_version():
                     'class': img.get('class', [])
                 }
                 section_data['images'].append(img_data)
-                print(f"  🖼️ 图片: {img_data['src']}")
+                log.debug(f"  🖼️ 图片: {img_data['src']}")
             
             # 查找按钮和链接
             buttons = section.find_all(['a', 'button', 'div'], class_=lambda x: x and ('btn' in ' '.join(x) or 'download' in ' '.join(x)))
@@ -92,7 +94,7 @@ def scrape_mobile_version():
                     'id': btn.get('id', '')
                 }
                 section_data['buttons'].append(btn_data)
-                print(f"  🔘 按钮: {btn_data['text']} ({btn_data['class']})")
+                log.debug(f"  🔘 按钮: {btn_data['text']} ({btn_data['class']})")
             
             # 查找文本内容
             text_elements = section.find_all(['p', 'div', 'span'], string=True)
@@ -100,13 +102,13 @@ def scrape_mobile_version():
                 text = elem.get_text(strip=True)
                 if text and len(text) > 5:  # 过滤短文本
                     section_data['text_content'] = text
-                    print(f"  📝 文本: {text[:50]}...")
+                    log.debug(f"  📝 文本: {text[:50]}...")
             
             mobile_content['phone_inner_sections'].append(section_data)
         
         # 查找其他移动端特有内容
         mobile_specific = soup.find_all(['div', 'section'], class_=lambda x: x and any(keyword in ' '.join(x) for keyword in ['mobile', 'phone', 'h5']))
-        print(f"\n📱 找到 {len(mobile_specific)} 个移动端特有元素")
+        log.info(f"📱 找到 {len(mobile_specific)} 个移动端特有元素")
         
         for elem in mobile_specific:
             if elem not in phone_inner_sections:  # 避免重复
@@ -117,7 +119,7 @@ def scrape_mobile_version():
                     'html': str(elem)[:500]
                 }
                 mobile_content['mobile_specific_content'].append(elem_data)
-                print(f"  📱 移动端元素: {elem_data['classes']} - {elem_data['text'][:50]}...")
+                log.debug(f"  📱 移动端元素: {elem_data['classes']} - {elem_data['text'][:50]}...")
         
         # 查找所有图片
         all_images = soup.find_all('img')
@@ -130,7 +132,7 @@ def scrape_mobile_version():
             }
             mobile_content['images'].append(img_data)
         
-        print(f"\n🖼️ 总共找到 {len(all_images)} 个图片")
+        log.info(f"🖼️ 总共找到 {len(all_images)} 个图片")
         
         # 保存分析结果
         with open(output_dir / "mobile_analysis.json", 'w', encoding='utf-8') as f:
@@ -139,14 +141,14 @@ def scrape_mobile_version():
         # 生成移动端内容报告
         generate_mobile_report(mobile_content, output_dir)
         
-        print(f"\n📊 移动端抓取完成!")
-        print(f"📁 输出目录: {output_dir}")
-        print(f"📄 原始HTML: mobile_raw.html")
-        print(f"📋 分析结果: mobile_analysis.json")
-        print(f"📝 内容报告: mobile_content_report.md")
+        log.info(f"📊 移动端抓取完成!")
+        log.info(f"📁 输出目录: {output_dir}")
+        log.info(f"📄 原始HTML: mobile_raw.html")
+        log.info(f"📋 分析结果: mobile_analysis.json")
+        log.info(f"📝 内容报告: mobile_content_report.md")
         
     except Exception as e:
-        print(f"❌ 抓取失败: {e}")
+        log.error(f"❌ 抓取失败: {e}")
 
 def generate_mobile_report(content, output_dir):
     """生成移动端内容报告"""
@@ -188,4 +190,7 @@ def generate_mobile_report(content, output_dir):
         f.write(report)
 
 if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='移动端专用抓取器')
+    add_log_arguments(arg_parser)
+    configure_from_args(arg_parser.parse_args())
     scrape_mobile_version()
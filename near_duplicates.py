@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+近似重复页面检测
+对页面文本计算 64 位 SimHash 指纹，汉明距离在阈值内的页面归为同一组；
+同一模板的页面（如多个语言版本、只有少量正文不同的页面）只需完整处理一次
+"""
+
+import hashlib
+from collections import Counter
+
+FINGERPRINT_BITS = 64
+DIGEST_SIZE = FINGERPRINT_BITS // 8
+
+# 字符 n-gram 长度；按字符切分，中文等不以空格分词的文本同样适用
+SHINGLE_SIZE = 4
+
+# 默认相似度阈值：64 位指纹中最多 3 位不同
+DEFAULT_SIMILARITY = 0.95
+
+# 字节值 → 第 bit 位的值，供 bytes.translate 使用
+_BIT_TABLES = [bytes(value >> bit & 1 for value in range(256)) for bit in range(8)]
+
+
+def shingles(text):
+    """规范化空白和大小写后的字符 n-gram 及出现次数"""
+    text = ' '.join(text.lower().split())
+    if len(text) <= SHINGLE_SIZE:
+        return Counter([text]) if text else Counter()
+    return Counter(text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1))
+
+
+def simhash(text):
+    """文本的 64 位 SimHash 指纹
+
+    每个 n-gram 取 8 字节哈希，按出现次数重复后拼接；每个字节位置取出一列，
+    用 translate 把字节映射为某一位的值再计数，逐位统计都在C层完成
+    """
+    features = shingles(text)
+    digests = b''.join(hashlib.blake2b(shingle.encode('utf-8'), digest_size=DIGEST_SIZE).digest() * weight
+                       for shingle, weight in features.items())
+    total = len(digests) // DIGEST_SIZE
+
+    fingerprint = 0
+    for position in range(DIGEST_SIZE):
+        column = digests[position::DIGEST_SIZE]
+        for bit, table in enumerate(_BIT_TABLES):
+            # 该位为 1 的权重超过一半时指纹对应位为 1
+            if column.translate(table).count(1) * 2 > total:
+                fingerprint |= 1 << (position * 8 + bit)
+    return fingerprint
+
+
+def similarity(a, b):
+    """两个指纹的相似度：1 - 汉明距离 / 64"""
+    return 1 - (a ^ b).bit_count() / FINGERPRINT_BITS
+
+
+class NearDuplicateIndex:
+    """近似重复页面索引
+
+    每组的第一个页面是代表页面，之后的页面只与各组代表比较，避免相似关系逐个传递使组不断扩大；
+    指纹分成 (最大距离 + 1) 段建立索引，距离在阈值内的两个指纹至少有一段完全相同，
+    只需比较在某一段上相同的候选
+    """
+
+    def __init__(self, min_similarity=DEFAULT_SIMILARITY):
+        self.min_similarity = min_similarity
+        self.max_distance = int(FINGERPRINT_BITS * (1 - min_similarity))
+        bands = min(self.max_distance + 1, FINGERPRINT_BITS)
+        width, extra = divmod(FINGERPRINT_BITS, bands)
+        self.bands = []
+        start = 0
+        for i in range(bands):
+            size = width + (1 if i < extra else 0)
+            self.bands.append((start, (1 << size) - 1))
+            start += size
+        self.buckets = {}
+        self.canonical = {}
+        self.clusters = {}
+        self.pages_checked = 0
+
+    def keys(self, fingerprint):
+        return [(i, fingerprint >> start & mask) for i, (start, mask) in enumerate(self.bands)]
+
+    def check(self, url, text):
+        """登记一个页面，与已有代表页面近似重复时返回 (代表页面URL, 相似度)，否则返回 None"""
+        self.pages_checked += 1
+        fingerprint = simhash(text)
+        keys = self.keys(fingerprint)
+
+        best = None
+        for key in keys:
+            for candidate in self.buckets.get(key, ()):
+                distance = (fingerprint ^ self.canonical[candidate]).bit_count()
+                if distance <= self.max_distance and (best is None or distance < best[1]):
+                    best = (candidate, distance)
+
+        if best is None:
+            self.canonical[url] = fingerprint
+            for key in keys:
+                self.buckets.setdefault(key, []).append(url)
+            return None
+
+        canonical_url, distance = best
+        score = 1 - distance / FINGERPRINT_BITS
+        self.clusters.setdefault(canonical_url, []).append((url, score))
+        return canonical_url, score
+
+    def duplicate_count(self):
+        return sum(len(members) for members in self.clusters.values())
+
+    def report(self):
+        """报告中的近似重复信息：阈值、检查的页面数和各组成员"""
+        return {
+            'min_similarity': self.min_similarity,
+            'pages_checked': self.pages_checked,
+            'near_duplicates': self.duplicate_count(),
+            'clusters': [
+                {
+                    'canonical': canonical_url,
+                    'duplicates': [{'url': url, 'similarity': round(score, 3)} for url, score in members]
+                }
+                for canonical_url, members in self.clusters.items()
+            ]
+        }
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+单次遍历的页面信息提取
+只遍历一次DOM树，生成不可变的页面信息记录，供HTML、Markdown、预览等输出共用
+"""
+
+from collections import Counter, namedtuple
+from dataclasses import dataclass
+from types import MappingProxyType
+
+from bs4 import CData, NavigableString, Tag
+
+import metrics
+
+Link = namedtuple('Link', ['href', 'text', 'title'])
+Image = namedtuple('Image', ['src', 'alt', 'title'])
+Heading = namedtuple('Heading', ['level', 'text', 'id'])
+TextBlock = namedtuple('TextBlock', ['tag', 'text'])
+
+HEADING_TAGS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+TEXT_BLOCK_TAGS = set(HEADING_TAGS) | {'p', 'div'}
+
+# 与 Tag.get_text() 一致：只统计普通文本和CDATA，不含注释、脚本和样式内容
+TEXT_STRING_TYPES = (NavigableString, CData)
+
+
+@dataclass(frozen=True)
+class PageFacts:
+    """页面信息记录（不可变）"""
+    title: str
+    meta_description: str
+    links: tuple
+    images: tuple
+    stylesheets: tuple
+    scripts: tuple
+    headings: tuple
+    paragraphs: tuple
+    text_blocks: tuple
+    text: str
+    tag_counts: MappingProxyType
+
+    @property
+    def counts(self):
+        """常用统计"""
+        return {
+            'images': self.tag_counts.get('img', 0),
+            'links': len(self.links),
+            'paragraphs': self.tag_counts.get('p', 0),
+            'headings': len(self.headings),
+            'stylesheets': len(self.stylesheets),
+            'scripts': len(self.scripts)
+        }
+
+
+def has_rel(tag, value):
+    """判断 link 标签的 rel 是否包含指定值"""
+    rel = tag.get('rel') or []
+    if isinstance(rel, str):
+        rel = rel.split()
+    return value in rel
+
+
+# lexbor 中这些元素的文本不计入 get_text()，与 bs4 的 Script/Stylesheet/TemplateString 一致
+LEXBOR_RAW_TEXT_TAGS = {'script', 'style', 'template'}
+
+
+def soup_children(tag):
+    """BeautifulSoup 节点的子节点：文本返回字符串，元素返回 (名称, 属性, 节点)"""
+    for child in tag.children:
+        if isinstance(child, Tag):
+            yield child.name, child.attrs, child
+        elif type(child) in TEXT_STRING_TYPES:
+            yield str(child)
+
+
+def lexbor_children(node):
+    """selectolax (lexbor) 节点的子节点，格式同 soup_children"""
+    raw_text = node.tag in LEXBOR_RAW_TEXT_TAGS
+    for child in node.iter(include_text=True):
+        name = child.tag
+        if name == '-text':
+            if not raw_text:
+                yield child.text(deep=False)
+        elif not name.startswith('-'):
+            # 无值属性在 lexbor 中为 None，bs4 中为空字符串
+            attrs = {key: value or '' for key, value in child.attributes.items()}
+            yield name, attrs, child
+
+
+class _Frame:
+    __slots__ = ('children', 'parts', 'slot')
+
+    def __init__(self, children, slot=None):
+        self.children = children
+        self.parts = []
+        self.slot = slot
+
+
+def extract_page_facts(soup):
+    """遍历一次 BeautifulSoup 树，提取页面信息
+
+    元素文本在子树遍历结束时由子节点文本拼接而成，
+    不再对每个标题、段落、链接单独调用 get_text() 重新遍历子树
+    """
+    with metrics.timer('extract'):
+        return _extract(soup_children(soup), soup_children)
+
+
+def extract_lexbor_facts(tree):
+    """遍历一次 selectolax (lexbor) 树，提取页面信息
+
+    与 extract_page_facts 产出相同结构的记录，不需要构建 BeautifulSoup 树
+    """
+    with metrics.timer('extract'):
+        return _extract(lexbor_root_children(tree), lexbor_children)
+
+
+def lexbor_root_children(tree):
+    """selectolax (lexbor) 文档的顶层子节点，格式同 soup_children"""
+    root = tree.root
+    if root is not None:
+        yield from lexbor_children(root.parent)
+
+
+def _extract(top_level, children_of):
+    meta_description = ''
+    stylesheets = []
+    scripts = []
+    tag_counts = Counter()
+
+    # 需要文本的元素先按文档顺序占位，子树结束时填入
+    titles = []
+    links = []
+    images = []
+    headings = []
+    paragraphs = []
+    text_blocks = []
+    # 整个文档的文本（与 get_text() 相同），由最外层遍历结束时拼接得到
+    document_text = ''
+
+    frames = [_Frame(top_level)]
+    while frames:
+        frame = frames[-1]
+        child = next(frame.children, None)
+
+        if child is None:
+            frames.pop()
+            text = ''.join(frame.parts)
+            if frame.slot is not None:
+                frame.slot(text)
+            if frames:
+                frames[-1].parts.append(text)
+            else:
+                document_text = text
+            continue
+
+        if isinstance(child, str):
+            frame.parts.append(child)
+            continue
+
+        name, attrs, node = child
+        tag_counts[name] += 1
+        slot = None
+
+        if name == 'a':
+            if 'href' in attrs:
+                slot = _text_slot(links, lambda text, attrs=attrs: Link(attrs['href'], text.strip(), attrs.get('title', '')))
+        elif name == 'img':
+            if 'src' in attrs:
+                images.append(Image(attrs['src'], attrs.get('alt', ''), attrs.get('title', '')))
+        elif name == 'link':
+            if has_rel(attrs, 'stylesheet') and attrs.get('href'):
+                stylesheets.append(attrs['href'])
+        elif name == 'script':
+            if 'src' in attrs:
+                scripts.append(attrs['src'])
+        elif name == 'meta':
+            if attrs.get('name') == 'description':
+                meta_description = attrs.get('content', '')
+        elif name == 'title':
+            if not titles:
+                slot = _text_slot(titles, lambda text: text.strip())
+        elif name in TEXT_BLOCK_TAGS:
+            slot = _block_slot(name, attrs, text_blocks, headings, paragraphs)
+
+        frames.append(_Frame(children_of(node), slot))
+
+    return PageFacts(
+        title=titles[0] if titles else None,
+        meta_description=meta_description,
+        links=tuple(_filled(links)),
+        images=tuple(images),
+        stylesheets=tuple(stylesheets),
+        scripts=tuple(scripts),
+        headings=tuple(_filled(headings)),
+        paragraphs=tuple(text for text in _filled(paragraphs) if text),
+        text_blocks=tuple(block for block in _filled(text_blocks) if block.text),
+        text=document_text,
+        tag_counts=MappingProxyType(dict(tag_counts))
+    )
+
+
+def _text_slot(target, build):
+    """在列表中占位，返回子树结束时填入结果的回调"""
+    index = len(target)
+    target.append(None)
+
+    def fill(text):
+        target[index] = build(text)
+    return fill
+
+
+def _block_slot(name, attrs, text_blocks, headings, paragraphs):
+    """标题、段落和 div 的文本回调"""
+    fills = [_text_slot(text_blocks, lambda text: TextBlock(name, text.strip()))]
+    if name in HEADING_TAGS:
+        level = HEADING_TAGS[name]
+        fills.append(_text_slot(headings, lambda text: Heading(level, text.strip(), attrs.get('id', ''))))
+    elif name == 'p':
+        fills.append(_text_slot(paragraphs, lambda text: text.strip()))
+
+    def fill(text):
+        for callback in fills:
+            callback(text)
+    return fill
+
+
+def _filled(items):
+    return [item for item in items if item is not None]
+
+
+def iter_url_attributes(soup):
+    """遍历一次DOM树，按文档顺序产出需要改写URL的属性
+
+    产出 (元素, 属性名, 类型)，类型为 image / stylesheet / script / page
+    """
+    for tag in soup.find_all(True):
+        name = tag.name
+        if name == 'img':
+            if tag.get('src'):
+                yield tag, 'src', 'image'
+        elif name == 'link':
+            if has_rel(tag, 'stylesheet') and tag.get('href'):
+                yield tag, 'href', 'stylesheet'
+        elif name == 'script':
+            if tag.get('src'):
+                yield tag, 'src', 'script'
+        elif name == 'a':
+            href = tag.get('href')
+            if href and not href.startswith('#') and not href.startswith('mailto:'):
+                yield tag, 'href', 'page'
@@ -3,11 +3,14 @@
 关于页面和隐私页面内容抓取器
 """
 
-import requests
+import argparse
+import os
+import shutil
 from pathlib import Path
-from bs4 import BeautifulSoup
+from device_matrix import DEVICE_PROFILES, fetch_device_matrix
+from html_parser import make_soup
+from scrape_log import add_log_arguments, configure_from_args, log
 import json
-import time
 
 def scrape_pages():
     """抓取关于页面和隐私页面的完整内容"""
@@ -17,126 +20,53 @@ def scrape_pages():
         'privacy': 'https://68tt.co/cn/privacy.html'
     }
     
-    # 桌面端和移动端User-Agent
-    user_agents = {
-        'desktop': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'mobile': 'Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Mobile/15E148 Safari/604.1'
-    }
-    
     # 创建输出目录
     output_dir = Path("pages_analysis")
     output_dir.mkdir(exist_ok=True)
     
+    # 所有 (页面, 设备) 组合一次性并发获取
+    matrix = fetch_device_matrix([(url, device) for url in pages.values() for device in DEVICE_PROFILES])
+    
     results = {}
     
     for page_name, url in pages.items():
-        print(f"\n🔍 抓取 {page_name} 页面: {url}")
+        log.info(f"🔍 抓取 {page_name} 页面: {url}")
         results[page_name] = {}
         
-        for device, ua in user_agents.items():
-            print(f"  📱 {device} 版本...")
+        for device in DEVICE_PROFILES:
+            log.debug(f"  📱 {device} 版本...")
+            result = matrix[(url, device)]
+            
+            if 'content' not in result:
+                if result['status']:
+                    log.warning(f"⚠️  {page_name} {device} 版本: HTTP {result['status']}")
+                else:
+                    log.warning(f"⚠️  {page_name} {device} 版本失败: {result['error']}")
+                    results[page_name][device] = {'error': result['error']}
+                continue
+            
+            # 与其他设备内容完全相同时复用其分析结果，原始HTML链接到该设备的文件，不重复写入
+            raw_path = output_dir / f"{page_name}_{device}_raw.html"
+            if result['duplicate_of']:
+                log.debug(f"    ♻️  与 {result['duplicate_of']} 版本内容相同，跳过分析")
+                results[page_name][device] = results[page_name][result['duplicate_of']]
+                link_raw_html(output_dir / f"{page_name}_{result['duplicate_of']}_raw.html", raw_path)
+                continue
             
             try:
-                headers = {'User-Agent': ua}
-                response = requests.get(url, headers=headers, timeout=30)
-                
-                if response.status_code != 200:
-                    print(f"    ❌ HTTP {response.status_code}")
-                    continue
-                
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
                 # 保存原始HTML
-                with open(output_dir / f"{page_name}_{device}_raw.html", 'w', encoding='utf-8') as f:
-                    f.write(response.text)
-                
-                # 分析页面结构
-                page_data = {
-                    'title': soup.title.string if soup.title else '',
-                    'body_class': soup.body.get('class', []) if soup.body else [],
-                    'main_content': [],
-                    'images': [],
-                    'text_sections': [],
-                    'special_elements': []
-                }
-                
-                # 查找主要内容区域
-                main_wrapper = soup.find('div', class_='main-wrapper')
-                if main_wrapper:
-                    # 查找内容区域
-                    content_areas = main_wrapper.find_all(['div', 'section', 'article'], 
-                                                        class_=lambda x: x and any(
-                                                            keyword in ' '.join(x).lower() 
-                                                            for keyword in ['content', 'inner', 'main', 'about', 'privacy']
-                                                        ))
-                    
-                    for area in content_areas:
-                        area_info = {
-                            'tag': area.name,
-                            'classes': area.get('class', []),
-                            'id': area.get('id', ''),
-                            'text_content': area.get_text(strip=True)[:500],
-                            'html_snippet': str(area)[:1000],
-                            'child_count': len(area.find_all()),
-                            'images': []
-                        }
-                        
-                        # 查找图片
-                        images = area.find_all('img')
-                        for img in images:
-                            img_info = {
-                                'src': img.get('src', ''),
-                                'alt': img.get('alt', ''),
-                                'class': img.get('class', [])
-                            }
-                            area_info['images'].append(img_info)
-                            page_data['images'].append(img_info)
-                        
-                        page_data['main_content'].append(area_info)
-                
-                # 查找所有文本段落
-                text_elements = soup.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'div'], 
-                                            string=lambda text: text and len(text.strip()) > 20)
-                
-                for elem in text_elements[:10]:  # 限制前10个
-                    text_info = {
-                        'tag': elem.name,
-                        'class': elem.get('class', []),
-                        'text': elem.get_text(strip=True)[:200],
-                        'parent_class': elem.parent.get('class', []) if elem.parent else []
-                    }
-                    page_data['text_sections'].append(text_info)
-                
-                # 查找特殊元素
-                special_selectors = [
-                    'div[class*="about"]',
-                    'div[class*="privacy"]', 
-                    'div[class*="policy"]',
-                    'div[class*="content"]',
-                    'div[class*="text"]',
-                    'div[class*="info"]'
-                ]
-                
-                for selector in special_selectors:
-                    elements = soup.select(selector)
-                    for elem in elements:
-                        special_info = {
-                            'selector': selector,
-                            'tag': elem.name,
-                            'classes': elem.get('class', []),
-                            'id': elem.get('id', ''),
-                            'text_preview': elem.get_text(strip=True)[:100]
-                        }
-                        page_data['special_elements'].append(special_info)
+                with open(raw_path, 'w', encoding='utf-8') as f:
+                    f.write(result['content'])
                 
+                page_data = analyze_page(result['content'])
                 results[page_name][device] = page_data
                 
-                print(f"    ✅ 成功: {len(page_data['main_content'])} 个内容区域")
-                print(f"       图片: {len(page_data['images'])} 个")
-                print(f"       文本段落: {len(page_data['text_sections'])} 个")
+                log.debug(f"    ✅ 成功: {len(page_data['main_content'])} 个内容区域")
+                log.debug(f"       图片: {len(page_data['images'])} 个")
+                log.debug(f"       文本段落: {len(page_data['text_sections'])} 个")
                 
             except Exception as e:
-                print(f"    ❌ 失败: {e}")
+                log.error(f"❌ {page_name} {device} 版本分析失败: {e}")
                 results[page_name][device] = {'error': str(e)}
     
     # 保存分析结果
@@ -146,10 +76,105 @@ def scrape_pages():
     # 生成报告
     generate_pages_report(results, output_dir)
     
-    print(f"\n📊 页面分析完成!")
-    print(f"📁 输出目录: {output_dir}")
-    print(f"📋 分析结果: pages_analysis.json")
-    print(f"📝 页面报告: pages_report.md")
+    log.info(f"📊 页面分析完成!")
+    log.info(f"📁 输出目录: {output_dir}")
+    log.info(f"📋 分析结果: pages_analysis.json")
+    log.info(f"📝 页面报告: pages_report.md")
+
+def link_raw_html(source, path):
+    """让 path 以硬链接指向内容相同的原始HTML（不支持时复制）；替换上次运行留下的旧文件"""
+    path.unlink(missing_ok=True)
+    if not source.exists():
+        return
+    try:
+        os.link(source, path)
+    except OSError:
+        shutil.copyfile(source, path)
+
+def analyze_page(html):
+    """分析页面结构"""
+    soup = make_soup(html)
+    
+    # 分析页面结构
+    page_data = {
+        'title': soup.title.string if soup.title else '',
+        'body_class': soup.body.get('class', []) if soup.body else [],
+        'main_content': [],
+        'images': [],
+        'text_sections': [],
+        'special_elements': []
+    }
+    
+    # 查找主要内容区域
+    main_wrapper = soup.find('div', class_='main-wrapper')
+    if main_wrapper:
+        # 查找内容区域
+        content_areas = main_wrapper.find_all(['div', 'section', 'article'], 
+                                            class_=lambda x: x and any(
+                                                keyword in ' '.join(x).lower() 
+                                                for keyword in ['content', 'inner', 'main', 'about', 'privacy']
+                                            ))
+        
+        for area in content_areas:
+            area_info = {
+                'tag': area.name,
+                'classes': area.get('class', []),
+                'id': area.get('id', ''),
+                'text_content': area.get_text(strip=True)[:500],
+                'html_snippet': str(area)[:1000],
+                'child_count': len(area.find_all()),
+                'images': []
+            }
+            
+            # 查找图片
+            images = area.find_all('img')
+            for img in images:
+                img_info = {
+                    'src': img.get('src', ''),
+                    'alt': img.get('alt', ''),
+                    'class': img.get('class', [])
+                }
+                area_info['images'].append(img_info)
+                page_data['images'].append(img_info)
+            
+            page_data['main_content'].append(area_info)
+    
+    # 查找所有文本段落
+    text_elements = soup.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'div'], 
+                                string=lambda text: text and len(text.strip()) > 20)
+    
+    for elem in text_elements[:10]:  # 限制前10个
+        text_info = {
+            'tag': elem.name,
+            'class': elem.get('class', []),
+            'text': elem.get_text(strip=True)[:200],
+            'parent_class': elem.parent.get('class', []) if elem.parent else []
+        }
+        page_data['text_sections'].append(text_info)
+    
+    # 查找特殊元素
+    special_selectors = [
+        'div[class*="about"]',
+        'div[class*="privacy"]', 
+        'div[class*="policy"]',
+        'div[class*="content"]',
+        'div[class*="text"]',
+        'div[class*="info"]'
+    ]
+    
+    for selector in special_selectors:
+        elements = soup.select(selector)
+        for elem in elements:
+            special_info = {
+                'selector': selector,
+                'tag': elem.name,
+                'classes': elem.get('class', []),
+                'id': elem.get('id', ''),
+                'text_preview': elem.get_text(strip=True)[:100]
+            }
+            page_data['special_elements'].append(special_info)
+    
+    return page_data
 
 def generate_pages_report(results, output_dir):
     """生成页面分析报告"""
@@ -244,4 +269,7 @@ def generate_pages_report(results, output_dir):
         f.write(report)
 
 if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='关于页面和隐私页面内容抓取器')
+    add_log_arguments(arg_parser)
+    configure_from_args(arg_parser.parse_args())
     scrape_pages()
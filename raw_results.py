@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Firecrawl 原始结果的流式读写
+以 JSON Lines 逐页写入并立即刷新，读取时逐行解析，内存占用只与单个页面大小有关
+"""
+
+import json
+from pathlib import Path
+
+RAW_RESULTS_FILENAME = 'firecrawl_raw_results.jsonl'
+
+PAGE = 'page'
+STATUS = 'status'
+
+# 任务状态中包含页面列表的字段，写入状态行时去掉
+PAGE_LIST_FIELDS = ('data', 'partial_data')
+
+
+class RawResultsWriter:
+    """逐页写入原始结果
+
+    每行一条记录: {"kind": "page", "data": 页面} 或 {"kind": "status", "data": 任务状态（不含页面列表）}
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.file = open(self.path, 'w', encoding='utf-8')
+        self.pages = 0
+
+    def write(self, kind, data):
+        self.file.write(json.dumps({'kind': kind, 'data': data}, ensure_ascii=False, separators=(',', ':')))
+        self.file.write('\n')
+        self.file.flush()
+
+    def write_page(self, page_data):
+        """写入一个页面并刷新到磁盘"""
+        self.write(PAGE, page_data)
+        self.pages += 1
+
+    def write_status(self, status_data):
+        """写入任务状态（页面列表已逐页写入，这里不再重复）"""
+        self.write(STATUS, {key: value for key, value in status_data.items() if key not in PAGE_LIST_FIELDS})
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def iter_raw_results(path):
+    """逐行读取原始结果，产出 (kind, data)
+
+    兼容旧版整体写入的 firecrawl_raw_results.json（需要一次性加载）
+    """
+    path = Path(path)
+    if path.suffix == '.json':
+        with open(path, 'r', encoding='utf-8') as f:
+            results_data = json.load(f)
+        for page_data in results_data.get('data', []):
+            yield PAGE, page_data
+        yield STATUS, {key: value for key, value in results_data.items() if key not in PAGE_LIST_FIELDS}
+        return
+
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # 中断时可能留下写了一半的最后一行
+                continue
+            yield record['kind'], record['data']
+
+
+def iter_raw_pages(path):
+    """逐个读取原始结果中的页面"""
+    for kind, data in iter_raw_results(path):
+        if kind == PAGE:
+            yield data
+
+
+def read_raw_status(path):
+    """读取最后一条任务状态，没有时返回空字典"""
+    status_data = {}
+    for kind, data in iter_raw_results(path):
+        if kind == STATUS:
+            status_data = data
+    return status_data
@@ -32,7 +32,7 @@ echo "选择抓取模式:"
 echo "1) Firecrawl MCP 抓取器 (推荐) - 专业级网站抓取"
 echo "2) 基础抓取器 - 完整网站克隆"
 echo "3) 自定义 MCP 抓取器 - 结构化内容提取"
-echo "4) 运行所有模式"
+echo "4) 统一流水线 - 每个页面只抓取一次，同时生成镜像、Markdown 和结构化结果"
 echo ""
 
 read -p "请选择 (1-4): " choice
@@ -51,14 +51,8 @@ case $choice in
         python3 mcp_scraper.py
         ;;
     4)
-        echo "🔥 启动 Firecrawl MCP 抓取器..."
-        python3 firecrawl_scraper.py
-        echo ""
-        echo "🚀 启动基础抓取器..."
-        python3 site_scraper.py
-        echo ""
-        echo "🚀 启动自定义 MCP 抓取器..."
-        python3 mcp_scraper.py
+        echo "🚀 启动统一抓取流水线..."
+        python3 scrape_pipeline.py
         ;;
     *)
         echo "❌ 无效选择"
@@ -72,3 +66,4 @@ echo "📁 检查输出目录:"
 echo "   - firecrawl_output/ (Firecrawl MCP 结果)"
 echo "   - scraped_68tt/ (基础抓取结果)"
 echo "   - mcp_scraped/ (自定义 MCP 抓取结果)"
+echo "   - comprehensive_output/ (流水线 Markdown 结果)"
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+结构化日志
+所有抓取脚本共用的分级、缓冲输出：默认文本模式保留原有的表情前缀消息，
+逐条目的明细降为 debug 级别，热循环用单行进度条代替；支持安静模式和 JSON Lines 模式
+"""
+
+import atexit
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+LOGGER_NAME = 'scraper'
+LOG_FORMATS = ('text', 'json')
+
+# 缓冲的行数和最长滞留时间；warning 及以上级别立即输出
+BUFFER_LINES = 64
+FLUSH_INTERVAL = 0.2
+
+# 进度条刷新间隔：文本模式（秒）和 JSON 模式（秒）
+PROGRESS_INTERVAL = 0.1
+JSON_PROGRESS_INTERVAL = 1.0
+
+log = logging.getLogger(LOGGER_NAME)
+
+_settings = {'format': 'text', 'quiet': False}
+
+
+class JSONFormatter(logging.Formatter):
+    """每条记录一行 JSON: {"time", "level", "msg", ...附加字段}"""
+
+    def format(self, record):
+        entry = {
+            'time': round(record.created, 3),
+            'level': record.levelname.lower(),
+            'msg': record.getMessage()
+        }
+        entry.update(getattr(record, 'data', None) or {})
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class ConsoleHandler(logging.Handler):
+    """缓冲写入标准输出
+
+    每次输出时查找当前的 sys.stdout（兼容 redirect_stdout），
+    文本模式下输出前先擦除进度条，输出后重绘；
+    缓冲中有内容时由后台定时器在 FLUSH_INTERVAL 后输出，之后没有新日志也不会滞留
+    """
+
+    def __init__(self, formatter):
+        super().__init__()
+        self.setFormatter(formatter)
+        self.pending = []
+        self.last_flush = time.monotonic()
+        self.progress = None
+        self.timer = None
+
+    def emit(self, record):
+        try:
+            line = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        with self.lock:
+            self.pending.append(line + '\n')
+            if (record.levelno >= logging.WARNING or len(self.pending) >= BUFFER_LINES
+                    or time.monotonic() - self.last_flush >= FLUSH_INTERVAL):
+                try:
+                    self._flush()
+                except Exception:
+                    self.pending.clear()
+                    self.handleError(record)
+            elif self.timer is None:
+                self.timer = threading.Timer(FLUSH_INTERVAL, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def _flush(self):
+        if self.timer:
+            self.timer.cancel()
+            self.timer = None
+        self.last_flush = time.monotonic()
+        if self.pending:
+            if self.progress:
+                self.progress.clear()
+            sys.stdout.write(''.join(self.pending))
+            self.pending.clear()
+            sys.stdout.flush()
+            if self.progress:
+                self.progress.draw()
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+
+_handler = None
+
+
+def configure_logging(log_format=None, quiet=False, verbose=False):
+    """配置日志输出
+
+    log_format: text（默认）或 json；未指定时读取 SCRAPER_LOG_FORMAT 环境变量
+    quiet: 只输出警告和错误，不显示进度条
+    verbose: 输出逐条目的 debug 明细
+    """
+    global _handler
+    log_format = log_format or os.getenv('SCRAPER_LOG_FORMAT') or 'text'
+    if log_format not in LOG_FORMATS:
+        raise ValueError(f"未知的日志格式: {log_format}")
+    quiet = quiet or os.getenv('SCRAPER_LOG_QUIET') == '1'
+
+    if _handler:
+        _handler.flush()
+        log.removeHandler(_handler)
+    formatter = JSONFormatter() if log_format == 'json' else logging.Formatter('%(message)s')
+    _handler = ConsoleHandler(formatter)
+    log.addHandler(_handler)
+    log.propagate = False
+    log.setLevel(logging.WARNING if quiet else logging.DEBUG if verbose else logging.INFO)
+
+    _settings['format'] = log_format
+    _settings['quiet'] = quiet
+
+
+def flush():
+    """立即输出缓冲中的日志；直接 print/input 或长时间等待之前调用"""
+    if _handler:
+        _handler.flush()
+
+
+# 进程退出时输出缓冲中剩余的日志
+atexit.register(flush)
+
+
+def add_log_arguments(arg_parser):
+    """为命令行添加日志选项"""
+    group = arg_parser.add_argument_group('日志')
+    group.add_argument('-q', '--quiet', action='store_true', help='只输出警告和错误')
+    group.add_argument('-v', '--verbose', action='store_true', help='输出每个页面和资源的明细')
+    group.add_argument('--log-format', choices=LOG_FORMATS, default=None,
+                       help='输出格式（默认 text，或 SCRAPER_LOG_FORMAT 环境变量）')
+    return arg_parser
+
+
+def configure_from_args(args):
+    """按 add_log_arguments 添加的选项配置日志"""
+    configure_logging(args.log_format, quiet=args.quiet, verbose=args.verbose)
+
+
+class Progress:
+    """单行进度
+
+    文本模式且标准错误为终端时显示一行原地刷新的进度条（最多每 0.1 秒重绘一次）；
+    JSON 模式最多每秒输出一条 progress 记录；安静模式不输出。total 可在运行中更新
+    """
+
+    def __init__(self, label, total=None):
+        self.label = label
+        self.total = total
+        self.done = 0
+        self.started = time.monotonic()
+        self.last_update = 0.0
+        self.mode = 'off' if _settings['quiet'] else _settings['format']
+        if self.mode == 'text' and not sys.stderr.isatty():
+            self.mode = 'off'
+        self.visible = False
+        if self.mode == 'text' and _handler:
+            _handler.flush()
+            _handler.progress = self
+
+    def advance(self, count=1):
+        self.done += count
+        now = time.monotonic()
+        if self.mode == 'text' and now - self.last_update >= PROGRESS_INTERVAL:
+            self.last_update = now
+            if _handler:
+                _handler.flush()
+            self.draw()
+        elif self.mode == 'json' and now - self.last_update >= JSON_PROGRESS_INTERVAL:
+            self.last_update = now
+            self.emit_json()
+
+    def render(self):
+        elapsed = time.monotonic() - self.started
+        rate = self.done / elapsed if elapsed else 0.0
+        if self.total:
+            filled = int(24 * min(self.done / self.total, 1))
+            bar = '█' * filled + '░' * (24 - filled)
+            return f"{self.label} {bar} {self.done}/{self.total} ({rate:.1f}/s)"
+        return f"{self.label} {self.done} ({rate:.1f}/s)"
+
+    def draw(self):
+        if self.mode == 'text':
+            sys.stderr.write('\r\033[K' + self.render())
+            sys.stderr.flush()
+            self.visible = True
+
+    def clear(self):
+        if self.visible:
+            sys.stderr.write('\r\033[K')
+            sys.stderr.flush()
+            self.visible = False
+
+    def emit_json(self):
+        log.info(self.label, extra={'data': {'event': 'progress', 'done': self.done, 'total': self.total}})
+
+    def close(self):
+        """结束进度：文本模式擦除进度条，JSON 模式输出最终计数"""
+        if self.mode == 'text':
+            self.clear()
+            if _handler and _handler.progress is self:
+                _handler.progress = None
+        elif self.mode == 'json':
+            self.emit_json()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def progress(label, total=None):
+    """创建单行进度，配合 with 使用"""
+    return Progress(label, total)
+
+
+# 导入即按环境变量完成默认配置，脚本可再调用 configure_logging 覆盖
+configure_logging()
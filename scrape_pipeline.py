@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+统一抓取流水线
+每个页面只获取和解析一次，结果分发给镜像、Markdown、结构化 JSON 和资源各阶段；
+所有阶段共享一个抓取引擎和资源仓库，同一资源在一次运行中只下载一次
+"""
+
+import argparse
+import time
+from urllib.parse import urljoin
+
+from asset_store import AssetStore
+from comprehensive_scraper import ComprehensiveScraper
+from fetch_engine import BlockingFetchEngine
+from html_parser import add_parser_argument, make_soup
+from http_cache import HTTPCache
+from mcp_scraper import MCPScraper
+from near_duplicates import DEFAULT_SIMILARITY
+from page_facts import extract_page_facts
+from scrape_log import add_log_arguments, configure_from_args, log
+from site_scraper import WebsiteScraper
+
+STAGES = ('mirror', 'markdown', 'structured', 'assets')
+
+
+class ScrapePipeline:
+    """抓取流水线
+
+    mirror: 站点镜像（scraped_68tt/）
+    markdown: Markdown、图片和页面预览（comprehensive_output/）
+    structured: 结构化 JSON 和原始HTML（mcp_scraped/）
+    assets: 结构化阶段的静态资源包和耗时统计（mcp_scraped/assets/）
+
+    dedup_similarity: 页面文本与已处理页面的相似度不低于该值时视为近似重复，
+    跳过 Markdown、结构化和资源阶段（镜像仍保存，使站内链接有效）；0 表示关闭
+    """
+
+    def __init__(self, start_url="https://68tt.co/cn/", stages=STAGES, parser=None,
+                 max_depth=3, max_pages=200, rate=5.0, per_host=4, dedup_similarity=DEFAULT_SIMILARITY):
+        self.start_url = start_url
+        self.stages = set(stages)
+        self.parser = parser
+
+        # 所有阶段共享资源仓库和抓取引擎；资源下载按URL合并，只请求一次
+        self.asset_store = AssetStore()
+        self.fetcher = BlockingFetchEngine(rate=rate, per_host=per_host,
+                                           cache=HTTPCache(self.asset_store), share_downloads=True)
+
+        # 镜像抓取器负责广度优先抓取队列；未启用镜像阶段时只用它发现页面
+        self.website = WebsiteScraper(start_url, "scraped_68tt", fetcher=self.fetcher,
+                                      asset_store=self.asset_store, parser=parser,
+                                      max_depth=max_depth, max_pages=max_pages, per_host=per_host,
+                                      dedup_similarity=dedup_similarity)
+        self.comprehensive = None
+        if 'markdown' in self.stages:
+            self.comprehensive = ComprehensiveScraper(fetcher=self.fetcher, asset_store=self.asset_store,
+                                                      parser=parser)
+        self.mcp = None
+        if self.stages & {'structured', 'assets'}:
+            self.mcp = MCPScraper(engine=self.fetcher.engine, asset_store=self.asset_store, parser=parser)
+            self.mcp.base_url = start_url
+
+        self.structured_pages = {}
+        self.pages_handled = 0
+        self.total_images = 0
+
+    def handle_page(self, url, result):
+        """把一个已获取的页面分发给各阶段，返回页面上的站内链接，失败时返回 None"""
+        if 'content' not in result:
+            log.error(f"❌ 页面获取失败 {url}: {result['error']}", extra={'data': {'url': url}})
+            self.website.failed_urls.add(url)
+            return None
+
+        self.pages_handled += 1
+
+        # 只解析一次：先做只读的提取，镜像阶段最后在同一棵树上改写链接
+        soup = make_soup(result['content'], self.parser)
+        facts = extract_page_facts(soup)
+
+        # 与已处理页面近似重复时只保留镜像，不再生成 Markdown、结构化内容和资源
+        duplicate = self.website.check_duplicate(url, facts.text)
+        if self.mcp and not duplicate:
+            self.structured_pages[url] = self.mcp.save_page(result, save='structured' in self.stages, facts=facts)
+        if self.comprehensive and not duplicate:
+            self.total_images += self.comprehensive.process_page(self.pages_handled, len(self.website.frontier.seen),
+                                                                 url, result, facts)
+        if 'mirror' in self.stages:
+            return self.website.scrape_page(url, result, soup)
+
+        links = []
+        for link in facts.links:
+            if link.href.startswith('#') or link.href.startswith('mailto:'):
+                continue
+            page_url = urljoin(url, link.href)
+            if self.website.is_same_domain(page_url):
+                links.append(page_url)
+        return links
+
+    def run(self):
+        """运行流水线并生成各阶段报告"""
+        log.info("🔧 68tt.co 统一抓取流水线")
+        log.info("=" * 50)
+        log.info(f"🧩 阶段: {', '.join(stage for stage in STAGES if stage in self.stages)}")
+
+        started = time.perf_counter()
+        try:
+            if self.mcp:
+                self.fetcher.run(self.mcp.initialize())
+            pages = self.website.crawl(self.handle_page)
+
+            assets_data = {}
+            if 'assets' in self.stages:
+                assets_data = self.fetcher.run(self.mcp.download_assets(self.structured_pages))
+
+            near_duplicates = self.website.duplicates.report() if self.website.duplicates else None
+            if 'mirror' in self.stages:
+                self.website.generate_report()
+            if self.comprehensive:
+                self.comprehensive.generate_final_report(self.total_images, near_duplicates)
+            if self.mcp:
+                self.fetcher.run(self.mcp.generate_mcp_report(self.structured_pages, assets_data, near_duplicates))
+        finally:
+            self.close()
+
+        cache_stats = self.fetcher.engine.cache.stats()
+        log.info(f"✅ 流水线完成: {pages} 个页面, 耗时 {time.perf_counter() - started:.1f} 秒")
+        log.info(f"🌐 网络: {cache_stats['misses']} 次完整下载, {cache_stats['hits']} 次 304 复用")
+        if self.website.duplicates:
+            log.info(f"🪞 近似重复: {self.website.duplicates.duplicate_count()} 个页面跳过后续阶段, "
+                     f"{len(self.website.duplicates.clusters)} 组")
+
+    def close(self):
+        """关闭各阶段的日志和共享抓取引擎"""
+        self.website.close()
+        if self.comprehensive:
+            self.comprehensive.close()
+        if self.mcp:
+            self.fetcher.run(self.mcp.close())
+        self.fetcher.close()
+
+
+def main():
+    """主函数"""
+    arg_parser = argparse.ArgumentParser(description='68tt.co 统一抓取流水线')
+    arg_parser.add_argument('start_url', nargs='?', default="https://68tt.co/cn/")
+    arg_parser.add_argument('--stages', default=','.join(STAGES),
+                            help=f"逗号分隔的阶段（可选: {', '.join(STAGES)}）")
+    arg_parser.add_argument('--max-depth', type=int, default=3, help='最大抓取深度（起始页为 0）')
+    arg_parser.add_argument('--max-pages', type=int, default=200, help='最多抓取的页面数')
+    arg_parser.add_argument('--dedup-similarity', type=float, default=DEFAULT_SIMILARITY,
+                            help=f'近似重复页面的文本相似度阈值（默认 {DEFAULT_SIMILARITY}，0 表示关闭）；'
+                                 f'近似重复的页面只保存镜像，跳过 Markdown、结构化和资源阶段')
+    add_parser_argument(arg_parser)
+    add_log_arguments(arg_parser)
+    args = arg_parser.parse_args()
+    configure_from_args(args)
+
+    stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        arg_parser.error(f"未知的阶段: {', '.join(sorted(unknown))}")
+
+    pipeline = ScrapePipeline(args.start_url, stages, parser=args.parser,
+                              max_depth=args.max_depth, max_pages=args.max_pages,
+                              dedup_similarity=args.dedup_similarity)
+    pipeline.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+截图保存
+把 Firecrawl 返回的 base64 截图分块解码写入资源仓库并链接到截图目录，
+报告和原始结果中只保留路径、摘要和尺寸，不再内联图片数据
+"""
+
+import base64
+import os
+import struct
+from pathlib import Path
+
+from asset_store import CHUNK_SIZE
+
+# 每次解码的 base64 字符数（4 的倍数）
+DECODE_CHUNK = CHUNK_SIZE // 3 * 4
+
+# 读取图片尺寸时最多读取的文件头字节数
+HEADER_SIZE = 64 * 1024
+
+WHITESPACE = str.maketrans('', '', ' \t\r\n')
+
+
+def image_info(header):
+    """根据文件头识别图片格式和尺寸，返回 (格式, 宽, 高)，无法识别时尺寸为 None"""
+    if header.startswith(b'\x89PNG\r\n\x1a\n') and len(header) >= 24:
+        width, height = struct.unpack('>II', header[16:24])
+        return 'png', width, height
+    if header[:6] in (b'GIF87a', b'GIF89a') and len(header) >= 10:
+        width, height = struct.unpack('<HH', header[6:10])
+        return 'gif', width, height
+    if header.startswith(b'\xff\xd8'):
+        return ('jpeg',) + _jpeg_size(header)
+    if header.startswith(b'RIFF') and header[8:12] == b'WEBP':
+        return ('webp',) + _webp_size(header)
+    return None, None, None
+
+
+def _jpeg_size(header):
+    """扫描 JPEG 段标记，从 SOF 段读取尺寸"""
+    pos = 2
+    while pos + 9 <= len(header):
+        if header[pos] != 0xFF:
+            pos += 1
+            continue
+        marker = header[pos + 1]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7 or marker == 0xFF:
+            pos += 1 if marker == 0xFF else 2
+            continue
+        length = struct.unpack('>H', header[pos + 2:pos + 4])[0]
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack('>HH', header[pos + 5:pos + 9])
+            return width, height
+        pos += 2 + length
+    return None, None
+
+
+def _webp_size(header):
+    chunk = header[12:16]
+    if chunk == b'VP8X' and len(header) >= 30:
+        width = int.from_bytes(header[24:27], 'little') + 1
+        height = int.from_bytes(header[27:30], 'little') + 1
+        return width, height
+    if chunk == b'VP8 ' and len(header) >= 30:
+        width, height = struct.unpack('<HH', header[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b'VP8L' and len(header) >= 25:
+        bits = int.from_bytes(header[21:25], 'little')
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    return None, None
+
+
+class ScreenshotSink:
+    """截图写入器
+
+    screenshots_dir: 截图链接到的目录
+    asset_store: 保存截图内容的资源仓库（相同截图只保存一份）
+    fetcher: 可选的 BlockingFetchEngine，截图以URL形式返回时用于下载
+    """
+
+    def __init__(self, screenshots_dir, asset_store, fetcher=None):
+        self.screenshots_dir = Path(screenshots_dir)
+        self.asset_store = asset_store
+        self.fetcher = fetcher
+
+    def decode_to_store(self, data):
+        """分块解码 base64 字符串写入资源仓库，返回 (摘要, 字节数)"""
+        if data.startswith('data:'):
+            # 移除 data:image/png;base64, 前缀
+            data = data[data.index(',') + 1:]
+
+        with self.asset_store.open_object('.png') as writer:
+            carry = ''
+            for start in range(0, len(data), DECODE_CHUNK):
+                piece = carry + data[start:start + DECODE_CHUNK].translate(WHITESPACE)
+                usable = len(piece) // 4 * 4
+                writer.write(base64.b64decode(piece[:usable]))
+                carry = piece[usable:]
+            if carry:
+                writer.write(base64.b64decode(carry + '=' * (-len(carry) % 4)))
+            return writer.commit(), writer.size
+
+    def save(self, screenshot, name, source_url=''):
+        """保存一张截图，返回 {path, sha256, size, format, width, height}
+
+        screenshot 可以是 base64 字符串（可带 data: 前缀）或图片URL；失败时抛出 ValueError
+        """
+        if screenshot.startswith(('http://', 'https://')):
+            if self.fetcher is None:
+                raise ValueError('截图为URL，但未提供抓取引擎')
+            result = self.fetcher.download(screenshot)
+            if 'digest' not in result:
+                raise ValueError(result['error'])
+            digest, size, src_ext = result['digest'], result['size'], result['ext']
+        else:
+            try:
+                digest, size = self.decode_to_store(screenshot)
+            except ValueError as e:
+                raise ValueError(f'base64 解码失败: {e}') from e
+            src_ext = '.png'
+
+        with open(self.asset_store.object_path(digest, src_ext), 'rb') as f:
+            image_format, width, height = image_info(f.read(HEADER_SIZE))
+
+        ext = '.jpg' if image_format == 'jpeg' else f'.{image_format or "png"}'
+        entry = self.asset_store.register(f'screenshot:{source_url or digest}', digest, size,
+                                          f'image/{image_format or "png"}', ext, src_ext=src_ext)
+        path = self.asset_store.place(entry, self.screenshots_dir / f'{name}{ext}')
+        return {
+            'path': os.path.relpath(path, self.screenshots_dir.parent),
+            'sha256': digest,
+            'size': size,
+            'format': image_format,
+            'width': width,
+            'height': height
+        }
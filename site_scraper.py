@@ -4,32 +4,89 @@
 使用 requests, BeautifulSoup 和 urllib 实现完整网站克隆
 """
 
+import argparse
 import os
-import sys
-import requests
+from concurrent.futures import FIRST_COMPLETED, wait
 from urllib.parse import urljoin, urlparse, unquote
-from bs4 import BeautifulSoup
 import time
 import json
 from pathlib import Path
 import mimetypes
 import re
 
+import metrics
+from asset_store import AssetStore
+from crawl_frontier import Frontier
+from crawl_journal import DONE, FAILED, QUEUED, CrawlJournal
+from fetch_engine import BlockingFetchEngine, is_transient_error
+from html_parser import add_parser_argument, make_soup
+from http_cache import HTTPCache
+from near_duplicates import DEFAULT_SIMILARITY, NearDuplicateIndex
+from page_facts import iter_url_attributes
+from scrape_log import add_log_arguments, configure_from_args, log, progress
+
 class WebsiteScraper:
-    def __init__(self, base_url, output_dir="scraped_site"):
+    def __init__(self, base_url, output_dir="scraped_site", fetcher=None, rate=5.0, per_host=4, asset_store=None,
+                 parser=None, max_depth=3, max_pages=200, resume=False,
+                 dedup_similarity=DEFAULT_SIMILARITY):
+        self.start_url = base_url
         self.base_url = base_url.rstrip('/')
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
         
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        })
+        # 所有抓取器共享的内容寻址资源仓库
+        self.asset_store = asset_store or AssetStore()
+        
+        # 共享抓取引擎：连接池 + 按主机并发限制 + 礼貌速率 + 条件请求缓存
+        self.owns_fetcher = fetcher is None
+        self.fetcher = fetcher or BlockingFetchEngine(rate=rate, per_host=per_host,
+                                                      cache=HTTPCache(self.asset_store))
+        
+        # HTML解析后端，None 表示使用默认后端
+        self.parser = parser
+        
+        # 广度优先抓取队列；同时在途的页面请求数与单主机并发数一致
+        # 按本地保存路径去重，指向同一文件的URL只抓取一次
+        self.frontier = Frontier(max_depth=max_depth, max_pages=max_pages, key=self.url_to_local_path)
+        self.page_concurrency = per_host
         
         self.downloaded_urls = set()
         self.failed_urls = set()
+        # 本次运行中永久失败（如 404）的资源，其他页面引用时不再请求
+        self.missing_urls = set()
         self.site_map = {}
         
+        # 近似重复页面检测（SimHash），dedup_similarity 为相似度阈值，None 或 0 表示关闭；
+        # 默认值与 ScrapePipeline 相同，两个入口对同一站点得到相同的分组
+        self.duplicates = NearDuplicateIndex(dedup_similarity) if dedup_similarity else None
+        self.duplicate_of = {}
+        
+        # 检查点日志：记录每个页面和资源的状态变化，resume 时跳过已完成的部分
+        self.journal = CrawlJournal(self.output_dir, resume=resume)
+        self.retry_assets = []
+        if resume:
+            self.restore_checkpoint()
+        
+    def restore_checkpoint(self):
+        """从检查点日志恢复抓取状态，未完成和失败的页面重新入队"""
+        for entry in self.journal.items('asset'):
+            if entry['state'] == DONE:
+                self.downloaded_urls.add(entry['url'])
+            elif entry['state'] == FAILED:
+                self.retry_assets.append((entry['url'], Path(entry['path'])))
+        
+        pending = 0
+        for entry in self.journal.items('page'):
+            page_done = entry['state'] == DONE
+            if page_done:
+                self.downloaded_urls.add(entry['url'])
+                self.site_map[entry['url']] = entry['path']
+            if self.frontier.restore(entry['url'], entry.get('depth', 0), pending=not page_done):
+                pending += 1
+        
+        log.info(f"♻️  从检查点恢复: {len(self.site_map)} 个页面已完成, "
+                 f"{pending} 个页面待抓取, {len(self.retry_assets)} 个资源待重试")
+    
     def clean_filename(self, url):
         """清理URL生成安全的文件名"""
         parsed = urlparse(url)
@@ -54,70 +111,79 @@ class WebsiteScraper:
     
     def download_file(self, url, local_path):
         """下载文件到本地路径"""
-        try:
-            print(f"下载: {url}")
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
+        return self.download_files([(url, local_path)])[url]
+    
+    def download_files(self, targets):
+        """通过共享抓取引擎并发流式下载多个文件，返回 {url: 是否成功}
+
+        已下载和已确认不存在的资源不再请求；临时错误的资源在下一个页面引用时重试
+        """
+        pending = []
+        outcome = {}
+        for url, local_path in targets:
+            if url in self.downloaded_urls:
+                outcome[url] = True
+            elif url in self.missing_urls:
+                outcome[url] = False
+            elif url not in outcome:
+                outcome[url] = False
+                pending.append((url, local_path))
+        
+        results = self.fetcher.download_many([url for url, _ in pending])
+        for (url, local_path), result in zip(pending, results):
+            if 'digest' not in result:
+                log.warning(f"⚠️  下载失败 {url}: {result['error']}", extra={'data': {'url': url}})
+                self.failed_urls.add(url)
+                if not is_transient_error(result):
+                    self.missing_urls.add(url)
+                self.journal.record(url, 'asset', FAILED, path=str(local_path), error=result['error'])
+                continue
             
-            # 确保目录存在
-            local_path.parent.mkdir(parents=True, exist_ok=True)
+            log.debug(f"下载: {url}")
             
-            # 写入文件
-            with open(local_path, 'wb') as f:
-                f.write(response.content)
+            # 内容已流式写入资源仓库，登记后链接到本地路径
+            entry = self.asset_store.register(url, result['digest'], result['size'], result['content_type'],
+                                              local_path.suffix, src_ext=result['ext'])
+            self.asset_store.place(entry, local_path)
             
             self.downloaded_urls.add(url)
-            return True
-            
-        except Exception as e:
-            print(f"下载失败 {url}: {e}")
-            self.failed_urls.add(url)
-            return False
-    
-    def process_html(self, html_content, base_url):
-        """处理HTML内容，下载资源并更新链接"""
-        soup = BeautifulSoup(html_content, 'html.parser')
+            self.journal.record(url, 'asset', DONE, path=str(local_path))
+            outcome[url] = True
         
-        # 处理图片
-        for img in soup.find_all('img'):
-            src = img.get('src')
-            if src:
-                img_url = urljoin(base_url, src)
-                if self.is_same_domain(img_url):
-                    local_path = self.url_to_local_path(img_url)
-                    if self.download_file(img_url, local_path):
-                        img['src'] = self.local_path_to_relative(local_path)
+        return outcome
+    
+    def process_html(self, html_content, base_url, soup=None):
+        """处理HTML内容，下载资源并更新链接
+
+        soup 为已解析的树时直接在其上改写（会修改该树），
+        返回 (处理后的HTML, 页面上的站内链接)
+        """
+        if soup is None:
+            soup = make_soup(html_content, self.parser)
         
-        # 处理CSS链接
-        for link in soup.find_all('link', rel='stylesheet'):
-            href = link.get('href')
-            if href:
-                css_url = urljoin(base_url, href)
-                if self.is_same_domain(css_url):
-                    local_path = self.url_to_local_path(css_url)
-                    if self.download_file(css_url, local_path):
-                        link['href'] = self.local_path_to_relative(local_path)
+        # 一次遍历收集图片、CSS、JavaScript资源和页面链接
+        targets = []
+        page_links = []
+        for element, attr, kind in iter_url_attributes(soup):
+            target_url = urljoin(base_url, element[attr])
+            if not self.is_same_domain(target_url):
+                continue
+            if kind == 'page':
+                page_links.append((element, attr, target_url))
+            else:
+                targets.append((element, attr, target_url, self.url_to_local_path(target_url)))
         
-        # 处理JavaScript
-        for script in soup.find_all('script', src=True):
-            src = script.get('src')
-            if src:
-                js_url = urljoin(base_url, src)
-                if self.is_same_domain(js_url):
-                    local_path = self.url_to_local_path(js_url)
-                    if self.download_file(js_url, local_path):
-                        script['src'] = self.local_path_to_relative(local_path)
+        # 资源统一并发下载
+        outcome = self.download_files([(asset_url, local_path) for _, _, asset_url, local_path in targets])
+        for element, attr, asset_url, local_path in targets:
+            if outcome[asset_url]:
+                element[attr] = self.local_path_to_relative(local_path)
         
         # 处理页面链接
-        for a in soup.find_all('a', href=True):
-            href = a.get('href')
-            if href and not href.startswith('#') and not href.startswith('mailto:'):
-                page_url = urljoin(base_url, href)
-                if self.is_same_domain(page_url):
-                    local_path = self.url_to_local_path(page_url)
-                    a['href'] = self.local_path_to_relative(local_path)
+        for element, attr, page_url in page_links:
+            element[attr] = self.local_path_to_relative(self.url_to_local_path(page_url))
         
-        return str(soup)
+        return str(soup), [page_url for _, _, page_url in page_links]
     
     def is_same_domain(self, url):
         """检查URL是否属于同一域名"""
@@ -132,88 +198,141 @@ class WebsiteScraper:
         """将本地路径转换为相对路径"""
         return os.path.relpath(local_path, self.output_dir)
     
-    def scrape_page(self, url):
-        """抓取单个页面"""
+    def check_duplicate(self, url, text):
+        """检查页面文本是否与已抓取的页面近似重复，返回相似的代表页面URL，否则返回 None"""
+        if self.duplicates is None:
+            return None
+        match = self.duplicates.check(url, text)
+        if match is None:
+            return None
+        canonical_url, score = match
+        self.duplicate_of[url] = canonical_url
+        log.debug(f"🪞 近似重复页面: {url} ≈ {canonical_url} (相似度 {score:.2f})")
+        return canonical_url
+    
+    def scrape_page(self, url, result=None, soup=None):
+        """抓取单个页面，result 为已获取的响应时不再重复请求
+
+        返回页面上的站内链接，供抓取队列继续扩展；失败时返回 None。
+        soup 由调用方提供时，近似重复检查也由调用方完成。
+        镜像中的链接需要指向实际文件，近似重复的页面（及其资源）在单独运行和流水线中都照常保存，
+        只记录在报告中；流水线另外跳过这些页面的 Markdown、结构化和资源阶段
+        """
         if url in self.downloaded_urls:
-            return
+            return []
         
         try:
-            print(f"抓取页面: {url}")
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
+            log.debug(f"抓取页面: {url}")
+            if result is None:
+                result = self.fetcher.fetch(url, as_text=True)
+            if 'content' not in result:
+                raise RuntimeError(result['error'])
+            
+            if soup is None and self.duplicates is not None:
+                soup = make_soup(result['content'], self.parser)
+                self.check_duplicate(url, soup.get_text())
             
             # 处理HTML内容
-            processed_html = self.process_html(response.text, url)
+            processed_html, page_links = self.process_html(result['content'], url, soup)
             
             # 保存页面
             local_path = self.url_to_local_path(url)
             local_path.parent.mkdir(parents=True, exist_ok=True)
             
-            with open(local_path, 'w', encoding='utf-8') as f:
+            with metrics.timer('write'), open(local_path, 'w', encoding='utf-8') as f:
                 f.write(processed_html)
             
             self.downloaded_urls.add(url)
             self.site_map[url] = str(local_path)
             
-            print(f"✅ 成功保存: {local_path}")
+            log.debug(f"✅ 成功保存: {local_path}")
+            return page_links
             
         except Exception as e:
-            print(f"❌ 页面抓取失败 {url}: {e}")
+            log.error(f"❌ 页面抓取失败 {url}: {e}", extra={'data': {'url': url}})
             self.failed_urls.add(url)
+            return None
     
-    def discover_pages(self, start_url):
-        """发现网站中的所有页面"""
-        pages_to_scrape = []
+    def scrape_website(self):
+        """按广度优先抓取整个网站"""
+        log.info(f"🚀 开始抓取网站: {self.start_url}")
+        log.info(f"📁 输出目录: {self.output_dir}")
+        log.info(f"🧭 最大深度: {self.frontier.max_depth}, 最多页面: {self.frontier.max_pages}")
         
         try:
-            response = self.session.get(start_url, timeout=30)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # 查找所有内部链接
-            for a in soup.find_all('a', href=True):
-                href = a.get('href')
-                if href and not href.startswith('#') and not href.startswith('mailto:'):
-                    page_url = urljoin(start_url, href)
-                    if self.is_same_domain(page_url) and page_url not in pages_to_scrape:
-                        pages_to_scrape.append(page_url)
+            # 先重试上次失败的资源
+            if self.retry_assets:
+                self.download_files(self.retry_assets)
             
-        except Exception as e:
-            print(f"页面发现失败: {e}")
-        
-        return pages_to_scrape
-    
-    def scrape_website(self):
-        """抓取整个网站"""
-        print(f"🚀 开始抓取网站: {self.base_url}")
-        print(f"📁 输出目录: {self.output_dir}")
-        
-        # 发现所有页面
-        pages = [self.base_url]
-        discovered_pages = self.discover_pages(self.base_url)
-        pages.extend(discovered_pages)
-        
-        # 添加常见页面
-        common_pages = ['/about', '/privacy', '/contact', '/help']
-        for page in common_pages:
-            full_url = self.base_url + page
-            if full_url not in pages:
-                pages.append(full_url)
-        
-        print(f"📄 发现 {len(pages)} 个页面")
-        
-        # 抓取所有页面
-        for i, page_url in enumerate(pages, 1):
-            print(f"\n[{i}/{len(pages)}] 处理页面...")
-            self.scrape_page(page_url)
-            time.sleep(1)  # 避免过于频繁的请求
+            processed = self.crawl(self.scrape_page)
+        finally:
+            self.close()
         
         # 生成报告
         self.generate_report()
         
-        print(f"\n✅ 抓取完成!")
-        print(f"📊 成功: {len(self.downloaded_urls)} 个文件")
-        print(f"❌ 失败: {len(self.failed_urls)} 个文件")
-        print(f"📁 文件保存在: {self.output_dir}")
+        log.info(f"✅ 抓取完成!")
+        log.info(f"📄 页面: {processed} 个")
+        log.info(f"📊 成功: {len(self.downloaded_urls)} 个文件")
+        log.info(f"❌ 失败: {len(self.failed_urls)} 个文件")
+        if self.duplicates:
+            log.info(f"🪞 近似重复: {self.duplicates.duplicate_count()} 个页面, "
+                     f"{len(self.duplicates.clusters)} 组")
+        log.info(f"📁 文件保存在: {self.output_dir}")
+    
+    def crawl(self, handle_page):
+        """按广度优先抓取，返回处理的页面数
+
+        handle_page(url, result) 处理每个已获取的页面，返回页面上的链接，失败时返回 None
+        """
+        # 全新抓取从起始页开始；恢复时队列已由检查点填充
+        if not self.frontier.seen:
+            self.queue_page(self.frontier.add(self.start_url))
+        in_flight = {}
+        processed = 0
+        
+        # 队列中的页面持续提交给抓取引擎，请求频率由引擎按主机控制
+        with progress('📄 页面') as bar:
+            while self.frontier or in_flight:
+                while self.frontier and len(in_flight) < self.page_concurrency:
+                    page_url = self.frontier.pop()
+                    in_flight[self.fetcher.submit_fetch(page_url, as_text=True)] = page_url
+                
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    page_url = in_flight.pop(future)
+                    processed += 1
+                    log.debug(f"[{processed}/{len(self.frontier.seen)}] 处理页面 (深度 {self.frontier.depth(page_url)})...")
+                    page_links = handle_page(page_url, future.result())
+                    bar.total = len(self.frontier.seen)
+                    bar.advance()
+                    
+                    # 新发现的链接入队之后再记录页面完成，中断时不会丢失链接
+                    if page_links is None:
+                        self.journal.record(page_url, 'page', FAILED)
+                        continue
+                    for link in self.frontier.add_links(page_links, page_url):
+                        self.queue_page(link)
+                    self.journal.record(page_url, 'page', DONE, path=self.site_map.get(page_url))
+        
+        return processed
+    
+    def queue_page(self, url):
+        """记录新加入抓取队列的页面"""
+        if url:
+            self.journal.record(url, 'page', QUEUED, depth=self.frontier.depth(url))
+    
+    def close(self):
+        """关闭自有的抓取引擎、检查点日志并保存资源索引"""
+        self.journal.close()
+        self.asset_store.save()
+        if self.owns_fetcher:
+            self.fetcher.close()
+    
+    def cache_stats(self):
+        """HTTP缓存命中统计"""
+        cache = self.fetcher.engine.cache
+        return cache.stats() if cache else None
     
     def generate_report(self):
         """生成抓取报告"""
@@ -224,6 +343,16 @@ class WebsiteScraper:
             'downloaded_urls': list(self.downloaded_urls),
             'failed_urls': list(self.failed_urls),
             'site_map': self.site_map,
+            'crawl': {
+                'max_depth': self.frontier.max_depth,
+                'max_pages': self.frontier.max_pages,
+                'pages_discovered': len(self.frontier.seen)
+            },
+            'http_cache': self.cache_stats(),
+            # 近似重复页面分组（未启用检测时为 None）
+            'near_duplicates': self.duplicates.report() if self.duplicates else None,
+            # 各阶段和各主机的耗时与计数，同时写入 metrics.prom
+            'metrics': metrics.export(self.output_dir),
             'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
         }
         
@@ -271,20 +400,26 @@ class WebsiteScraper:
 
 def main():
     """主函数"""
-    if len(sys.argv) > 1:
-        target_url = sys.argv[1]
-    else:
-        target_url = "https://68tt.co/cn/"
-    
-    if len(sys.argv) > 2:
-        output_dir = sys.argv[2]
-    else:
-        output_dir = "scraped_68tt"
+    arg_parser = argparse.ArgumentParser(description='68tt.co 网站内容抓取工具')
+    arg_parser.add_argument('target_url', nargs='?', default="https://68tt.co/cn/")
+    arg_parser.add_argument('output_dir', nargs='?', default="scraped_68tt")
+    arg_parser.add_argument('--max-depth', type=int, default=3, help='最大抓取深度（起始页为 0）')
+    arg_parser.add_argument('--max-pages', type=int, default=200, help='最多抓取的页面数')
+    arg_parser.add_argument('--resume', action='store_true', help='从检查点日志继续上次中断的抓取')
+    arg_parser.add_argument('--dedup-similarity', type=float, default=DEFAULT_SIMILARITY,
+                            help=f'近似重复页面的文本相似度阈值（默认 {DEFAULT_SIMILARITY}，0 表示关闭）；'
+                                 f'镜像需要保持链接有效，近似重复的页面仍然保存，只记录在报告中')
+    add_parser_argument(arg_parser)
+    add_log_arguments(arg_parser)
+    args = arg_parser.parse_args()
+    configure_from_args(args)
     
-    print("🔧 68tt.co 网站内容抓取工具")
-    print("=" * 50)
+    log.info("🔧 68tt.co 网站内容抓取工具")
+    log.info("=" * 50)
     
-    scraper = WebsiteScraper(target_url, output_dir)
+    scraper = WebsiteScraper(args.target_url, args.output_dir, parser=args.parser,
+                             max_depth=args.max_depth, max_pages=args.max_pages, resume=args.resume,
+                             dedup_similarity=args.dedup_similarity)
     scraper.scrape_website()
 
 if __name__ == "__main__":
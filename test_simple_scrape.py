@@ -3,11 +3,14 @@
 简单的68tt.co抓取测试 - 包含图片下载
 """
 
+import argparse
 import requests
 import os
 from pathlib import Path
 from urllib.parse import urljoin, urlparse
-from bs4 import BeautifulSoup
+from file_manifest import FileManifest
+from html_parser import make_soup
+from scrape_log import add_log_arguments, configure_from_args, log, progress
 import time
 
 def download_with_assets():
@@ -32,38 +35,40 @@ def download_with_assets():
     ]
     
     downloaded_images = []
+    files = FileManifest(output_dir)
     
-    print("🚀 开始简单抓取...")
+    log.info("🚀 开始简单抓取...")
     
     for i, url in enumerate(pages, 1):
-        print(f"\n[{i}/{len(pages)}] 处理页面: {url}")
+        log.info(f"[{i}/{len(pages)}] 处理页面: {url}")
         
         try:
             # 获取页面内容
             response = requests.get(url, headers=headers, timeout=30)
             if response.status_code != 200:
-                print(f"❌ 页面获取失败: HTTP {response.status_code}")
+                log.error(f"❌ 页面获取失败 {url}: HTTP {response.status_code}")
                 continue
                 
-            print(f"✅ 页面获取成功: {len(response.text)} 字符")
+            log.debug(f"✅ 页面获取成功: {len(response.text)} 字符")
             
             # 解析HTML
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = make_soup(response.text)
             title = soup.title.string if soup.title else "Untitled"
             
             # 保存HTML
             filename = f"page_{i}_{urlparse(url).path.strip('/').replace('/', '_') or 'index'}.html"
             html_path = output_dir / filename
-            with open(html_path, 'w', encoding='utf-8') as f:
-                f.write(response.text)
+            files.write_text(html_path, response.text)
             
-            print(f"📄 HTML保存: {filename}")
+            log.debug(f"📄 HTML保存: {filename}")
             
             # 查找并下载图片
             images = soup.find_all('img', src=True)
-            print(f"🖼️  发现 {len(images)} 个图片")
+            log.info(f"🖼️  发现 {len(images)} 个图片")
             
+            bar = progress('🖼️  图片', len(images))
             for j, img in enumerate(images):
+                bar.advance()
                 img_src = img['src']
                 
                 # 处理相对URL
@@ -85,7 +90,7 @@ def download_with_assets():
                     continue
                 
                 try:
-                    print(f"  📥 下载图片 {j+1}: {img_url}")
+                    log.debug(f"  📥 下载图片 {j+1}: {img_url}")
                     img_response = requests.get(img_url, headers=headers, timeout=30)
                     
                     if img_response.status_code == 200:
@@ -117,47 +122,48 @@ def download_with_assets():
                         img_path = assets_dir / img_filename
                         with open(img_path, 'wb') as f:
                             f.write(img_response.content)
+                        files.record_content(img_path, img_response.content)
                         
                         downloaded_images.append(img_url)
-                        print(f"    ✅ 保存: {img_filename} ({len(img_response.content)} 字节)")
+                        log.debug(f"    ✅ 保存: {img_filename} ({len(img_response.content)} 字节)")
                     else:
-                        print(f"    ❌ 下载失败: HTTP {img_response.status_code}")
+                        log.warning(f"⚠️  图片下载失败 {img_url}: HTTP {img_response.status_code}")
                         
                 except Exception as e:
-                    print(f"    ❌ 图片下载错误: {e}")
+                    log.warning(f"⚠️  图片下载错误 {img_url}: {e}")
                 
                 # 避免过于频繁的请求
                 time.sleep(0.5)
+            bar.close()
             
         except Exception as e:
-            print(f"❌ 页面处理错误: {e}")
+            log.error(f"❌ 页面处理错误: {e}")
         
         # 页面间稍作停顿
         time.sleep(1)
     
     # 生成报告
-    print(f"\n📊 抓取完成统计:")
+    log.info(f"📊 抓取完成统计:")
     
-    all_files = list(output_dir.rglob("*"))
-    files = [f for f in all_files if f.is_file()]
+    files.save()
+    file_summary = files.summary()
     
-    html_files = [f for f in files if f.suffix == '.html']
-    img_files = [f for f in files if f.suffix.lower() in ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg']]
-    
-    print(f"📄 HTML 文件: {len(html_files)} 个")
-    print(f"🖼️  图片文件: {len(img_files)} 个")
-    print(f"📁 总文件: {len(files)} 个")
-    print(f"💾 输出目录: {output_dir}")
+    log.info(f"📄 HTML 文件: {file_summary['by_kind'].get('html', 0)} 个")
+    log.info(f"🖼️  图片文件: {file_summary['by_kind'].get('image', 0)} 个")
+    log.info(f"📁 总文件: {file_summary['files']} 个")
+    log.info(f"💾 输出目录: {output_dir}")
     
     # 显示文件列表
-    print(f"\n📋 文件列表:")
-    for file in sorted(files):
-        size = file.stat().st_size
+    log.debug(f"📋 文件列表:")
+    for name, size in files.files():
         if size > 1024:
             size_str = f"{size/1024:.1f}KB"
         else:
             size_str = f"{size}B"
-        print(f"  - {file.name} ({size_str})")
+        log.debug(f"  - {name} ({size_str})")
 
 if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='简单的68tt.co抓取测试')
+    add_log_arguments(arg_parser)
+    configure_from_args(arg_parser.parse_args())
     download_with_assets()